@@ -0,0 +1,86 @@
+"""
+# Import benchmark.
+
+Measures import time and peak RSS of the package entry points, each in a fresh interpreter,
+and reports which HTTP stacks (`requests`, `aiohttp`) each of them loads.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 10] [--importtime]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+STATEMENTS = {
+    "python": "pass",
+    "bitpin": "import bitpin",
+    "Client": "from bitpin import Client",
+    "AsyncClient": "from bitpin import AsyncClient",
+    "both": "from bitpin import AsyncClient, Client",
+}
+
+_CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_kb": rss // 1024 if sys.platform == "darwin" else rss,
+    "modules": len(sys.modules),
+    "requests": "requests" in sys.modules,
+    "aiohttp": "aiohttp" in sys.modules,
+}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    env = {**os.environ, "PYTHONPATH": str(SRC), "PYTHONDONTWRITEBYTECODE": "1"}
+    runs = [
+        json.loads(subprocess.check_output([sys.executable, "-c", _CHILD.format(statement=statement)], env=env))
+        for _ in range(repeat)
+    ]
+    best = min(runs, key=lambda run: run["seconds"])
+    best["rss_kb"] = min(run["rss_kb"] for run in runs)
+    return best
+
+
+def importtime(statement: str, top: int = 15) -> None:
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], env=env, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in output.splitlines()[1:]:
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"    {cumulative_us / 1e3:8.1f} ms cumulative  {self_us / 1e3:7.1f} ms self  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="fresh interpreters per statement")
+    parser.add_argument("--importtime", action="store_true", help="print the slowest modules of each statement")
+    args = parser.parse_args()
+
+    for name, statement in STATEMENTS.items():
+        result = measure(statement, args.repeat)
+        stacks = ", ".join(stack for stack in ("requests", "aiohttp") if result[stack]) or "-"
+        print(
+            f"{name:>12}: {result['seconds'] * 1e3:7.1f} ms  {result['rss_kb'] / 1024:6.1f} MB RSS  "
+            f"{result['modules']:4d} modules  loads: {stacks}"
+        )
+        if args.importtime and statement != "pass":
+            importtime(statement)
+
+
+if __name__ == "__main__":
+    main()
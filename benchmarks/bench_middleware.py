@@ -0,0 +1,109 @@
+"""
+# Middleware overhead benchmark.
+
+Measures the per-request cost of the middleware pipeline without any network I/O:
+the client's session is replaced by a stub returning a canned `requests.Response`.
+
+Usage:
+    python benchmarks/bench_middleware.py [--requests N]
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from bitpin import Client  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin.middleware import Middleware  # noqa: E402  # pylint: disable=wrong-import-position
+
+BODY = json.dumps({"orders": [{"amount": "1", "price": "1", "remain": "1", "value": "1"}] * 20, "volume": "20"})
+
+
+class StubSession:
+    """Session returning the same response for every call."""
+
+    def __init__(self) -> None:
+        prepared = requests.Request("GET", Client.API_URL + "/v2/mth/actives/1/?type=buy").prepare()
+        response = requests.Response()
+        response.status_code = 200
+        response._content = BODY.encode()  # pylint: disable=protected-access
+        response.elapsed = datetime.timedelta(microseconds=1)
+        response.request = prepared
+        self.response = response
+
+    def get(self, *_, **__) -> requests.Response:
+        return self.response
+
+    def close(self) -> None:
+        pass
+
+
+def measure(call: t.Callable[[], t.Any], count: int) -> float:
+    """Return mean seconds per call."""
+
+    for _ in range(min(count, 1000)):
+        call()
+
+    start = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - start) / count
+
+
+def bypass_pipeline(client: Client) -> t.Callable[..., t.Any]:
+    """`Client._request` without the middleware dispatch."""
+
+    def _request(method: str, uri: str, signed: bool, endpoint: t.Any = None, **kwargs: t.Any) -> t.Any:
+        kwargs = client._get_request_kwargs(method, signed, endpoint, **kwargs)  # pylint: disable=protected-access
+        template = endpoint.template if endpoint is not None else None
+        return client._send(method, uri, kwargs, None, template)  # pylint: disable=protected-access
+
+    return _request
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=5, help="best of N interleaved rounds")
+    parser.add_argument(
+        "--max-overhead", type=float, default=0.05, help="fail if the empty chain is slower than this fraction"
+    )
+    args = parser.parse_args()
+
+    client = Client(enable_metrics=False)
+    client.session = StubSession()  # type: ignore[assignment]
+
+    chains = {
+        "no_pipeline": None,
+        "empty_chain": [],
+        "one_noop": [Middleware()],
+        "five_noop": [Middleware() for _ in range(5)],
+    }
+    results = {name: float("inf") for name in chains}
+    for _ in range(args.rounds):
+        for name, middlewares in chains.items():
+            if middlewares is None:
+                client._request = bypass_pipeline(client)  # type: ignore[assignment]  # pylint: disable=protected-access
+            else:
+                client.__dict__.pop("_request", None)
+                client.middlewares = middlewares
+            results[name] = min(results[name], measure(lambda: client.get_orderbook(1, "buy"), args.requests))
+
+    for name, seconds in results.items():
+        overhead = seconds - results["no_pipeline"]
+        print(f"{name:>12}: {seconds * 1e6:8.2f} us/request ({overhead * 1e6:+.2f} us vs no pipeline)")
+
+    overhead = results["empty_chain"] / results["no_pipeline"] - 1
+    if overhead > args.max_overhead:
+        sys.exit(f"empty middleware chain overhead {overhead:.1%} exceeds {args.max_overhead:.1%}")
+
+
+if __name__ == "__main__":
+    main()
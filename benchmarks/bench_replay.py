@@ -0,0 +1,138 @@
+"""
+# Replay benchmark.
+
+Replays a recording (see `bitpin.recording`) through `Client` and `AsyncClient` without waiting
+for recorded latencies, measuring the client-side cost (request building, decoding, metrics)
+per endpoint on real payloads.
+
+When the recording holds `get_user_orders` pages, they are also streamed back with `stream_user_orders`
+and checked against the recorded results.
+
+Usage:
+    python benchmarks/bench_replay.py recording.bprec [--rounds 20] [--time-scale 0]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from bitpin import AsyncClient, Client  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin.recording import (  # noqa: E402  # pylint: disable=wrong-import-position
+    AsyncReplaySession,
+    Exchange,
+    ReplaySession,
+    read_recording,
+)
+
+
+def bench_sync(exchanges: t.List[Exchange], rounds: int, time_scale: float) -> float:
+    client = Client()
+    client.session = ReplaySession(exchanges, time_scale=time_scale)
+    client.access_token = "replay"
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for exchange in exchanges:
+            try:
+                client._request(exchange.method, exchange.uri, False)  # pylint: disable=protected-access
+            except Exception:  # pylint: disable=broad-except
+                pass
+    return time.perf_counter() - start
+
+
+def bench_async(exchanges: t.List[Exchange], rounds: int, time_scale: float) -> float:
+    async def main() -> float:
+        client = AsyncClient()
+        await client.session.close()
+        client.session = AsyncReplaySession(exchanges, time_scale=time_scale)  # type: ignore[assignment]
+        client.access_token = "replay"
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for exchange in exchanges:
+                try:
+                    await client._request(exchange.method, exchange.uri, False)  # pylint: disable=protected-access
+                except Exception:  # pylint: disable=broad-except
+                    pass
+        return time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def recorded_orders(exchanges: t.List[Exchange]) -> t.List[t.Any]:
+    ids = []
+    for exchange in exchanges:
+        if exchange.method != "get" or not exchange.uri.split("?")[0].endswith("/odr/orders/"):
+            continue
+        page = json.loads(exchange.body)
+        ids.extend(order["id"] for order in page.get("results") or [])
+        if not page.get("next"):
+            break
+    return ids
+
+
+def stream_sync(exchanges: t.List[Exchange], rounds: int) -> t.Tuple[float, t.List[t.Any]]:
+    client = Client()
+    client.session = ReplaySession(exchanges, time_scale=0)
+    client.access_token = "replay"
+
+    ids: t.List[t.Any] = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        ids = [order["id"] for order in client.stream_user_orders()]
+    return time.perf_counter() - start, ids
+
+
+def stream_async(exchanges: t.List[Exchange], rounds: int) -> t.Tuple[float, t.List[t.Any]]:
+    async def main() -> t.Tuple[float, t.List[t.Any]]:
+        client = AsyncClient()
+        await client.session.close()
+        client.session = AsyncReplaySession(exchanges, time_scale=0)  # type: ignore[assignment]
+        client.access_token = "replay"
+
+        ids: t.List[t.Any] = []
+        start = time.perf_counter()
+        for _ in range(rounds):
+            ids = [order["id"] async for order in client.stream_user_orders()]
+        return time.perf_counter() - start, ids
+
+    return asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--rounds", type=int, default=20, help="times the whole recording is replayed")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="multiplier of recorded latencies")
+    args = parser.parse_args()
+
+    exchanges = list(read_recording(args.recording))
+    if not exchanges:
+        sys.exit(f"{args.recording} is empty")
+
+    total = len(exchanges) * args.rounds
+    payload = sum(len(exchange.body) for exchange in exchanges) * args.rounds
+    for name, bench in (("sync", bench_sync), ("async", bench_async)):
+        elapsed = bench(exchanges, args.rounds, args.time_scale)
+        print(
+            f"{name:>5}: {total / elapsed:9.1f} responses/s  {payload / elapsed / 1e6:7.2f} MB/s  ({total} responses)"
+        )
+
+    expected = recorded_orders(exchanges)
+    if not expected:
+        return
+    for name, stream in (("sync", stream_sync), ("async", stream_async)):
+        elapsed, ids = stream(exchanges, args.rounds)
+        if ids != expected:
+            sys.exit(f"{name} stream_user_orders yielded {len(ids)} orders, {len(expected)} recorded")
+        print(f"{name:>5}: {len(ids) * args.rounds / elapsed:9.1f} streamed orders/s  ({len(ids)} orders)")
+
+
+if __name__ == "__main__":
+    main()
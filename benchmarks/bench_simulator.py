@@ -0,0 +1,84 @@
+"""
+# Simulator benchmark.
+
+Measures the matching engine throughput (orders/second) with a random limit-order flow
+around a mid price, then HTTP order submission throughput through `AsyncClient`.
+
+Usage:
+    python benchmarks/bench_simulator.py [--orders 200000] [--http-orders 5000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from bitpin import AsyncClient  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin.simulator import Market, MatchingEngine, Simulator  # noqa: E402  # pylint: disable=wrong-import-position
+
+
+def bench_engine(orders: int, cancel_ratio: float) -> None:
+    engine = MatchingEngine(check_balance=False)
+    engine.add_market(Market(1, "BTC", "IRT"))
+    rng = random.Random(1)
+    prices = [Decimal(1_000_000 + offset) for offset in range(-50, 51)]
+    amounts = [Decimal("0.1") * size for size in range(1, 6)]
+    resting = []
+
+    start = time.perf_counter()
+    for index in range(orders):
+        if resting and rng.random() < cancel_ratio:
+            order = resting.pop(rng.randrange(len(resting)))
+            if order.state == "active":
+                engine.cancel("bench", order.id)
+            continue
+
+        order = engine.place(
+            "bench", 1, "buy" if index % 2 else "sell", "limit", rng.choice(amounts), rng.choice(prices)
+        )
+        if order.state == "active":
+            resting.append(order)
+    elapsed = time.perf_counter() - start
+
+    print(f"engine: {orders / elapsed:10.0f} orders/s ({orders} operations, {cancel_ratio:.0%} cancels)")
+
+
+async def bench_http(orders: int, concurrency: int) -> None:
+    async with Simulator(check_balance=False) as simulator:
+        client = AsyncClient(enable_metrics=False)
+        client.API_URL = simulator.url  # type: ignore[assignment]
+        client.api_key, client.api_secret = "bench", "secret"
+        await client.login()
+
+        async def worker(count: int) -> None:
+            for index in range(count):
+                await client.create_order(1, 0.1, 1_000_000 + index % 10, "limit", "buy" if index % 2 else "sell")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(orders // concurrency) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        await client.close_connection()
+
+    print(f"http:   {orders / elapsed:10.0f} orders/s ({orders} orders, concurrency {concurrency})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--cancel-ratio", type=float, default=0.2)
+    parser.add_argument("--http-orders", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    bench_engine(args.orders, args.cancel_ratio)
+    if args.http_orders:
+        asyncio.run(bench_http(args.http_orders, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+# Compare benchmark results.
+
+Prints the relative change of throughput, p50/p99 latency and microbenchmark timings
+between two result files written by `run.py`.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+import typing as t
+from pathlib import Path
+
+
+def _load(path: str) -> t.Dict[str, t.Any]:
+    return json.loads(Path(path).read_text(encoding="utf-8"))  # type: ignore[no-any-return]
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="exit non-zero on regressions above this")
+    args = parser.parse_args()
+
+    baseline, candidate = _load(args.baseline), _load(args.candidate)
+    regressions = []
+
+    old_runs = {(r["client"], r["scenario"], r["concurrency"]): r for r in baseline["runs"]}
+    for run in candidate["runs"]:
+        key = (run["client"], run["scenario"], run["concurrency"])
+        old = old_runs.get(key)
+        if old is None:
+            continue
+
+        throughput = _change(old["throughput"], run["throughput"])
+        p50 = _change(old["p50"], run["p50"])
+        p99 = _change(old["p99"], run["p99"])
+        print(f"{key[0]:>5} {key[1]:>14} c={key[2]:<4} throughput {throughput:+7.1%}  p50 {p50:+7.1%}  p99 {p99:+7.1%}")
+        if -throughput > args.threshold or p99 > args.threshold:
+            regressions.append(key)
+
+    old_micro = {m["name"]: m for m in baseline.get("micro", [])}
+    for micro in candidate.get("micro", []):
+        old = old_micro.get(micro["name"])
+        if old is None:
+            continue
+
+        change = _change(old["seconds"], micro["seconds"])
+        print(f"micro {micro['name']:>20}: {change:+7.1%}")
+        if change > args.threshold:
+            regressions.append(("micro", micro["name"]))
+
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {regressions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+# Benchmark suite.
+
+Runs `Client` and `AsyncClient` against the local stand-in server (see `server.py`) at several
+concurrency levels and microbenchmarks request building and response decoding.
+
+Results are written as JSON so runs can be compared with `compare.py`.
+
+Usage:
+    python benchmarks/run.py [--output results.json] [--concurrency 1 8 32] [--requests 2000]
+                             [--latency 0.0] [--payload-size 20] [--scenario orderbook create_order]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import bitpin  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin import AsyncClient, Client  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin.clients import endpoints  # noqa: E402  # pylint: disable=wrong-import-position
+from bitpin.metrics import LatencyHistogram  # noqa: E402  # pylint: disable=wrong-import-position
+from server import ServerProcess  # noqa: E402  # pylint: disable=wrong-import-position
+
+SCENARIOS: t.Dict[str, t.Tuple[str, t.Tuple[t.Any, ...], t.Dict[str, t.Any]]] = {
+    "orderbook": ("get_orderbook", (1, "buy"), {}),
+    "recent_trades": ("get_recent_trades", (1,), {}),
+    "wallets": ("get_wallets", (), {}),
+    "user_orders": ("get_user_orders", (), {"state": "active"}),
+    "create_order": ("create_order", (1, 0.1, 1_000_000, "limit", "buy"), {}),
+    "cancel_order": ("cancel_order", ("1",), {}),
+    "markets_page": ("get_markets_info", (2,), {}),
+}
+
+
+def _sync_client(url: str, concurrency: int) -> Client:
+    client = Client(enable_metrics=False)
+    client.api_key, client.api_secret = "key", "secret"
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 10))
+    client.session.mount("http://", adapter)
+    client.API_URL = url
+    client.login()
+    return client
+
+
+def run_sync(url: str, scenario: str, concurrency: int, count: int) -> t.Dict[str, t.Any]:
+    """Run `count` requests of `scenario` through `Client` using `concurrency` threads."""
+
+    name, args, kwargs = SCENARIOS[scenario]
+    client = _sync_client(url, concurrency)
+    method = getattr(client, name)
+    histogram = LatencyHistogram()
+    errors = 0
+
+    def worker(requests_count: int) -> t.Tuple[t.List[float], int]:
+        latencies = []
+        failed = 0
+        for _ in range(requests_count):
+            start = time.perf_counter()
+            try:
+                method(*args, **kwargs)
+            except Exception:  # pylint: disable=broad-except
+                failed += 1
+            latencies.append(time.perf_counter() - start)
+        return latencies, failed
+
+    shares = [count // concurrency + (1 if i < count % concurrency else 0) for i in range(concurrency)]
+    worker(min(count, 50))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for latencies, failed in executor.map(worker, shares):
+            errors += failed
+            for latency in latencies:
+                histogram.record(latency)
+    elapsed = time.perf_counter() - start
+
+    client.close_connection()
+    return _result("sync", scenario, concurrency, count, errors, elapsed, histogram)
+
+
+def run_async(url: str, scenario: str, concurrency: int, count: int) -> t.Dict[str, t.Any]:
+    """Run `count` requests of `scenario` through `AsyncClient` using `concurrency` tasks."""
+
+    async def main() -> t.Dict[str, t.Any]:
+        name, args, kwargs = SCENARIOS[scenario]
+        client = AsyncClient(enable_metrics=False)
+        client.api_key, client.api_secret = "key", "secret"
+        client.API_URL = url
+        await client.login()
+        method = getattr(client, name)
+        histogram = LatencyHistogram()
+        errors = 0
+
+        async def worker(requests_count: int) -> int:
+            failed = 0
+            for _ in range(requests_count):
+                begin = time.perf_counter()
+                try:
+                    await method(*args, **kwargs)
+                except Exception:  # pylint: disable=broad-except
+                    failed += 1
+                histogram.record(time.perf_counter() - begin)
+            return failed
+
+        shares = [count // concurrency + (1 if i < count % concurrency else 0) for i in range(concurrency)]
+        await worker(min(count, 50))
+        histogram = LatencyHistogram()
+
+        start = time.perf_counter()
+        errors = sum(await asyncio.gather(*(worker(share) for share in shares)))
+        elapsed = time.perf_counter() - start
+
+        await client.close_connection()
+        return _result("async", scenario, concurrency, count, errors, elapsed, histogram)
+
+    return asyncio.run(main())
+
+
+def _result(  # pylint: disable=too-many-arguments
+    client: str,
+    scenario: str,
+    concurrency: int,
+    count: int,
+    errors: int,
+    elapsed: float,
+    histogram: LatencyHistogram,
+) -> t.Dict[str, t.Any]:
+    return {
+        "client": client,
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": count / elapsed if elapsed else 0.0,
+        "p50": histogram.percentile(0.5),
+        "p99": histogram.percentile(0.99),
+        "max": histogram.max,
+    }
+
+
+def run_micro(payload_size: int, number: int = 20_000) -> t.List[t.Dict[str, t.Any]]:
+    """Microbenchmarks of request building and response decoding (no I/O)."""
+
+    client = Client(enable_metrics=False)
+    client.access_token = "access-token"
+    orderbook = json.dumps(
+        {
+            "orders": [
+                {"amount": "0.5", "price": str(1_000_000 + i), "remain": "0.5", "value": "500000"}
+                for i in range(payload_size)
+            ],
+            "volume": "10",
+        }
+    )
+    order = json.dumps(
+        {"id": 1, "market": {"id": 1, "currency1": {"id": 1}, "currency2": {"id": 2}}, "price": "1", "amount1": "1"}
+    )
+
+    # pylint: disable=protected-access
+    cases: t.Dict[str, t.Callable[[], t.Any]] = {
+        "build_uri": lambda: client._create_api_uri(client.ORDERBOOK_URL.format(1, "buy")),
+        "prepare_orderbook": lambda: endpoints.ORDERBOOK.prepare((1, "buy")),
+        "prepare_user_orders": lambda: endpoints.USER_ORDERS.prepare((None, None, "active", None, None, 1)),
+        "build_kwargs_public": lambda: client._get_request_kwargs("get", False),
+        "build_kwargs_signed": lambda: client._get_request_kwargs(
+            "post", True, json={"market": "1", "amount1": "0.1", "price": "1", "mode": "limit", "type": "buy"}
+        ),
+        "decode_orderbook": lambda: json.loads(orderbook),
+        "decode_order": lambda: json.loads(order),
+    }
+
+    results = []
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=number, repeat=5)) / number
+        results.append({"name": name, "seconds": best, "payload_size": payload_size})
+    return results
+
+
+def _git_revision() -> t.Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--latency", type=float, default=0.0, help="server-side latency in seconds")
+    parser.add_argument("--payload-size", type=int, default=20, help="items in list responses")
+    parser.add_argument("--scenario", nargs="+", default=["orderbook", "create_order"], choices=sorted(SCENARIOS))
+    parser.add_argument("--client", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--skip-micro", action="store_true")
+    args = parser.parse_args()
+
+    runners = {"sync": run_sync, "async": run_async}
+    runs = []
+    with ServerProcess(latency=args.latency, payload_size=args.payload_size) as url:
+        for scenario in args.scenario:
+            for client in args.client:
+                for concurrency in args.concurrency:
+                    result = runners[client](url, scenario, concurrency, args.requests)
+                    runs.append(result)
+                    print(
+                        f"{client:>5} {scenario:>14} c={concurrency:<4} "
+                        f"{result['throughput']:9.1f} req/s  p50={result['p50'] * 1e3:7.2f}ms  "
+                        f"p99={result['p99'] * 1e3:7.2f}ms  errors={result['errors']}"
+                    )
+
+    micro = [] if args.skip_micro else run_micro(args.payload_size)
+    for item in micro:
+        print(f"micro {item['name']:>20}: {item['seconds'] * 1e6:8.3f} us")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "bitpin_version": bitpin.__version__,
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "payload_size": args.payload_size,
+            "requests": args.requests,
+        },
+        "runs": runs,
+        "micro": micro,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+# Stand-in Bitpin server.
+
+Local HTTP server implementing the endpoints used by `CoreClient` with canned payloads,
+configurable latency and payload size.
+
+Usage:
+    python benchmarks/server.py [--port 8765] [--latency 0.0] [--payload-size 20]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+import typing as t
+
+from aiohttp import web
+
+PAGE_COUNT = 3
+
+
+def _currency(index: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": index,
+        "title": f"Currency {index}",
+        "title_fa": f"Currency {index}",
+        "code": f"C{index}",
+        "tradable": True,
+        "for_test": False,
+        "image": "",
+        "decimal": 2,
+        "decimal_amount": 6,
+        "decimal_irt": 0,
+        "color": "000000",
+        "high_risk": False,
+        "show_high_risk": False,
+        "withdraw_commission": "0.000000000000000000",
+        "tags": [],
+    }
+
+
+def _market(index: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": index,
+        "currency1": _currency(index + 10),
+        "currency2": _currency(2),
+        "code": f"C{index + 10}_C2",
+        "title": f"Market {index}",
+        "title_fa": f"Market {index}",
+        "commissions": {"sell": 0.0035, "buy": 0.0035, "taker": 0.0035, "maker": 0.0035},
+    }
+
+
+def _order(index: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": index,
+        "market": _market(1),
+        "amount1": "0.10000000",
+        "amount2": "100000",
+        "price": "1000000",
+        "price_limit": "0",
+        "price_stop": None,
+        "price_limit_oco": None,
+        "type": "buy",
+        "active_limit": "0",
+        "identifier": None,
+        "mode": "limit",
+        "expected_gain": "0.1",
+        "expected_resource": "100000",
+        "commission_percent": 0.35,
+        "user_share_percent": 0.0,
+        "expected_commission": "350",
+        "expected_user_gain": "0.1",
+        "expected_user_price": "1000000",
+        "gain_currency": _currency(11),
+        "resource_currency": _currency(2),
+        "fulfilled": 0.0,
+        "exchanged1": "0",
+        "exchanged2": "0",
+        "gain": "0",
+        "resource": "0",
+        "remain_amount": "0.1",
+        "average_price": "0",
+        "average_user_price": "0",
+        "commission": "0",
+        "user_commission": "0",
+        "user_gain": "0",
+        "created_at": "2023-01-01T00:00:00.000000Z",
+        "activated_at": "2023-01-01T00:00:00.000000Z",
+        "state": "active",
+        "req_to_cancel": False,
+        "info": {},
+        "closed_at": None,
+        "external_address": "",
+    }
+
+
+def _wallet(index: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": index,
+        "currency": _currency(index),
+        "balance": "100.0",
+        "frozen": "0.0",
+        "total": "100.0",
+        "value": "0",
+        "value_frozen": "0",
+        "value_total": "0",
+        "usdt_value": "0",
+        "usdt_value_frozen": "0",
+        "usdt_value_total": "0",
+        "address": "",
+        "inviter_commission": "0",
+        "service": "",
+        "daily_withdraw": "0",
+    }
+
+
+def _user_trade(index: int) -> t.Dict[str, t.Any]:
+    return {
+        "id": index,
+        "exchanged1": "0.1",
+        "exchanged2": "100000",
+        "price": "1000000",
+        "market": _market(1),
+        "created_at": "2023-01-01T00:00:00.000000Z",
+        "type": "buy",
+        "commission": "0",
+        "user_type": "buy",
+        "user_gain": "0.1",
+    }
+
+
+def _page(base_url: str, path: str, items: t.List[t.Any], page: int) -> t.Dict[str, t.Any]:
+    return {
+        "count": len(items) * PAGE_COUNT,
+        "next": f"{base_url}{path}?page={page + 1}" if page < PAGE_COUNT else None,
+        "previous": f"{base_url}{path}?page={page - 1}" if page > 1 else None,
+        "results": items,
+    }
+
+
+def create_app(latency: float = 0.0, payload_size: int = 20) -> web.Application:
+    """
+    Create the stand-in application.
+
+    Args:
+        latency (float): Seconds to wait before answering each request.
+        payload_size (int): Number of items in list responses (orderbook, matches, orders, pages, ...).
+
+    Returns:
+        web.Application: Application.
+    """
+
+    encoded: t.Dict[str, bytes] = {}
+
+    def cache(key: str, factory: t.Callable[[], t.Any]) -> bytes:
+        if key not in encoded:
+            encoded[key] = json.dumps(factory()).encode()
+        return encoded[key]
+
+    def respond(body: bytes) -> web.Response:
+        return web.Response(body=body, content_type="application/json")
+
+    async def delay() -> None:
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def login(_: web.Request) -> web.Response:
+        await delay()
+        return respond(cache("login", lambda: {"refresh": "refresh-token", "access": "access-token"}))
+
+    async def refresh(_: web.Request) -> web.Response:
+        await delay()
+        return respond(cache("refresh", lambda: {"access": "access-token"}))
+
+    async def user_info(_: web.Request) -> web.Response:
+        await delay()
+        return respond(cache("info", lambda: {"user_identifier": "XXXXXXXX", "level": {"id": 1}}))
+
+    async def currencies(request: web.Request) -> web.Response:
+        await delay()
+        page = int(request.query.get("page", 1))
+        return respond(
+            cache(
+                f"currencies-{page}",
+                lambda: _page(
+                    f"{request.scheme}://{request.host}",
+                    request.path,
+                    [_currency(i) for i in range(payload_size)],
+                    page,
+                ),
+            )
+        )
+
+    async def markets(request: web.Request) -> web.Response:
+        await delay()
+        page = int(request.query.get("page", 1))
+        return respond(
+            cache(
+                f"markets-{page}",
+                lambda: _page(
+                    f"{request.scheme}://{request.host}",
+                    request.path,
+                    [_market(i) for i in range(payload_size)],
+                    page,
+                ),
+            )
+        )
+
+    async def wallets(_: web.Request) -> web.Response:
+        await delay()
+        return respond(
+            cache(
+                "wallets",
+                lambda: {
+                    "count": payload_size,
+                    "next": None,
+                    "previous": None,
+                    "results": [_wallet(i) for i in range(payload_size)],
+                },
+            )
+        )
+
+    async def orderbook(_: web.Request) -> web.Response:
+        await delay()
+        return respond(
+            cache(
+                "orderbook",
+                lambda: {
+                    "orders": [
+                        {"amount": "0.5", "price": str(1_000_000 + i), "remain": "0.5", "value": "500000"}
+                        for i in range(payload_size)
+                    ],
+                    "volume": "10",
+                },
+            )
+        )
+
+    async def matches(_: web.Request) -> web.Response:
+        await delay()
+        return respond(
+            cache(
+                "matches",
+                lambda: [
+                    {
+                        "time": 1_672_531_200.0 + i,
+                        "price": "1000000",
+                        "value": "100000",
+                        "match_amount": "0.1",
+                        "type": "buy",
+                        "match_id": f"m{i}",
+                    }
+                    for i in range(payload_size)
+                ],
+            )
+        )
+
+    async def user_orders(_: web.Request) -> web.Response:
+        await delay()
+        return respond(
+            cache(
+                "orders",
+                lambda: {
+                    "count": payload_size,
+                    "next": None,
+                    "previous": None,
+                    "results": [_order(i) for i in range(payload_size)],
+                },
+            )
+        )
+
+    async def create_order(request: web.Request) -> web.Response:
+        await request.read()
+        await delay()
+        return respond(cache("order", lambda: _order(1)))
+
+    async def cancel_order(request: web.Request) -> web.Response:
+        await delay()
+        return web.json_response({"status": "success", "id": request.match_info["order_id"]})
+
+    async def user_trades(_: web.Request) -> web.Response:
+        await delay()
+        return respond(
+            cache(
+                "user-trades",
+                lambda: {
+                    "count": payload_size,
+                    "next": None,
+                    "previous": None,
+                    "results": [_user_trade(i) for i in range(payload_size)],
+                },
+            )
+        )
+
+    app = web.Application()
+    app.router.add_post("/v1/usr/api/login/", login)
+    app.router.add_post("/v1/usr/refresh_token/", refresh)
+    app.router.add_get("/v1/usr/info/", user_info)
+    app.router.add_get("/v1/mkt/currencies/", currencies)
+    app.router.add_get("/v1/mkt/markets/", markets)
+    app.router.add_get("/v1/wlt/wallets/", wallets)
+    app.router.add_get("/{version:v[12]}/mth/actives/{market_id}/", orderbook)
+    app.router.add_get("/v1/mth/matches/{market_id}/", matches)
+    app.router.add_get("/v1/odr/orders/", user_orders)
+    app.router.add_post("/v1/odr/orders/", create_order)
+    app.router.add_delete("/v1/odr/orders/{order_id}/", cancel_order)
+    app.router.add_get("/v1/odr/matches/", user_trades)
+    return app
+
+
+def _serve(host: str, port: int, latency: float, payload_size: int) -> None:
+    web.run_app(create_app(latency, payload_size), host=host, port=port, print=None, access_log=None)
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]  # type: ignore[no-any-return]
+
+
+class ServerProcess:
+    """
+    Stand-in server running in a child process (so it does not compete with the client for the GIL).
+
+    Usage:
+        with ServerProcess(latency=0.001, payload_size=50) as url:
+            ...
+    """
+
+    def __init__(self, latency: float = 0.0, payload_size: int = 20, host: str = "127.0.0.1") -> None:
+        self.host = host
+        self.port = _free_port(host)
+        self.url = f"http://{host}:{self.port}"
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(host, self.port, latency, payload_size), daemon=True
+        )
+
+    def __enter__(self) -> str:
+        self._process.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.1):
+                    return self.url
+            except OSError:
+                time.sleep(0.05)
+        self._process.terminate()
+        raise RuntimeError("stand-in server did not start")
+
+    def __exit__(self, *_: t.Any) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--payload-size", type=int, default=20, help="items in list responses")
+    args = parser.parse_args()
+
+    _serve(args.host, args.port, args.latency, args.payload_size)
+
+
+if __name__ == "__main__":
+    main()
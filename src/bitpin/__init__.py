@@ -1,13 +1,35 @@
 """# Bitpin Python Library."""
 
-from .clients.async_client import AsyncClient
-from .clients.client import Client
+import importlib
+import typing as _t
+
+if _t.TYPE_CHECKING:  # pragma: no cover
+    from .clients.async_client import AsyncClient
+    from .clients.client import Client
 
 __all__ = [
     "AsyncClient",
     "Client",
 ]
 
+# Clients are imported on first access, so `Client` users don't load aiohttp and `AsyncClient` users don't load requests.
+_LAZY = {
+    "AsyncClient": ".clients.async_client",
+    "Client": ".clients.client",
+}
+
+
+def __getattr__(name: str) -> _t.Any:
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> _t.List[str]:
+    return sorted([*globals(), *__all__])
+
 
 # Meta
 __version__ = "0.0.11"
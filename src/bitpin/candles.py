@@ -0,0 +1,257 @@
+"""
+# Candles.
+
+OHLCV candles built from the trade stream.
+
+# Description.
+The API has no candle endpoint, so `CandleAggregator` builds OHLCV + VWAP bars from trades
+(e.g. the output of `get_recent_trades` or of a `TapePoller`) at several resolutions at once.
+
+Every market and resolution keeps its bars in a fixed-size NumPy ring buffer (`capacity` bars).
+A batch of trades is bucketed and reduced with vectorized `reduceat` calls; the first bucket is merged
+into the current (open) bar and the following ones are appended, so an update costs O(batch) whatever
+the length of the history, and memory is fixed per market.
+
+Trades older than the current bar of a resolution are counted in `late` and ignored.
+
+`numpy` (the `numpy` extra) is imported when the first `CandleAggregator` is created.
+
+# Example.
+```python
+aggregator = CandleAggregator(resolutions=(60, 300, 3600))
+TapePoller(client, [1, 2, 3]).run(aggregator.ingest)
+bars = aggregator.bars(1, 60)
+print(bars["close"][-1], bars["vwap"][-1])
+```
+"""
+
+import importlib
+
+from . import types as t
+
+DEFAULT_RESOLUTIONS = (60, 300, 3600)
+DEFAULT_CAPACITY = 1000
+
+FIELDS = ("time", "open", "high", "low", "close", "volume", "quote_volume", "trades")
+_TIME, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _QUOTE, _TRADES = range(len(FIELDS))
+
+
+def _numpy() -> t.t.Any:
+    try:
+        return importlib.import_module("numpy")
+    except ImportError as e:
+        raise ImportError("Candle aggregation requires numpy: pip install python-bitpin[numpy]") from e
+
+
+class _Series:
+    """Ring buffer of the bars of one market at one resolution."""
+
+    __slots__ = ("resolution", "capacity", "data", "head", "size", "late")
+
+    def __init__(self, numpy: t.t.Any, resolution: int, capacity: int) -> None:
+        self.resolution = resolution
+        self.capacity = capacity
+        self.data = numpy.zeros((capacity, len(FIELDS)), dtype=numpy.float64)
+        self.head = -1
+        self.size = 0
+        self.late = 0
+
+    def update(self, numpy: t.t.Any, times: t.t.Any, prices: t.t.Any, amounts: t.t.Any) -> None:
+        """Merge trades sorted by time."""
+
+        buckets = numpy.floor(times / self.resolution) * self.resolution
+        if self.size:
+            current = self.data[self.head]
+            keep = buckets >= current[_TIME]
+            if not keep.all():
+                self.late += int(keep.size - numpy.count_nonzero(keep))
+                buckets, prices, amounts = buckets[keep], prices[keep], amounts[keep]
+                if not buckets.size:
+                    return
+
+        starts = numpy.flatnonzero(numpy.concatenate(([True], buckets[1:] != buckets[:-1])))
+        ends = numpy.concatenate((starts[1:], [buckets.size])) - 1
+        bars = numpy.empty((starts.size, len(FIELDS)), dtype=numpy.float64)
+        bars[:, _TIME] = buckets[starts]
+        bars[:, _OPEN] = prices[starts]
+        bars[:, _HIGH] = numpy.maximum.reduceat(prices, starts)
+        bars[:, _LOW] = numpy.minimum.reduceat(prices, starts)
+        bars[:, _CLOSE] = prices[ends]
+        bars[:, _VOLUME] = numpy.add.reduceat(amounts, starts)
+        bars[:, _QUOTE] = numpy.add.reduceat(prices * amounts, starts)
+        bars[:, _TRADES] = ends - starts + 1
+
+        if self.size and bars[0, _TIME] == self.data[self.head, _TIME]:
+            current, first = self.data[self.head], bars[0]
+            current[_HIGH] = max(current[_HIGH], first[_HIGH])
+            current[_LOW] = min(current[_LOW], first[_LOW])
+            current[_CLOSE] = first[_CLOSE]
+            current[_VOLUME:] += first[_VOLUME:]
+            bars = bars[1:]
+
+        count = len(bars)
+        if not count:
+            return
+        if count > self.capacity:
+            bars = bars[-self.capacity :]  # noqa: E203
+            count = self.capacity
+        self.data[(self.head + 1 + numpy.arange(count)) % self.capacity] = bars
+        self.head = (self.head + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def ordered(self, numpy: t.t.Any) -> t.t.Any:
+        """Bars, oldest first."""
+
+        return self.data[(self.head - self.size + 1 + numpy.arange(self.size)) % self.capacity]
+
+
+class CandleAggregator:
+    """
+    Candle Aggregator.
+
+    Builds OHLCV + VWAP bars of many markets at several resolutions from their trades.
+
+    Attributes:
+        resolutions (tuple): Bar lengths in seconds.
+        capacity (int): Number of bars kept per market and resolution.
+    """
+
+    def __init__(self, resolutions: t.t.Iterable[int] = DEFAULT_RESOLUTIONS, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Constructor.
+
+        Args:
+            resolutions (list): Bar lengths in seconds.
+            capacity (int): Number of bars kept per market and resolution.
+
+        Raises:
+            ImportError: `numpy` is not installed.
+        """
+
+        self._numpy = _numpy()
+        self.resolutions = tuple(sorted(set(int(resolution) for resolution in resolutions)))
+        self.capacity = max(int(capacity), 1)
+        self._series: t.t.Dict[int, t.t.Dict[int, _Series]] = {}
+
+    @property
+    def markets(self) -> t.t.List[int]:
+        """
+        Markets with at least one trade.
+
+        Returns:
+            list: Market IDs.
+        """
+
+        return list(self._series)
+
+    def ingest(self, market_id: int, trades: t.t.Sequence[t.DictStrAny]) -> None:
+        """
+        Add trades shaped like `InnerTradeResponse` (`time`, `price` and `match_amount`).
+
+        Can be used as the handler of a `TapePoller`.
+
+        Args:
+            market_id (int): Market ID.
+            trades (list): Trades, in any order.
+        """
+
+        if not trades:
+            return
+
+        numpy = self._numpy
+        count = len(trades)
+        self.ingest_arrays(
+            market_id,
+            numpy.fromiter((trade["time"] for trade in trades), dtype=numpy.float64, count=count),
+            numpy.fromiter((trade["price"] for trade in trades), dtype=numpy.float64, count=count),
+            numpy.fromiter((trade["match_amount"] for trade in trades), dtype=numpy.float64, count=count),
+        )
+
+    def ingest_arrays(self, market_id: int, times: t.t.Any, prices: t.t.Any, amounts: t.t.Any) -> None:
+        """
+        Add trades given as arrays.
+
+        Args:
+            market_id (int): Market ID.
+            times (array): Epoch seconds.
+            prices (array): Prices.
+            amounts (array): Amounts (base currency).
+        """
+
+        numpy = self._numpy
+        times = numpy.asarray(times, dtype=numpy.float64)
+        prices = numpy.asarray(prices, dtype=numpy.float64)
+        amounts = numpy.asarray(amounts, dtype=numpy.float64)
+        if not times.size:
+            return
+
+        if times.size > 1 and (times[1:] < times[:-1]).any():
+            order = numpy.argsort(times, kind="stable")
+            times, prices, amounts = times[order], prices[order], amounts[order]
+
+        series = self._series.get(market_id)
+        if series is None:
+            series = self._series[market_id] = {
+                resolution: _Series(numpy, resolution, self.capacity) for resolution in self.resolutions
+            }
+        for item in series.values():
+            item.update(numpy, times, prices, amounts)
+
+    def bars(self, market_id: int, resolution: int) -> t.t.Dict[str, t.t.Any]:
+        """
+        Get the bars of a market, oldest first; the last one is the current (open) bar.
+
+        Args:
+            market_id (int): Market ID.
+            resolution (int): Bar length in seconds, one of `resolutions`.
+
+        Returns:
+            dict: Column arrays: `time` (bar start), `open`, `high`, `low`, `close`, `volume`,
+                `quote_volume`, `trades` and `vwap`. Intervals without trades have no bar (gaps are not
+                filled), so consecutive `time` values may be more than `resolution` apart.
+
+        Raises:
+            KeyError: Unknown market or resolution.
+        """
+
+        numpy = self._numpy
+        data = self._series[market_id][resolution].ordered(numpy)
+        bars = {name: data[:, index] for index, name in enumerate(FIELDS)}
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            bars["vwap"] = bars["quote_volume"] / bars["volume"]
+        return bars
+
+    def current(self, market_id: int, resolution: int) -> t.t.Optional[t.t.Dict[str, float]]:
+        """
+        Get the current (open) bar of a market.
+
+        Args:
+            market_id (int): Market ID.
+            resolution (int): Bar length in seconds, one of `resolutions`.
+
+        Returns:
+            dict: Bar fields and `vwap`, `None` if the market has no trade.
+        """
+
+        series = self._series.get(market_id, {}).get(resolution)
+        if series is None or not series.size:
+            return None
+
+        candle = {name: float(value) for name, value in zip(FIELDS, series.data[series.head])}
+        candle["vwap"] = candle["quote_volume"] / candle["volume"] if candle["volume"] else float("nan")
+        return candle
+
+    def late(self, market_id: int, resolution: int) -> int:
+        """
+        Get the number of ignored trades (older than the current bar).
+
+        Args:
+            market_id (int): Market ID.
+            resolution (int): Bar length in seconds.
+
+        Returns:
+            int: Number of ignored trades.
+        """
+
+        series = self._series.get(market_id, {}).get(resolution)
+        return series.late if series is not None else 0
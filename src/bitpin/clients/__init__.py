@@ -7,13 +7,35 @@ See [API Reference](https://docs.bitpin.ir/) for more information.
 
 [Client](client) Submodule contains the synchronous client.
 [AsyncClient](async_client) Submodule contains the asynchronous client.
+[AsyncStreams](async_streams) Submodule contains the paginated streams of the asynchronous client.
 [Core](core) Submodule contains the core client.
 """
 
-from .async_client import AsyncClient
-from .client import Client
+import importlib
+import typing as _t
+
+if _t.TYPE_CHECKING:  # pragma: no cover
+    from .async_client import AsyncClient
+    from .client import Client
 
 __all__ = [
     "AsyncClient",
     "Client",
 ]
+
+_LAZY = {
+    "AsyncClient": ".async_client",
+    "Client": ".client",
+}
+
+
+def __getattr__(name: str) -> _t.Any:
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> _t.List[str]:
+    return sorted([*globals(), *__all__])
@@ -3,19 +3,38 @@
 # pylint: disable=invalid-overridden-method
 
 import asyncio
+import warnings
+
 import aiohttp
 
+from . import endpoints
+from .async_streams import AsyncStreamingClient
 from .core import CoreClient
 from .. import types as t
 from .. import enums
+from ..hedging import HedgePolicy
 from ..exceptions import (
     APIException,
+    DeadlineExceeded,
     RequestException,
 )
-from .._utils import get_loop
+from ..middleware import (
+    Middleware,
+    RequestContext,
+    run_async_middlewares,
+)
+from ..metrics import (
+    RequestTimings,
+    create_trace_config,
+)
+from ..scheduler import get_async_scheduler
+from ..timeouts import (
+    TimeoutProfile,
+    remaining,
+)
 
 
-class AsyncClient(CoreClient):
+class AsyncClient(AsyncStreamingClient):  # pylint: disable=too-many-instance-attributes
     """
     Async Client.
 
@@ -32,6 +51,8 @@ class AsyncClient(CoreClient):
         create_order: Create order.
         cancel_order: Cancel order.
         get_user_trades: Get user trades.
+        stream_user_orders: Stream user orders.
+        stream_user_trades: Stream user trades.
         close_connection: Close connection.
 
     Attributes:
@@ -41,9 +62,11 @@ class AsyncClient(CoreClient):
         api_secret (str): API secret.
         refresh_token (str): Refresh token.
         access_token (str): Access token.
+        metrics (RequestMetrics): Request metrics (`None` when disabled).
+        middlewares (list): Request/response middlewares.
     """
 
-    def __init__(  # type: ignore[no-untyped-def]
+    def __init__(  # type: ignore[no-untyped-def]  # pylint: disable=too-many-locals
         self,
         api_key: t.OptionalStr = None,
         api_secret: t.OptionalStr = None,
@@ -56,6 +79,12 @@ class AsyncClient(CoreClient):
         background_relogin_interval: int = 60 * 60 * 24 * 6,
         background_refresh_token: bool = False,
         background_refresh_token_interval: int = 60 * 13,
+        enable_metrics: bool = True,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        scheduler: t.t.Any = None,
+        session: t.t.Any = None,
+        timeouts: t.t.Optional[t.t.Dict[str, TimeoutProfile]] = None,
+        hedging: t.t.Optional[HedgePolicy] = None,
     ):
         """
         Constructor.
@@ -67,16 +96,25 @@ class AsyncClient(CoreClient):
             refresh_token (str): Refresh token.
             requests_params (dict): Requests params.
             session_params (dict): Session params.
-            loop (asyncio.AbstractEventLoop): Event loop.
+            loop (asyncio.AbstractEventLoop): Deprecated, the session is created on the running event loop.
             background_relogin (bool): Background refresh.
             background_relogin_interval (int): Background refresh interval.
             background_refresh_token (bool): Background refresh token.
             background_refresh_token_interval (int): Background refresh token interval.
+            enable_metrics (bool): Record per-endpoint request metrics in `metrics`.
+            middlewares (list): Request/response middlewares (see `bitpin.middleware`).
+            scheduler (Scheduler): Scheduler of the background jobs (see `bitpin.scheduler`).
+            session (aiohttp.ClientSession): Session shared with other clients, not closed by `close_connection`.
+            timeouts (dict): `TimeoutProfile` by endpoint name, overriding the endpoint defaults.
+            hedging (HedgePolicy): Hedge slow reads (see `bitpin.hedging`).
 
         Notes:
             If `api_key` and `api_secret` are not provided, they will be read from the environment variables
             `BITPIN_API_KEY` and `BITPIN_API_SECRET` respectively.
 
+            Without `access_token`, the client logs in with `api_key` and `api_secret` on its first signed request
+            (or when `login` is called), constructing a client makes no request.
+
             If `access_token` and `refresh_token` are not provided, they will be read from the environment variables
             `BITPIN_ACCESS_TOKEN` and `BITPIN_REFRESH_TOKEN` respectively.
 
@@ -89,9 +127,21 @@ class AsyncClient(CoreClient):
 
             If `background_refresh_token` is enabled, refresh token will be refreshed in background every
             `background_refresh_token_interval` seconds.
+
+            Background jobs run on `scheduler`, by default the scheduler shared by every client of the process.
+
+            With `hedging`, GETs of its endpoints that are slower than its latency percentile are sent a second
+            time, within its budget, and the first response wins.
         """
 
-        self.loop = loop or get_loop()
+        if loop is not None:
+            warnings.warn(
+                "`loop` is deprecated, the session is created on the running event loop on first use",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        self.loop = loop
+        self.hedging = hedging
         self._session_params = session_params or {}
 
         super().__init__(
@@ -104,10 +154,35 @@ class AsyncClient(CoreClient):
             background_relogin_interval,
             background_refresh_token,
             background_refresh_token_interval,
+            enable_metrics,
+            middlewares,
+            scheduler,
+            session,
+            timeouts,
         )
 
+        self._idle: t.t.Optional[asyncio.Event] = None
+        self._login_task: t.t.Optional["asyncio.Future[t.t.Any]"] = None
+        self._started = False
+
+    async def __aenter__(self) -> "AsyncClient":
+        """
+        Enter the context, starting the background jobs.
+
+        Returns:
+            AsyncClient: Client.
+        """
+
+        self._start_background_jobs()
+        return self
+
+    async def __aexit__(self, *args: t.t.Any) -> None:
+        """Close the connection."""
+
+        await self.close_connection()
+
     @classmethod
-    async def create(  # type: ignore[no-untyped-def]
+    async def create(  # type: ignore[no-untyped-def]  # pylint: disable=too-many-locals
         cls,
         api_key: t.OptionalStr = None,
         api_secret: t.OptionalStr = None,
@@ -120,9 +195,15 @@ class AsyncClient(CoreClient):
         background_relogin_interval: int = 60 * 60 * 24 * 6,
         background_refresh_token: bool = False,
         background_refresh_token_interval: int = 60 * 13,
+        enable_metrics: bool = True,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        scheduler: t.t.Any = None,
+        session: t.t.Any = None,
+        timeouts: t.t.Optional[t.t.Dict[str, TimeoutProfile]] = None,
+        hedging: t.t.Optional[HedgePolicy] = None,
     ) -> "AsyncClient":
         """
-        Create AsyncClient.
+        Create AsyncClient, logging in right away and starting the background jobs once logged in.
 
         Args:
             api_key (str): API key.
@@ -136,9 +217,18 @@ class AsyncClient(CoreClient):
             background_relogin_interval (int): Background refresh interval.
             background_refresh_token (bool): Background refresh token.
             background_refresh_token_interval (int): Background refresh token interval.
+            enable_metrics (bool): Record per-endpoint request metrics in `metrics`.
+            middlewares (list): Request/response middlewares (see `bitpin.middleware`).
+            scheduler (Scheduler): Scheduler of the background jobs (see `bitpin.scheduler`).
+            session (aiohttp.ClientSession): Session shared with other clients, not closed by `close_connection`.
+            timeouts (dict): `TimeoutProfile` by endpoint name, overriding the endpoint defaults.
+            hedging (HedgePolicy): Hedge slow reads (see `bitpin.hedging`).
 
         Returns:
             AsyncClient: AsyncClient.
+
+        Raises:
+            APIException: Login failed (on any error the connection is closed and no background job is started).
         """
 
         self = cls(
@@ -153,9 +243,20 @@ class AsyncClient(CoreClient):
             background_relogin_interval,
             background_refresh_token,
             background_refresh_token_interval,
+            enable_metrics,
+            middlewares,
+            scheduler,
+            session,
+            timeouts,
+            hedging,
         )
 
-        await self._handle_login()
+        try:
+            await self._handle_login()
+        except BaseException:
+            await self.close_connection()
+            raise
+        self._start_background_jobs()
         return self
 
     def _init_session(self) -> aiohttp.ClientSession:
@@ -167,16 +268,32 @@ class AsyncClient(CoreClient):
 
         """
 
+        session_params = dict(self._session_params)
+        if self.metrics is not None:
+            session_params["trace_configs"] = [*session_params.get("trace_configs", []), create_trace_config()]
+
         session = aiohttp.ClientSession(
-            loop=self.loop,
             headers={
                 "Content-Type": "application/json",
                 "Accept": "application/json",
             },
-            **self._session_params,
+            **session_params,
         )
         return session
 
+    def _session_timeout(self, profile: TimeoutProfile) -> aiohttp.ClientTimeout:
+        """
+        Convert a timeout profile to the `timeout` argument of `aiohttp`.
+
+        Args:
+            profile (TimeoutProfile): Profile.
+
+        Returns:
+            aiohttp.ClientTimeout: Timeout.
+        """
+
+        return aiohttp.ClientTimeout(total=profile.total, connect=profile.connect, sock_read=profile.read)
+
     async def _get(  # type: ignore[no-untyped-def, override]
         self,
         path: str,
@@ -269,7 +386,12 @@ class AsyncClient(CoreClient):
         return await self._request(method, uri, signed, **kwargs)
 
     async def _request(  # type: ignore[no-untyped-def, override]
-        self, method: t.RequestMethods, uri: str, signed: bool, **kwargs
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        signed: bool,
+        endpoint: t.t.Optional[endpoints.Endpoint] = None,
+        **kwargs,
     ) -> t.DictStrAny:
         """
         Request.
@@ -278,17 +400,152 @@ class AsyncClient(CoreClient):
             method (RequestMethod): Method.
             uri (str): URI.
             signed (bool): Signed.
+            endpoint (Endpoint): Endpoint definition, if the request is made through the endpoint table.
             **kwargs: Kwargs.
 
         Returns:
             dict: Response.
         """
 
-        kwargs = self._get_request_kwargs(method, signed, **kwargs)
+        await self._begin(signed)
+        try:
+            kwargs = self._get_request_kwargs(method, signed, endpoint, **kwargs)
+
+            template = endpoint.template if endpoint is not None else None
+            if not self.middlewares:
+                return await self._send(method, uri, kwargs, None, template)
+
+            request = RequestContext(method, uri, signed, kwargs, template or self._endpoint_template(uri), endpoint)
+            return await run_async_middlewares(  # type: ignore[no-any-return]
+                self.middlewares, request, lambda _: self._send(_.method, _.uri, _.kwargs, _, _.endpoint)
+            )
+        except asyncio.TimeoutError as e:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded during {method.upper()} {uri}") from e
+            raise
+        finally:
+            self._end()
+
+    async def ensure_ready(self, signed: bool = True) -> None:
+        """
+        Make sure a request can be sent: the client is open and, for a signed request, logged in.
+
+        Args:
+            signed (bool): Whether the request is signed.
+
+        Raises:
+            RequestException: The client is closed.
+            APIException: Login failed.
+        """
+
+        self._check_open()
+        if self._needs_login(signed):
+            await self._handle_login()
+
+    async def _begin(self, signed: bool) -> None:
+        """Count a request in flight, starting the background jobs and logging in first if needed."""
+
+        self._check_open()
+        if not self._started:
+            self._start_background_jobs()
+        await self.ensure_ready(signed)
+        self._inflight += 1
+
+    def _end(self) -> None:
+        """Uncount a request in flight."""
+
+        self._inflight -= 1
+        if not self._inflight and self._idle is not None:
+            self._idle.set()
+
+    def _resume(self) -> None:
+        """Count a stream in flight again when its consumer resumes it."""
+
+        self._inflight += 1
+
+    def _after_fork(self) -> None:
+        """Forget the state inherited from the parent process, background jobs restart with the next request."""
+
+        super()._after_fork()
+        self._idle = None
+        self._login_task = None
+        self._started = False
+
+    async def _send(  # type: ignore[override]
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        kwargs: t.DictStrAny,
+        request: t.t.Optional[RequestContext] = None,
+        endpoint: t.OptionalStr = None,
+    ) -> t.DictStrAny:
+        """
+        Send a request and handle its response.
+
+        Args:
+            method (RequestMethod): Method.
+            uri (str): URI.
+            kwargs (dict): Session kwargs.
+            request (RequestContext): Middleware request context, if any.
+            endpoint (str): Endpoint template, derived from `uri` if not provided.
+
+        Returns:
+            dict: Response.
+        """
+
+        hedging = self.hedging
+        if hedging is None or endpoint is None or not hedging.applies(method, endpoint):
+            return await self._send_once(method, uri, kwargs, request, endpoint)
+        return await hedging.send(  # type: ignore[no-any-return]
+            endpoint, request, lambda own: self._send_once(method, uri, dict(kwargs), own, endpoint)
+        )
+
+    async def _send_once(
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        kwargs: t.DictStrAny,
+        request: t.t.Optional[RequestContext] = None,
+        endpoint: t.OptionalStr = None,
+    ) -> t.DictStrAny:
+        """
+        Send a request once and handle its response.
+
+        Args:
+            method (RequestMethod): Method.
+            uri (str): URI.
+            kwargs (dict): Session kwargs.
+            request (RequestContext): Middleware request context, if any.
+            endpoint (str): Endpoint template, derived from `uri` if not provided.
+
+        Returns:
+            dict: Response.
+        """
+
+        if self.metrics is None:
+            async with getattr(self.session, method)(uri, **kwargs) as response:
+                if request is not None:
+                    request.response = response
+                return await self._handle_response(response)
 
-        async with getattr(self.session, method)(uri, **kwargs) as response:
-            self.response = response  # pylint: disable=attribute-defined-outside-init
-            return await self._handle_response(response)
+        timings = kwargs["trace_request_ctx"] = RequestTimings()
+        status: t.t.Optional[t.t.Union[int, str]] = "error"
+        response = None
+        try:
+            async with getattr(self.session, method)(uri, **kwargs) as response:
+                if request is not None:
+                    request.response = response
+                status = response.status
+                return await self._handle_response(response)
+        except asyncio.CancelledError:
+            # e.g. the losing attempt of a hedged request: it did not fail and its latency is not a sample
+            status = None
+            raise
+        finally:
+            if status is not None:
+                bytes_in = response.content.total_bytes if response is not None else 0
+                self.metrics.observe(method, endpoint or self._endpoint_template(uri), status, timings, bytes_in)
 
     @staticmethod
     async def _handle_response(response: aiohttp.ClientResponse) -> t.DictStrAny:  # type: ignore[override]
@@ -316,36 +573,47 @@ class AsyncClient(CoreClient):
             raise RequestException(f"Invalid Response: {await response.text()}") from exc
 
     async def _background_relogin_task(self) -> None:  # type: ignore[override]
-        """Background relogin task."""
+        """Background relogin task, run every `background_relogin_interval` seconds."""
 
-        while True:
-            try:
-                await self.login()
-                await asyncio.sleep(self._background_relogin_interval)
-            except Exception:  # pylint: disable=broad-except
-                continue
+        await self.login()
 
     async def _background_refresh_token_task(self) -> None:  # type: ignore[override]
-        """Background refresh token task."""
+        """Background refresh token task, run every `background_refresh_token_interval` seconds, once logged in."""
 
-        while True:
-            try:
-                await self.refresh_access_token()
-                await asyncio.sleep(self._background_refresh_token_interval)
-            except Exception:  # pylint: disable=broad-except
-                continue
+        if self.refresh_token:
+            await self.refresh_access_token()
 
     async def _handle_login(self) -> None:  # type: ignore[override]
-        """Handle login."""
+        """Log in, once for concurrent requests needing it."""
 
-        if self.api_key and self.api_secret:
-            await self.login()
+        task = self._login_task
+        if task is None:
+            if not self._needs_login(True):
+                return
+            task = self._login_task = asyncio.ensure_future(self.login())
+            task.add_done_callback(self._login_done)
+        await asyncio.shield(task)
 
+    def _login_done(self, _: "asyncio.Future[t.t.Any]") -> None:
+        self._login_task = None
+
+    def _start_background_jobs(self) -> None:
+        """Schedule `background_relogin` and `background_refresh_token` jobs, must be called with a running loop."""
+
+        if self._started:
+            return
+        self._started = True
+        if not (self._background_relogin or self._background_refresh_token):
+            return
+
+        scheduler = self._scheduler or get_async_scheduler()
         if self._background_relogin:
-            self.loop.create_task(self._background_relogin_task())  # noqa
+            self._jobs.append(scheduler.schedule(self._background_relogin_task, self._background_relogin_interval))
 
         if self._background_refresh_token:
-            self.loop.create_task(self._background_refresh_token_task())  # noqa
+            self._jobs.append(
+                scheduler.schedule(self._background_refresh_token_task, self._background_refresh_token_interval)
+            )
 
     async def login(self, **kwargs) -> t.LoginResponse:  # type: ignore[no-untyped-def, override]
         """
@@ -361,8 +629,7 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#02c24a5326)
         """
 
-        kwargs["json"] = {"api_key": self.api_key, "secret_key": self.api_secret}
-        _: t.LoginResponse = await self._post(self.LOGIN_URL, **kwargs)  # type: ignore[assignment]
+        _: t.LoginResponse = await self._call(endpoints.LOGIN, kwargs, self.api_key, self.api_secret)
 
         self.refresh_token = _["refresh"]
         self.access_token = _["access"]
@@ -386,8 +653,9 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#9b81094f74)
         """
 
-        kwargs["json"] = {"refresh": refresh_token or self.refresh_token}
-        _: t.RefreshTokenResponse = await self._post(self.REFRESH_TOKEN_URL, **kwargs)  # type: ignore[assignment]
+        _: t.RefreshTokenResponse = await self._call(
+            endpoints.REFRESH_TOKEN, kwargs, refresh_token or self.refresh_token
+        )
 
         self.access_token = _["access"]
 
@@ -407,7 +675,7 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#5b3c85d79e)
         """
 
-        return await self._get(self.USER_INFO_URL, signed=True, **kwargs)
+        return await self._call(endpoints.USER_INFO, kwargs)  # type: ignore[no-any-return]
 
     async def get_currencies_info(  # type: ignore[no-untyped-def, override]
         self, page: int = 1, **kwargs
@@ -429,7 +697,7 @@ class AsyncClient(CoreClient):
             Rate limit: 10000/day or 200/minute if you are authenticated.
         """
 
-        return await self._get(self.CURRENCIES_LIST_URL.format(page), **kwargs)
+        return await self._call(endpoints.CURRENCIES, kwargs, page)  # type: ignore[no-any-return]
 
     async def get_markets_info(self, page: int = 1, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def, override]
         """
@@ -449,7 +717,7 @@ class AsyncClient(CoreClient):
             Rate limit: 10000/day or 200/minute if you are authenticated.
         """
 
-        return await self._get(self.MARKETS_LIST_URL.format(page), **kwargs)
+        return await self._call(endpoints.MARKETS, kwargs, page)  # type: ignore[no-any-return]
 
     async def get_wallets(self, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def, override]
         """
@@ -468,7 +736,7 @@ class AsyncClient(CoreClient):
             Rate limit: 10000/day.
         """
 
-        return await self._get(self.WALLETS_URL, signed=True, **kwargs)
+        return await self._call(endpoints.WALLETS, kwargs)  # type: ignore[no-any-return]
 
     async def get_orderbook(  # type: ignore[no-untyped-def, override]
         self,
@@ -490,9 +758,7 @@ class AsyncClient(CoreClient):
         References:
             [API Docs](https://docs.bitpin.ir/#ec7180fc0e)
         """
-        return await self._get(  # type: ignore[return-value]
-            self.ORDERBOOK_URL.format(market_id, str(type)), version=self.PUBLIC_API_VERSION_2, **kwargs
-        )
+        return await self._call(endpoints.ORDERBOOK, kwargs, market_id, type)  # type: ignore[no-any-return]
 
     async def get_recent_trades(  # type: ignore[no-untyped-def, override]
         self, market_id: int, **kwargs
@@ -511,7 +777,7 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#1dd63530b5)
         """
 
-        return await self._get(self.RECENT_TRADES_URL.format(market_id), **kwargs)  # type: ignore[return-value]
+        return await self._call(endpoints.RECENT_TRADES, kwargs, market_id)  # type: ignore[no-any-return]
 
     async def get_user_orders(  # type: ignore[no-untyped-def, override]
         self,
@@ -542,8 +808,9 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#8a7c2a2af5)
         """
 
-        kwargs["params"] = {k: str(v) for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return await self._get(self.ORDERS_URL, signed=True, **kwargs)  # type: ignore[return-value]
+        return await self._call(  # type: ignore[no-any-return]
+            endpoints.USER_ORDERS, kwargs, market_id, type, state, mode, identifier, page
+        )
 
     async def create_order(  # type: ignore[no-untyped-def, override]
         self,
@@ -582,8 +849,20 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#34b353d77b)
         """
 
-        kwargs["json"] = {k: v for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return await self._post(self.ORDERS_URL, signed=True, **kwargs)  # type: ignore[return-value]
+        return await self._call(  # type: ignore[no-any-return]
+            endpoints.CREATE_ORDER,
+            kwargs,
+            market,
+            amount1,
+            price,
+            mode,
+            type,
+            identifier,
+            price_limit,
+            price_stop,
+            price_limit_oco,
+            amount2,
+        )
 
     async def cancel_order(  # type: ignore[no-untyped-def, override]
         self, order_id: str, **kwargs
@@ -602,7 +881,7 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#3fe8d57657)
         """
 
-        return await self._delete(self.ORDERS_URL + f"{order_id}/", signed=True, **kwargs)  # type: ignore[return-value]
+        return await self._call(endpoints.CANCEL_ORDER, kwargs, order_id)  # type: ignore[no-any-return]
 
     async def get_user_trades(  # type: ignore[no-untyped-def, override]
         self,
@@ -627,10 +906,23 @@ class AsyncClient(CoreClient):
             [API Docs](https://docs.bitpin.ir/#3fe8d57657)
         """
 
-        kwargs["params"] = {k: str(v) for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return await self._get(self.USER_TRADES_URL, signed=True, **kwargs)
+        return await self._call(endpoints.USER_TRADES, kwargs, market_id, type, page)  # type: ignore[no-any-return]
+
+    async def close_connection(self, timeout: t.t.Optional[float] = None) -> None:  # type: ignore[override]
+        """
+        Cancel the background jobs, wait for the requests in flight and close the connection.
 
-    async def close_connection(self) -> None:  # type: ignore[override]
-        """Close connection."""
+        Args:
+            timeout (float): Seconds to wait for the requests in flight, `None` to wait until they complete.
+        """
 
-        await self.session.close()  # type: ignore[misc]
+        self._stop()
+        if self._inflight:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self._owns_session and self._session is not None:
+            await self._session.close()  # type: ignore[misc]
+        self._session = None
@@ -0,0 +1,185 @@
+"""
+# Bitpin Async Client Streams.
+
+Paginated streams of `AsyncClient`.
+
+# Description.
+`AsyncStreamingClient` holds the `stream_*` methods of `AsyncClient`: every page is requested in turn and its
+results are yielded as they are decoded from the socket (see `bitpin.streaming`).
+"""
+
+from abc import abstractmethod
+
+from . import endpoints
+from .core import CoreClient
+from .. import types as t
+from ..exceptions import APIException
+from ..metrics import RequestTimings
+from ..middleware import RequestContext
+from ..ratelimit import (
+    AsyncRateLimiter,
+    RateLimiter,
+)
+from ..streaming import ResultsParser, drain
+
+
+class AsyncStreamingClient(CoreClient):
+    """
+    Async Streaming Client.
+
+    Base of `AsyncClient` streaming the results of its paginated endpoints.
+
+    Methods:
+        stream_user_orders: Stream user orders.
+        stream_user_trades: Stream user trades.
+    """
+
+    @abstractmethod
+    async def _begin(self, signed: bool) -> None:
+        """Count a request in flight, starting the background jobs and logging in first if needed."""
+
+        raise NotImplementedError
+
+    def stream_user_orders(  # type: ignore[no-untyped-def, override]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        state: t.OptionalStr = None,
+        mode: t.OptionalStr = None,
+        identifier: t.OptionalStr = None,
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.AsyncIterator[t.DictStrAny]:
+        """
+        Stream user orders of all pages from `page` on.
+
+        Orders are yielded as soon as they are decoded from the socket, only one order is buffered at a time.
+
+        Args:
+            market_id (int): Market ID.
+            type (OrderTypes): Type.
+            state (str): State.
+            mode (str): Mode.
+            identifier (str): Identifier.
+            page (int): First page.
+            **kwargs: Kwargs.
+
+        Returns:
+            AsyncIterator: Orders.
+
+        Notes:
+            Middlewares are not applied to streamed requests, except rate limiters (every page takes a token).
+
+        References:
+            [API Docs](https://docs.bitpin.ir/#8a7c2a2af5)
+        """
+
+        return self._stream(endpoints.USER_ORDERS, kwargs, market_id, type, state, mode, identifier, page)
+
+    def stream_user_trades(  # type: ignore[no-untyped-def, override]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.AsyncIterator[t.DictStrAny]:
+        """
+        Stream user trades of all pages from `page` on.
+
+        Trades are yielded as soon as they are decoded from the socket, only one trade is buffered at a time.
+
+        Args:
+            market_id (int): Market ID.
+            type (OrderTypes): Type.
+            page (int): First page.
+            **kwargs: Kwargs.
+
+        Returns:
+            AsyncIterator: Trades.
+
+        Notes:
+            Middlewares are not applied to streamed requests, except rate limiters (every page takes a token).
+
+        References:
+            [API Docs](https://docs.bitpin.ir/#3fe8d57657)
+        """
+
+        return self._stream(endpoints.USER_TRADES, kwargs, market_id, type, page)
+
+    async def _stream(
+        self, endpoint: endpoints.Endpoint, kwargs: t.DictStrAny, *args: t.t.Any
+    ) -> t.t.AsyncIterator[t.DictStrAny]:
+        """
+        Stream the results of every page of a paginated endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint.
+            kwargs (dict): Session kwargs.
+            *args: Endpoint arguments of the first page.
+
+        Yields:
+            dict: Results.
+        """
+
+        next_args: t.t.Optional[t.t.List[t.t.Any]] = list(args)
+        while next_args is not None:
+            parser = ResultsParser()
+            async for item in self._stream_page(endpoint, dict(kwargs), next_args, parser):
+                yield item
+            next_args = self._next_page_args(endpoint, next_args, parser.envelope)
+
+    async def _stream_page(
+        self,
+        endpoint: endpoints.Endpoint,
+        kwargs: t.DictStrAny,
+        args: t.t.Sequence[t.t.Any],
+        parser: ResultsParser,
+    ) -> t.t.AsyncIterator[t.DictStrAny]:
+        """
+        Stream the results of a single page.
+
+        Args:
+            endpoint (Endpoint): Endpoint.
+            kwargs (dict): Session kwargs.
+            args (list): Endpoint arguments.
+            parser (ResultsParser): Parser, holds the page envelope (`next`, ...) once exhausted.
+
+        Yields:
+            dict: Results.
+
+        Raises:
+            APIException: API Exception.
+            RequestException: Request Exception.
+        """
+
+        path, payload = endpoint.prepare(args)
+        if payload is not None:
+            kwargs[endpoint.location] = payload
+        timings = RequestTimings()
+        status: t.t.Union[int, str] = "error"
+        response = None
+        await self._begin(endpoint.signed)
+        try:
+            kwargs = self._get_request_kwargs(endpoint.method, endpoint.signed, endpoint, **kwargs)
+            kwargs["trace_request_ctx"] = timings
+            request = RequestContext(
+                endpoint.method, self.api_url + path, endpoint.signed, kwargs, endpoint.template, endpoint
+            )
+            for middleware in self.middlewares:
+                # other middlewares are not applied to streams, every page still takes a rate-limit token
+                if isinstance(middleware, AsyncRateLimiter):
+                    await middleware.before_send(request)
+                elif isinstance(middleware, RateLimiter):
+                    middleware.before_send(request)
+            async with getattr(self.session, endpoint.method)(self.api_url + path, **kwargs) as response:
+                status = response.status
+                if not str(response.status).startswith("2"):
+                    raise APIException(response, response.status, await response.text())
+
+                async for item in drain(parser, response.content.iter_chunked(self.STREAM_CHUNK_SIZE), self._release):
+                    yield item
+        finally:
+            self._end()
+            if self.metrics is not None:
+                bytes_in = response.content.total_bytes if response is not None else 0
+                self.metrics.observe(endpoint.method, endpoint.template, status, timings, bytes_in)
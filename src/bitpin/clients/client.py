@@ -1,16 +1,30 @@
 """# Bitpin Client."""
 
-import time
-from threading import Thread
+import threading
+
 import requests
 
+from . import endpoints
 from .core import CoreClient
 from .. import types as t
 from .. import enums
+from ..metrics import RequestTimings
+from ..middleware import (
+    Middleware,
+    RequestContext,
+    run_middlewares,
+)
 from ..exceptions import (
     APIException,
+    DeadlineExceeded,
     RequestException,
 )
+from ..ratelimit import RateLimiter
+from ..streaming import ResultsParser
+from ..timeouts import (
+    TimeoutProfile,
+    remaining,
+)
 
 
 class Client(CoreClient):
@@ -30,6 +44,8 @@ class Client(CoreClient):
         create_order: Create order.
         cancel_order: Cancel order.
         get_user_trades: Get user trades.
+        stream_user_orders: Stream user orders.
+        stream_user_trades: Stream user trades.
         close_connection: Close connection.
 
     Attributes:
@@ -38,6 +54,8 @@ class Client(CoreClient):
         api_secret (str): API secret.
         refresh_token (str): Refresh token.
         access_token (str): Access token.
+        metrics (RequestMetrics): Request metrics (`None` when disabled).
+        middlewares (list): Request/response middlewares.
     """
 
     def __init__(  # type: ignore[no-untyped-def]
@@ -51,6 +69,11 @@ class Client(CoreClient):
         background_relogin_interval: int = 60 * 60 * 24 * 6,
         background_refresh_token: bool = False,
         background_refresh_token_interval: int = 60 * 13,
+        enable_metrics: bool = True,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        scheduler: t.t.Any = None,
+        session: t.t.Any = None,
+        timeouts: t.t.Optional[t.t.Dict[str, TimeoutProfile]] = None,
     ):
         """
         Constructor.
@@ -65,11 +88,19 @@ class Client(CoreClient):
             background_relogin_interval (int): Background refresh interval.
             background_refresh_token (bool): Background refresh token.
             background_refresh_token_interval (int): Background refresh token interval.
+            enable_metrics (bool): Record per-endpoint request metrics in `metrics`.
+            middlewares (list): Request/response middlewares (see `bitpin.middleware`).
+            scheduler (Scheduler): Scheduler of the background jobs (see `bitpin.scheduler`).
+            session (requests.Session): Session shared with other clients, not closed by `close_connection`.
+            timeouts (dict): `TimeoutProfile` by endpoint name, overriding the endpoint defaults.
 
         Notes:
             If `api_key` and `api_secret` are not provided, they will be read from the environment variables
             `BITPIN_API_KEY` and `BITPIN_API_SECRET` respectively.
 
+            Without `access_token`, the client logs in with `api_key` and `api_secret` on its first signed request
+            (or when `login` is called), constructing a client makes no request.
+
             If `access_token` and `refresh_token` are not provided, they will be read from the environment variables
             `BITPIN_ACCESS_TOKEN` and `BITPIN_REFRESH_TOKEN` respectively.
 
@@ -82,6 +113,8 @@ class Client(CoreClient):
 
             If `background_refresh_token` is enabled, refresh token will be refreshed in background every
             `background_refresh_token_interval` seconds.
+
+            Background jobs run on `scheduler`, by default the scheduler shared by every client of the process.
         """
 
         super().__init__(
@@ -94,9 +127,31 @@ class Client(CoreClient):
             background_relogin_interval,
             background_refresh_token,
             background_refresh_token_interval,
+            enable_metrics,
+            middlewares,
+            scheduler,
+            session,
+            timeouts,
         )
 
-        self._handle_login()
+        self._idle = threading.Condition()
+        self._login_lock = threading.Lock()
+        self._start_background_jobs()
+
+    def __enter__(self) -> "Client":
+        """
+        Enter the context.
+
+        Returns:
+            Client: Client.
+        """
+
+        return self
+
+    def __exit__(self, *args: t.t.Any) -> None:
+        """Close the connection."""
+
+        self.close_connection()
 
     def _init_session(self) -> requests.Session:
         """
@@ -112,6 +167,22 @@ class Client(CoreClient):
         session.headers["Accept"] = "application/json"
         return session
 
+    def _session_timeout(self, profile: TimeoutProfile) -> t.t.Tuple[t.OptionalFloat, t.OptionalFloat]:
+        """
+        Convert a timeout profile to the `timeout` argument of `requests`.
+
+        Args:
+            profile (TimeoutProfile): Profile.
+
+        Returns:
+            tuple: Connect and read timeouts, both capped by `total` (requests has no total timeout).
+        """
+
+        total = profile.total
+        connect = profile.connect if total is None or profile.connect is None else min(profile.connect, total)
+        read = profile.read if total is None or profile.read is None else min(profile.read, total)
+        return (total if connect is None else connect, total if read is None else read)
+
     def _get(  # type: ignore[no-untyped-def]
         self,
         path: str,
@@ -204,7 +275,12 @@ class Client(CoreClient):
         return self._request(method, uri, signed, **kwargs)
 
     def _request(  # type: ignore[no-untyped-def]
-        self, method: t.RequestMethods, uri: str, signed: bool, **kwargs
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        signed: bool,
+        endpoint: t.t.Optional[endpoints.Endpoint] = None,
+        **kwargs,
     ) -> t.DictStrAny:
         """
         Request.
@@ -213,17 +289,119 @@ class Client(CoreClient):
             method (RequestMethod): Method.
             uri (str): URI.
             signed (bool): Signed.
+            endpoint (Endpoint): Endpoint definition, if the request is made through the endpoint table.
             **kwargs: Kwargs.
 
         Returns:
             dict: Response.
         """
 
-        kwargs = self._get_request_kwargs(method, signed, **kwargs)
+        self._begin(signed)
+        try:
+            kwargs = self._get_request_kwargs(method, signed, endpoint, **kwargs)
+
+            template = endpoint.template if endpoint is not None else None
+            if not self.middlewares:
+                return self._send(method, uri, kwargs, None, template)
+
+            request = RequestContext(method, uri, signed, kwargs, template or self._endpoint_template(uri), endpoint)
+            return run_middlewares(  # type: ignore[no-any-return]
+                self.middlewares, request, lambda _: self._send(_.method, _.uri, _.kwargs, _, _.endpoint)
+            )
+        except requests.Timeout as e:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded during {method.upper()} {uri}") from e
+            raise
+        finally:
+            self._end()
+
+    def ensure_ready(self, signed: bool = True) -> None:
+        """
+        Make sure a request can be sent: the client is open and, for a signed request, logged in.
+
+        Args:
+            signed (bool): Whether the request is signed.
+
+        Raises:
+            RequestException: The client is closed.
+            APIException: Login failed.
+        """
+
+        self._check_open()
+        if self._needs_login(signed):
+            self._handle_login()
 
-        with getattr(self.session, method)(uri, **kwargs) as response:
-            self.response = response  # pylint: disable=attribute-defined-outside-init
-            return self._handle_response(response)
+    def _begin(self, signed: bool) -> None:
+        """Count a request in flight, logging in first if it needs to."""
+
+        self.ensure_ready(signed)
+        with self._idle:
+            self._inflight += 1
+
+    def _end(self) -> None:
+        """Uncount a request in flight."""
+
+        with self._idle:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.notify_all()
+
+    def _resume(self) -> None:
+        """Count a stream in flight again when its consumer resumes it."""
+
+        with self._idle:
+            self._inflight += 1
+
+    def _after_fork(self) -> None:
+        """Forget the state inherited from the parent process, including its locks."""
+
+        super()._after_fork()
+        self._idle = threading.Condition()
+        self._login_lock = threading.Lock()
+
+    def _send(
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        kwargs: t.DictStrAny,
+        request: t.t.Optional[RequestContext] = None,
+        endpoint: t.OptionalStr = None,
+    ) -> t.DictStrAny:
+        """
+        Send a request and handle its response.
+
+        Args:
+            method (RequestMethod): Method.
+            uri (str): URI.
+            kwargs (dict): Session kwargs.
+            request (RequestContext): Middleware request context, if any.
+            endpoint (str): Endpoint template, derived from `uri` if not provided.
+
+        Returns:
+            dict: Response.
+        """
+
+        if self.metrics is None:
+            with getattr(self.session, method)(uri, **kwargs) as response:
+                if request is not None:
+                    request.response = response
+                return self._handle_response(response)
+
+        timings = RequestTimings()
+        status: t.t.Union[int, str] = "error"
+        bytes_in = 0
+        try:
+            with getattr(self.session, method)(uri, **kwargs) as response:
+                if request is not None:
+                    request.response = response
+                status = response.status_code
+                timings.ttfb = response.elapsed.total_seconds()
+                timings.bytes_out = len(response.request.body or b"")
+                bytes_in = len(response.content)
+                return self._handle_response(response)
+        finally:
+            self.metrics.observe(method, endpoint or self._endpoint_template(uri), status, timings, bytes_in)
 
     @staticmethod
     def _handle_response(response: requests.Response) -> t.DictStrAny:  # type: ignore[override]
@@ -251,36 +429,39 @@ class Client(CoreClient):
             raise RequestException(f"Invalid Response: {response.text}") from exc
 
     def _handle_login(self) -> None:
-        """Handle login."""
+        """Log in, once for concurrent requests needing it."""
+
+        with self._login_lock:
+            if self._needs_login(True):
+                self.login()
+
+    def _start_background_jobs(self) -> None:
+        """Schedule `background_relogin` and `background_refresh_token` jobs."""
 
-        if self.api_key and self.api_secret:
-            self.login()
+        if not (self._background_relogin or self._background_refresh_token):
+            return
 
+        from ..scheduler import get_scheduler  # pylint: disable=import-outside-toplevel
+
+        scheduler = self._scheduler or get_scheduler()
         if self._background_relogin:
-            Thread(target=self._background_relogin_task, daemon=True).start()
+            self._jobs.append(scheduler.schedule(self._background_relogin_task, self._background_relogin_interval))
 
         if self._background_refresh_token:
-            Thread(target=self._background_refresh_token_task, daemon=True).start()
+            self._jobs.append(
+                scheduler.schedule(self._background_refresh_token_task, self._background_refresh_token_interval)
+            )
 
     def _background_relogin_task(self) -> None:
-        """Background relogin task."""
+        """Background relogin task, run every `background_relogin_interval` seconds."""
 
-        while True:
-            try:
-                self.login()
-                time.sleep(self._background_relogin_interval)
-            except Exception:  # pylint: disable=broad-except
-                continue
+        self.login()
 
     def _background_refresh_token_task(self) -> None:
-        """Background refresh token task."""
+        """Background refresh token task, run every `background_refresh_token_interval` seconds, once logged in."""
 
-        while True:
-            try:
-                self.refresh_access_token()
-                time.sleep(self._background_refresh_token_interval)
-            except Exception:  # pylint: disable=broad-except
-                continue
+        if self.refresh_token:
+            self.refresh_access_token()
 
     def login(self, **kwargs) -> t.LoginResponse:  # type: ignore[no-untyped-def]
         """
@@ -296,8 +477,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#02c24a5326)
         """
 
-        kwargs["json"] = {"api_key": self.api_key, "secret_key": self.api_secret}
-        _: t.LoginResponse = self._post(self.LOGIN_URL, **kwargs)  # type: ignore[assignment]
+        _: t.LoginResponse = self._call(endpoints.LOGIN, kwargs, self.api_key, self.api_secret)
 
         self.refresh_token = _["refresh"]
         self.access_token = _["access"]
@@ -321,8 +501,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#9b81094f74)
         """
 
-        kwargs["json"] = {"refresh": refresh_token or self.refresh_token}
-        _: t.RefreshTokenResponse = self._post(self.REFRESH_TOKEN_URL, **kwargs)  # type: ignore[assignment]
+        _: t.RefreshTokenResponse = self._call(endpoints.REFRESH_TOKEN, kwargs, refresh_token or self.refresh_token)
 
         self.access_token = _["access"]
 
@@ -342,7 +521,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#5b3c85d79e)
         """
 
-        return self._get(self.USER_INFO_URL, signed=True, **kwargs)
+        return self._call(endpoints.USER_INFO, kwargs)  # type: ignore[no-any-return]
 
     def get_currencies_info(self, page: int = 1, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def]
         """
@@ -362,7 +541,7 @@ class Client(CoreClient):
             Rate limit: 10000/day or 200/minute if you are authenticated.
         """
 
-        return self._get(self.CURRENCIES_LIST_URL.format(page), **kwargs)
+        return self._call(endpoints.CURRENCIES, kwargs, page)  # type: ignore[no-any-return]
 
     def get_markets_info(self, page: int = 1, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def]
         """
@@ -382,7 +561,7 @@ class Client(CoreClient):
             Rate limit: 10000/day or 200/minute if you are authenticated.
         """
 
-        return self._get(self.MARKETS_LIST_URL.format(page), **kwargs)
+        return self._call(endpoints.MARKETS, kwargs, page)  # type: ignore[no-any-return]
 
     def get_wallets(self, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def]
         """
@@ -401,7 +580,7 @@ class Client(CoreClient):
             Rate limit: 10000/day.
         """
 
-        return self._get(self.WALLETS_URL, signed=True, **kwargs)
+        return self._call(endpoints.WALLETS, kwargs)  # type: ignore[no-any-return]
 
     def get_orderbook(  # type: ignore[no-untyped-def]
         self,
@@ -424,7 +603,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#ec7180fc0e)
         """
 
-        return self._get(self.ORDERBOOK_URL.format(market_id, str(type)), **kwargs)  # type: ignore[return-value]
+        return self._call(endpoints.ORDERBOOK, kwargs, market_id, type)  # type: ignore[no-any-return]
 
     def get_recent_trades(self, market_id: int, **kwargs) -> t.TradeResponse:  # type: ignore[no-untyped-def]
         """
@@ -441,7 +620,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#1dd63530b5)
         """
 
-        return self._get(self.RECENT_TRADES_URL.format(market_id), **kwargs)  # type: ignore[return-value]
+        return self._call(endpoints.RECENT_TRADES, kwargs, market_id)  # type: ignore[no-any-return]
 
     def get_user_orders(  # type: ignore[no-untyped-def]
         self,
@@ -472,8 +651,9 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#8a7c2a2af5)
         """
 
-        kwargs["params"] = {k: str(v) for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return self._get(self.ORDERS_URL, signed=True, **kwargs)  # type: ignore[return-value]
+        return self._call(  # type: ignore[no-any-return]
+            endpoints.USER_ORDERS, kwargs, market_id, type, state, mode, identifier, page
+        )
 
     def create_order(  # type: ignore[no-untyped-def]
         self,
@@ -512,8 +692,20 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#34b353d77b)
         """
 
-        kwargs["json"] = {k: str(v) for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return self._post(self.ORDERS_URL, signed=True, **kwargs)  # type: ignore[return-value]
+        return self._call(  # type: ignore[no-any-return]
+            endpoints.CREATE_ORDER,
+            kwargs,
+            market,
+            amount1,
+            price,
+            mode,
+            type,
+            identifier,
+            price_limit,
+            price_stop,
+            price_limit_oco,
+            amount2,
+        )
 
     def cancel_order(self, order_id: str, **kwargs) -> t.CancelOrderResponse:  # type: ignore[no-untyped-def]
         """
@@ -530,7 +722,7 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#3fe8d57657)
         """
 
-        return self._delete(self.ORDERS_URL + f"{order_id}/", signed=True, **kwargs)  # type: ignore[return-value]
+        return self._call(endpoints.CANCEL_ORDER, kwargs, order_id)  # type: ignore[no-any-return]
 
     def get_user_trades(  # type: ignore[no-untyped-def]
         self,
@@ -555,10 +747,160 @@ class Client(CoreClient):
             [API Docs](https://docs.bitpin.ir/#3fe8d57657)
         """
 
-        kwargs["params"] = {k: str(v) for k, v in locals().items() if v is not None and k not in ("self", "kwargs")}
-        return self._get(self.USER_TRADES_URL, signed=True, **kwargs)
+        return self._call(endpoints.USER_TRADES, kwargs, market_id, type, page)  # type: ignore[no-any-return]
 
-    def close_connection(self) -> None:
-        """Close connection."""
+    def stream_user_orders(  # type: ignore[no-untyped-def]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        state: t.OptionalStr = None,
+        mode: t.OptionalStr = None,
+        identifier: t.OptionalStr = None,
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream user orders of all pages from `page` on.
+
+        Orders are yielded as soon as they are decoded from the socket, only one order is buffered at a time.
+
+        Args:
+            market_id (int): Market ID.
+            type (OrderTypes): Type.
+            state (str): State.
+            mode (str): Mode.
+            identifier (str): Identifier.
+            page (int): First page.
+            **kwargs: Kwargs.
+
+        Returns:
+            Iterator: Orders.
+
+        Notes:
+            Middlewares are not applied to streamed requests, except rate limiters (every page takes a token).
+
+        References:
+            [API Docs](https://docs.bitpin.ir/#8a7c2a2af5)
+        """
+
+        return self._stream(endpoints.USER_ORDERS, kwargs, market_id, type, state, mode, identifier, page)
+
+    def stream_user_trades(  # type: ignore[no-untyped-def]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream user trades of all pages from `page` on.
+
+        Trades are yielded as soon as they are decoded from the socket, only one trade is buffered at a time.
+
+        Args:
+            market_id (int): Market ID.
+            type (OrderTypes): Type.
+            page (int): First page.
+            **kwargs: Kwargs.
+
+        Returns:
+            Iterator: Trades.
+
+        Notes:
+            Middlewares are not applied to streamed requests, except rate limiters (every page takes a token).
+
+        References:
+            [API Docs](https://docs.bitpin.ir/#3fe8d57657)
+        """
+
+        return self._stream(endpoints.USER_TRADES, kwargs, market_id, type, page)
+
+    def _stream(self, endpoint: endpoints.Endpoint, kwargs: t.DictStrAny, *args: t.t.Any) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream the results of every page of a paginated endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint.
+            kwargs (dict): Session kwargs.
+            *args: Endpoint arguments of the first page.
+
+        Yields:
+            dict: Results.
+        """
+
+        next_args: t.t.Optional[t.t.List[t.t.Any]] = list(args)
+        while next_args is not None:
+            parser = ResultsParser()
+            yield from self._stream_page(endpoint, dict(kwargs), next_args, parser)
+            next_args = self._next_page_args(endpoint, next_args, parser.envelope)
+
+    def _stream_page(
+        self,
+        endpoint: endpoints.Endpoint,
+        kwargs: t.DictStrAny,
+        args: t.t.Sequence[t.t.Any],
+        parser: ResultsParser,
+    ) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream the results of a single page.
+
+        Args:
+            endpoint (Endpoint): Endpoint.
+            kwargs (dict): Session kwargs.
+            args (list): Endpoint arguments.
+            parser (ResultsParser): Parser, holds the page envelope (`next`, ...) once exhausted.
+
+        Yields:
+            dict: Results.
+
+        Raises:
+            APIException: API Exception.
+            RequestException: Request Exception.
+        """
+
+        path, payload = endpoint.prepare(args)
+        if payload is not None:
+            kwargs[endpoint.location] = payload
+        timings = RequestTimings()
+        status: t.t.Union[int, str] = "error"
+        bytes_in = 0
+        self._begin(endpoint.signed)
+        try:
+            kwargs = self._get_request_kwargs(endpoint.method, endpoint.signed, endpoint, **kwargs)
+            kwargs["stream"] = True
+            request = RequestContext(
+                endpoint.method, self.api_url + path, endpoint.signed, kwargs, endpoint.template, endpoint
+            )
+            for middleware in self.middlewares:
+                # other middlewares are not applied to streams, every page still takes a rate-limit token
+                if isinstance(middleware, RateLimiter):
+                    middleware.before_send(request)
+            with getattr(self.session, endpoint.method)(self.api_url + path, **kwargs) as response:
+                status = response.status_code
+                timings.ttfb = response.elapsed.total_seconds()
+                if not str(response.status_code).startswith("2"):
+                    raise APIException(response, response.status_code, response.text)
+
+                for chunk in response.iter_content(self.STREAM_CHUNK_SIZE):
+                    bytes_in += len(chunk)
+                    yield from self._release(parser.feed(chunk))
+                yield from self._release(parser.close())
+        finally:
+            self._end()
+            if self.metrics is not None:
+                self.metrics.observe(endpoint.method, endpoint.template, status, timings, bytes_in)
+
+    def close_connection(self, timeout: t.t.Optional[float] = None) -> None:
+        """
+        Cancel the background jobs, wait for the requests in flight and close the connection.
+
+        Args:
+            timeout (float): Seconds to wait for the requests in flight, `None` to wait until they complete.
+        """
 
-        self.session.close()
+        self._stop()
+        with self._idle:
+            self._idle.wait_for(lambda: not self._inflight, timeout)
+        if self._owns_session and self._session is not None:
+            self._session.close()
+        self._session = None
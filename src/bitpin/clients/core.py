@@ -1,11 +1,39 @@
 """# Core Client."""
 
 import os
+import weakref
 from abc import (
     ABC,
     abstractmethod,
 )
+from . import endpoints
 from .. import types as t
+from ..exceptions import RequestException
+from ..metrics import (
+    RequestMetrics,
+    endpoint_template,
+)
+from ..middleware import (
+    Middleware,
+    RequestContext,
+)
+from ..timeouts import (
+    TimeoutProfile,
+    check as check_deadline,
+)
+
+_clients: "weakref.WeakSet[CoreClient]" = weakref.WeakSet()
+
+
+def _after_fork_in_child() -> None:
+    """Reset the clients inherited by a forked child process."""
+
+    for client in list(_clients):
+        client._after_fork()  # pylint: disable=protected-access
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
@@ -17,17 +45,18 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
     PUBLIC_API_VERSION_2 = "v2"
 
     REQUEST_TIMEOUT: float = 10
-
-    LOGIN_URL = "usr/api/login/"
-    REFRESH_TOKEN_URL = "usr/refresh_token/"
-    USER_INFO_URL = "usr/info/"
-    CURRENCIES_LIST_URL = "mkt/currencies/?page={}"
-    MARKETS_LIST_URL = "mkt/markets/?page={}"
-    WALLETS_URL = "wlt/wallets/"
-    ORDERBOOK_URL = "mth/actives/{}/?type={}"
-    RECENT_TRADES_URL = "mth/matches/{}/"
-    ORDERS_URL = "odr/orders/"
-    USER_TRADES_URL = "odr/matches/?type={}"
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    LOGIN_URL = endpoints.LOGIN.path
+    REFRESH_TOKEN_URL = endpoints.REFRESH_TOKEN.path
+    USER_INFO_URL = endpoints.USER_INFO.path
+    CURRENCIES_LIST_URL = endpoints.CURRENCIES.path
+    MARKETS_LIST_URL = endpoints.MARKETS.path
+    WALLETS_URL = endpoints.WALLETS.path
+    ORDERBOOK_URL = endpoints.ORDERBOOK.path
+    RECENT_TRADES_URL = endpoints.RECENT_TRADES.path
+    ORDERS_URL = endpoints.USER_ORDERS.path
+    USER_TRADES_URL = endpoints.USER_TRADES.path
 
     def __init__(  # type: ignore[no-untyped-def]
         self,
@@ -40,6 +69,11 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
         background_relogin_interval: int = 60 * 60 * 24 * 6,
         background_refresh_token: bool = False,
         background_refresh_token_interval: int = 60 * 13,
+        enable_metrics: bool = True,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        scheduler: t.t.Any = None,
+        session: t.t.Optional[t.HttpSession] = None,
+        timeouts: t.t.Optional[t.t.Dict[str, TimeoutProfile]] = None,
     ):
         """
         Constructor.
@@ -54,11 +88,19 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
             background_relogin_interval (int): Background refresh interval.
             background_refresh_token (bool): Background refresh token.
             background_refresh_token_interval (int): Background refresh token interval.
+            enable_metrics (bool): Record per-endpoint request metrics in `metrics`.
+            middlewares (list): Request/response middlewares (see `bitpin.middleware`).
+            scheduler (Scheduler): Scheduler of the background jobs (see `bitpin.scheduler`).
+            session (t.Union[requests.Session, aiohttp.ClientSession]): Session to share with other clients.
+            timeouts (dict): `TimeoutProfile` by endpoint name, overriding the endpoint defaults.
 
         Notes:
             If `api_key` and `api_secret` are not provided, they will be read from the environment variables
             `BITPIN_API_KEY` and `BITPIN_API_SECRET` respectively.
 
+            Without `access_token`, the client logs in with `api_key` and `api_secret` on its first signed request
+            (or when `login` is called), constructing a client makes no request.
+
             If `access_token` and `refresh_token` are not provided, they will be read from the environment variables
             `BITPIN_ACCESS_TOKEN` and `BITPIN_REFRESH_TOKEN` respectively.
 
@@ -71,6 +113,32 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
 
             If `background_refresh_token` is enabled, refresh token will be refreshed in background every
             `background_refresh_token_interval` seconds.
+
+            Background jobs run on `scheduler`, by default the scheduler shared by every client of the process
+            (a single thread for `Client`, a single task per event loop for `AsyncClient`).
+
+            If `enable_metrics` is enabled, every request is recorded in `metrics` (see `bitpin.metrics`).
+            Assign a shared `RequestMetrics` instance to `metrics` to aggregate several clients.
+
+            `middlewares` are called in order around every request, they can be added or removed later
+            through the `middlewares` list.
+
+            If `session` is provided, requests go through it instead of a session of the client (e.g. to share
+            one connection pool between several accounts, see `bitpin.pool`); it is not closed by
+            `close_connection`. Otherwise the session is created on first use.
+
+            Requests use the timeout profile of their endpoint (see `bitpin.timeouts`), `timeouts` overrides it
+            by endpoint name; endpoints without profile use `REQUEST_TIMEOUT`. A `timeout` in `requests_params`
+            replaces the profile.
+
+            `close_connection` (or leaving the client's context manager) waits for the requests in flight,
+            then closes the session; the client can not be used afterwards. A stream is in flight only while it
+            reads from the connection, not while its consumer holds a result: a stream left partly read does not
+            block the drain, and resuming it after the client is closed raises `RequestException`.
+
+            In a child process forked after its creation, the client keeps its tokens but drops the session
+            (its sockets belong to the parent) and the background jobs of the parent; a new session is created
+            on first use (see `bitpin.fleet` to run clients in several processes).
         """
 
         self.api_key = api_key or os.environ.get("BITPIN_API_KEY")
@@ -82,12 +150,126 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
         self._background_relogin_interval = background_relogin_interval
         self._background_refresh_token = background_refresh_token
         self._background_refresh_token_interval = background_refresh_token_interval
+        self._scheduler = scheduler
+        self._jobs: t.t.List[t.t.Any] = []
 
         self._requests_params = requests_params
-        self.session = self._init_session()
+        self.timeouts: t.t.Dict[str, TimeoutProfile] = dict(timeouts or {})
+        self.metrics: t.t.Optional[RequestMetrics] = RequestMetrics() if enable_metrics else None
+        self.middlewares: t.t.List[Middleware] = list(middlewares or [])
+        self._owns_session = session is None
+        self._session = session
+        self._inflight = 0
+        self._closed = False
+        self._api_url: t.OptionalStr = None
+        _clients.add(self)
+
+    @property
+    def api_url(self) -> str:
+        """
+        API root of the client, `API_URL` unless set (e.g. to `Simulator.url`, see `bitpin.simulator`).
+
+        Returns:
+            str: API root.
+        """
+
+        return self._api_url or self.API_URL
 
-    def _get_request_kwargs(self, method: t.RequestMethods, signed: bool, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def]
-        kwargs["timeout"] = self.REQUEST_TIMEOUT
+    @api_url.setter
+    def api_url(self, api_url: t.OptionalStr) -> None:
+        self._api_url = api_url
+
+    @property
+    def session(self) -> t.HttpSession:
+        """
+        Session, created on first use.
+
+        Returns:
+            session (t.Union[requests.Session, aiohttp.ClientSession]): Session.
+        """
+
+        if self._session is None:
+            self._session = self._init_session()
+        return self._session
+
+    @session.setter
+    def session(self, session: t.HttpSession) -> None:
+        self._session = session
+
+    def _after_fork(self) -> None:
+        """Forget the session and the background jobs inherited from the parent process."""
+
+        self._session = None
+        self._owns_session = True
+        self._inflight = 0
+        self._jobs = []
+
+    def _needs_login(self, signed: bool) -> bool:
+        """Whether a request must log in first: it is signed and there is no access token but credentials."""
+
+        return signed and not self.access_token and bool(self.api_key and self.api_secret)
+
+    @abstractmethod
+    def _end(self) -> None:
+        """Uncount a request in flight."""
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def _resume(self) -> None:
+        """Count a stream in flight again when its consumer resumes it."""
+
+        raise NotImplementedError
+
+    def _release(self, items: t.t.Iterable[t.DictStrAny]) -> t.t.Generator[t.DictStrAny, None, None]:
+        """
+        Yield stream results, the stream is not in flight while its consumer holds a result.
+
+        A consumer that stops reading a stream (without closing it) then does not block `close_connection`;
+        resuming the stream once the client is closed raises `RequestException`.
+
+        Args:
+            items (list): Results.
+
+        Yields:
+            dict: Results.
+
+        Raises:
+            RequestException: The client was closed while the stream was suspended.
+        """
+
+        for item in items:
+            self._end()
+            try:
+                yield item
+            finally:
+                self._resume()
+            self._check_open()
+
+    def _stop(self) -> None:
+        """Reject the next requests and cancel the background jobs, the requests in flight go on."""
+
+        self._closed = True
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+
+    def _check_open(self) -> None:
+        """
+        Reject requests on a closed client.
+
+        Raises:
+            RequestException: The client is closed.
+        """
+
+        if self._closed:
+            raise RequestException("Client is closed")
+
+    def _get_request_kwargs(  # type: ignore[no-untyped-def]
+        self, method: t.RequestMethods, signed: bool, endpoint: t.t.Optional[endpoints.Endpoint] = None, **kwargs
+    ) -> t.DictStrAny:
+        left = check_deadline(endpoint.name if endpoint is not None else "request")
+        kwargs["timeout"] = self.request_timeout(endpoint, left)
 
         if self._requests_params:
             kwargs.update(self._requests_params)
@@ -111,6 +293,69 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
 
         return kwargs
 
+    def request_timeout(self, endpoint: t.t.Optional[endpoints.Endpoint], left: t.OptionalFloat = None) -> t.t.Any:
+        """
+        Get the `timeout` argument of the session for a request to an endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint, `None` for requests made outside the endpoint table.
+            left (float): Seconds left before the current deadline, the timeout does not outlive it.
+
+        Returns:
+            t.Any: Timeout (`(connect, read)` for requests, `aiohttp.ClientTimeout` for aiohttp).
+        """
+
+        profile = self._timeout_profile(endpoint)
+        return self._session_timeout(profile if left is None else profile.clamp(left))
+
+    def handle_response(self, response: t.HttpResponses) -> t.t.Any:
+        """
+        Handle the response of a request sent outside the client (e.g. by `bitpin.fastpath`).
+
+        Args:
+            response (t.Union[requests.Response, aiohttp.ClientResponse]): Response.
+
+        Returns:
+            dict: Response (awaitable with `AsyncClient`).
+
+        Raises:
+            APIException: API Exception.
+            RequestException: Request Exception.
+        """
+
+        return self._handle_response(response)
+
+    def _timeout_profile(self, endpoint: t.t.Optional[endpoints.Endpoint]) -> TimeoutProfile:
+        """
+        Get the timeout profile of an endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint, `None` for requests made outside the endpoint table.
+
+        Returns:
+            TimeoutProfile: `timeouts` entry, endpoint profile or `REQUEST_TIMEOUT`, in that order.
+        """
+
+        if endpoint is not None:
+            profile = self.timeouts.get(endpoint.name) or endpoint.timeout
+            if profile is not None:
+                return profile
+        return TimeoutProfile(total=self.REQUEST_TIMEOUT)
+
+    @abstractmethod
+    def _session_timeout(self, profile: TimeoutProfile) -> t.t.Any:
+        """
+        Convert a timeout profile to the `timeout` argument of the session.
+
+        Args:
+            profile (TimeoutProfile): Profile.
+
+        Returns:
+            t.Any: Timeout (`(connect, read)` for requests, `aiohttp.ClientTimeout` for aiohttp).
+        """
+
+        raise NotImplementedError
+
     @staticmethod
     def _pick(response: t.DictStrAny, key: str, value: t.t.Any, result_key: str = "results") -> t.DictStrAny:
         for _ in response.get(result_key, []):
@@ -120,7 +365,71 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
         raise ValueError(f"{key} {value} not found in {response}")
 
     def _create_api_uri(self, path: str, version: str = PUBLIC_API_VERSION_1) -> str:
-        return self.API_URL + "/" + str(version) + "/" + path
+        return self.api_url + "/" + str(version) + "/" + path
+
+    def _endpoint_template(self, uri: str) -> str:
+        offset = len(self.api_url) + 1
+        return endpoint_template(uri[offset:])
+
+    def _call(self, endpoint: endpoints.Endpoint, kwargs: t.DictStrAny, *args: t.t.Any) -> t.t.Any:
+        """
+        Call an endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint.
+            kwargs (dict): Session kwargs, the endpoint payload is set in `kwargs[endpoint.location]`.
+            *args: Values of the endpoint `path_params` followed by its `params`.
+
+        Returns:
+            t.Any: Response (awaitable for `AsyncClient`).
+        """
+
+        path, payload = endpoint.prepare(args)
+        if payload is not None:
+            kwargs[endpoint.location] = payload
+        return self._request(endpoint.method, self.api_url + path, endpoint.signed, endpoint, **kwargs)
+
+    @staticmethod
+    def _next_page_args(
+        endpoint: endpoints.Endpoint, args: t.t.Sequence[t.t.Any], envelope: t.DictStrAny
+    ) -> t.t.Optional[t.t.List[t.t.Any]]:
+        """
+        Get the arguments of the next page of a paginated endpoint.
+
+        Args:
+            endpoint (Endpoint): Endpoint with a `page` parameter.
+            args (list): Arguments of the current page.
+            envelope (dict): Top-level keys of the current page (`next`, ...).
+
+        Returns:
+            list: Arguments of the next page, `None` on the last page.
+        """
+
+        if not envelope.get("next"):
+            return None
+        index = (endpoint.path_params + endpoint.params).index("page")
+        args = list(args)
+        args[index] = int(args[index] or 1) + 1
+        return args
+
+    def call(self, name: str, **kwargs: t.t.Any) -> t.t.Any:
+        """
+        Call an endpoint of the endpoint table by name.
+
+        Args:
+            name (str): Endpoint name (see `bitpin.clients.endpoints.ENDPOINTS`).
+            **kwargs: Endpoint parameters and session kwargs.
+
+        Returns:
+            t.Any: Response (awaitable for `AsyncClient`).
+
+        Raises:
+            KeyError: Unknown endpoint.
+            TypeError: A required parameter is missing.
+        """
+
+        endpoint = endpoints.ENDPOINTS[name]
+        return self._call(endpoint, kwargs, *endpoint.bind(kwargs))
 
     @abstractmethod
     def _init_session(self) -> t.HttpSession:
@@ -210,7 +519,14 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
         raise NotImplementedError
 
     @abstractmethod
-    def _request(self, method: t.RequestMethods, uri: str, signed: bool, **kwargs) -> t.DictStrAny:  # type: ignore[no-untyped-def]
+    def _request(  # type: ignore[no-untyped-def]
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        signed: bool,
+        endpoint: t.t.Optional[endpoints.Endpoint] = None,
+        **kwargs,
+    ) -> t.DictStrAny:
         """
         Request.
 
@@ -218,6 +534,7 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
             method (str): Method (GET, POST, PUT, DELETE).
             uri (str): URI.
             signed (bool): Signed.
+            endpoint (Endpoint): Endpoint definition, if the request is made through the endpoint table.
             **kwargs: Kwargs.
 
         Returns:
@@ -226,6 +543,31 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
 
         raise NotImplementedError
 
+    @abstractmethod
+    def _send(
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        kwargs: t.DictStrAny,
+        request: t.t.Optional[RequestContext] = None,
+        endpoint: t.OptionalStr = None,
+    ) -> t.DictStrAny:
+        """
+        Send a request and handle its response.
+
+        Args:
+            method (str): Method (GET, POST, PUT, DELETE).
+            uri (str): URI.
+            kwargs (dict): Session kwargs.
+            request (RequestContext): Middleware request context, if any.
+            endpoint (str): Endpoint template, derived from `uri` if not provided.
+
+        Returns:
+            dict: Response.
+        """
+
+        raise NotImplementedError
+
     @staticmethod
     @abstractmethod
     def _handle_response(response: t.HttpResponses) -> t.DictStrAny:
@@ -243,19 +585,19 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
 
     @abstractmethod
     def _handle_login(self) -> None:
-        """Handle login."""
+        """Log in, once for concurrent requests needing it."""
 
         raise NotImplementedError
 
     @abstractmethod
     def _background_relogin_task(self) -> None:
-        """Background relogin task."""
+        """Background relogin task, run every `background_relogin_interval` seconds."""
 
         raise NotImplementedError
 
     @abstractmethod
     def _background_refresh_token_task(self) -> None:
-        """Background refresh token task."""
+        """Background refresh token task, run every `background_refresh_token_interval` seconds."""
 
         raise NotImplementedError
 
@@ -464,7 +806,62 @@ class CoreClient(ABC):  # pylint: disable=too-many-instance-attributes
         raise NotImplementedError
 
     @abstractmethod
-    def close_connection(self) -> None:
-        """Close connection."""
+    def stream_user_orders(  # type: ignore[no-untyped-def]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        state: t.OptionalStr = None,
+        mode: t.OptionalStr = None,
+        identifier: t.OptionalStr = None,
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream user orders of all pages from `page` on.
+
+        Args:
+            market_id (int): Market ID.
+            type (str): Type.
+            state (str): State.
+            mode (str): Mode.
+            identifier (str): Identifier.
+            page (int): First page.
+
+        Returns:
+            Iterator: Orders.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_user_trades(  # type: ignore[no-untyped-def]
+        self,
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+        page: int = 1,
+        **kwargs,
+    ) -> t.t.Iterator[t.DictStrAny]:
+        """
+        Stream user trades of all pages from `page` on.
+
+        Args:
+            market_id (int): Market ID.
+            type (str): Type.
+            page (int): First page.
+
+        Returns:
+            Iterator: Trades.
+        """
+
+        raise NotImplementedError
+
+    @abstractmethod
+    def close_connection(self, timeout: t.t.Optional[float] = None) -> None:
+        """
+        Close connection.
+
+        Args:
+            timeout (float): Seconds to wait for the requests in flight, `None` to wait until they complete.
+        """
 
         raise NotImplementedError
@@ -0,0 +1,310 @@
+"""
+# Endpoints.
+
+Declarative table of the Bitpin API endpoints.
+
+# Description.
+Every endpoint is described once (path template, version, method, whether it is signed, its parameters,
+rate-limit class, timeout profile and cacheability) and shared by `Client` and `AsyncClient`: their methods are thin wrappers
+that pass their arguments to `CoreClient._call`, which builds the request from the endpoint definition.
+
+URL builders and parameter encoders are precompiled when the table is built, so a call costs
+one `str.format` (or none for static paths) and one dict comprehension over the declared parameters.
+
+New endpoints added to `ENDPOINTS` can be called right away with `client.call(name, **params)`.
+"""
+
+from .. import types as t
+from .. import enums
+from ..timeouts import TimeoutProfile
+
+RATE_LIMIT_AUTH = "auth"
+RATE_LIMIT_PUBLIC = "public"
+RATE_LIMIT_PRIVATE = "private"
+RATE_LIMIT_ORDER = "order"
+
+# Orders must not wait behind a slow network, paginated listings may take longer to transfer
+TIMEOUT_ORDER = TimeoutProfile(connect=1.0, read=3.0, total=5.0)
+TIMEOUT_BULK = TimeoutProfile(connect=3.0, read=20.0, total=30.0)
+
+LOCATION_PARAMS = "params"
+LOCATION_JSON = "json"
+
+
+class Endpoint:  # pylint: disable=too-many-instance-attributes
+    """
+    Endpoint.
+
+    Attributes:
+        name (str): Name, key in `ENDPOINTS`.
+        method (RequestMethod): HTTP method.
+        path (str): Path template, `{}` placeholders are filled with `path_params` in order.
+        version (str): API version.
+        signed (bool): Whether the request needs the access token.
+        path_params (tuple): Names of the parameters formatted into the path.
+        params (tuple): Names of the parameters sent in `location`.
+        required (tuple): Names of the required `params`.
+        location (str): Where `params` are sent, `params` (query string) or `json` (body).
+        rate_limit (str): Rate-limit class, endpoints of the same class share a rate limit.
+        cacheable (bool): Whether responses may be cached.
+        timeout (TimeoutProfile): Timeout profile, `None` for the client's `REQUEST_TIMEOUT`.
+        template (str): Endpoint template used by metrics and middlewares (e.g. `v2/mth/actives/{}/?type={}`).
+    """
+
+    __slots__ = (
+        "name",
+        "method",
+        "path",
+        "version",
+        "signed",
+        "path_params",
+        "params",
+        "required",
+        "location",
+        "rate_limit",
+        "cacheable",
+        "timeout",
+        "template",
+        "_static",
+        "_format",
+        "_path_count",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        method: enums.RequestMethod,
+        path: str,
+        version: str = "v1",
+        signed: bool = False,
+        path_params: t.t.Tuple[str, ...] = (),
+        params: t.t.Tuple[str, ...] = (),
+        required: t.t.Tuple[str, ...] = (),
+        location: str = LOCATION_PARAMS,
+        rate_limit: str = RATE_LIMIT_PUBLIC,
+        cacheable: bool = False,
+        timeout: t.t.Optional[TimeoutProfile] = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            name (str): Name.
+            method (RequestMethod): HTTP method.
+            path (str): Path template.
+            version (str): API version.
+            signed (bool): Whether the request needs the access token.
+            path_params (tuple): Names of the parameters formatted into the path.
+            params (tuple): Names of the parameters sent in `location`.
+            required (tuple): Names of the required `params`.
+            location (str): Where `params` are sent, `params` (query string) or `json` (body).
+            rate_limit (str): Rate-limit class.
+            cacheable (bool): Whether responses may be cached.
+            timeout (TimeoutProfile): Timeout profile.
+        """
+
+        if path.count("{}") != len(path_params):
+            raise ValueError(f"{name}: {path} expects {path.count('{}')} path params, got {len(path_params)}")
+
+        self.name = name
+        self.method = method
+        self.path = path
+        self.version = version
+        self.signed = signed
+        self.path_params = path_params
+        self.params = params
+        self.required = required
+        self.location = location
+        self.rate_limit = rate_limit
+        self.cacheable = cacheable
+        self.timeout = timeout
+        self.template = f"{version}/{path}"
+
+        self._static = f"/{version}/{path}"
+        self._format = self._static.format
+        self._path_count = len(path_params)
+
+    def prepare(self, args: t.t.Sequence[t.t.Any]) -> t.t.Tuple[str, t.OptionalDictStrAny]:
+        """
+        Build the path and payload of a call.
+
+        Args:
+            args (list): Values of `path_params` followed by values of `params`, in declaration order.
+
+        Returns:
+            tuple: Path relative to the API URL (with leading slash) and payload (`None` if the endpoint has no params).
+        """
+
+        count = self._path_count
+        if not count:
+            path, values = self._static, args
+        elif not self.params:
+            return self._format(*args), None
+        else:
+            path, values = self._format(*args[:count]), args[count:]
+
+        if not self.params:
+            return path, None
+
+        return path, {name: str(value) for name, value in zip(self.params, values) if value is not None}
+
+    def bind(self, values: t.DictStrAny) -> t.t.List[t.t.Any]:
+        """
+        Pop the endpoint parameters from keyword arguments.
+
+        Args:
+            values (dict): Keyword arguments, endpoint parameters are removed from it.
+
+        Returns:
+            list: Arguments for `prepare`.
+
+        Raises:
+            TypeError: A required parameter is missing.
+        """
+
+        args = []
+        for name in self.path_params + self.params:
+            if name not in values and (name in self.path_params or name in self.required):
+                raise TypeError(f"{self.name}() missing required argument: {name!r}")
+            args.append(values.pop(name, None))
+        return args
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"Endpoint({self.name}: {str(self.method).upper()} {self.template})"
+
+
+LOGIN = Endpoint(
+    "login",
+    enums.RequestMethod.POST,
+    "usr/api/login/",
+    params=("api_key", "secret_key"),
+    required=("api_key", "secret_key"),
+    location=LOCATION_JSON,
+    rate_limit=RATE_LIMIT_AUTH,
+)
+REFRESH_TOKEN = Endpoint(
+    "refresh_token",
+    enums.RequestMethod.POST,
+    "usr/refresh_token/",
+    params=("refresh",),
+    required=("refresh",),
+    location=LOCATION_JSON,
+    rate_limit=RATE_LIMIT_AUTH,
+)
+USER_INFO = Endpoint(
+    "user_info",
+    enums.RequestMethod.GET,
+    "usr/info/",
+    signed=True,
+    rate_limit=RATE_LIMIT_PRIVATE,
+)
+CURRENCIES = Endpoint(
+    "currencies",
+    enums.RequestMethod.GET,
+    "mkt/currencies/?page={}",
+    path_params=("page",),
+    cacheable=True,
+    timeout=TIMEOUT_BULK,
+)
+MARKETS = Endpoint(
+    "markets",
+    enums.RequestMethod.GET,
+    "mkt/markets/?page={}",
+    path_params=("page",),
+    cacheable=True,
+    timeout=TIMEOUT_BULK,
+)
+WALLETS = Endpoint(
+    "wallets",
+    enums.RequestMethod.GET,
+    "wlt/wallets/",
+    signed=True,
+    rate_limit=RATE_LIMIT_PRIVATE,
+)
+ORDERBOOK = Endpoint(
+    "orderbook",
+    enums.RequestMethod.GET,
+    "mth/actives/{}/?type={}",
+    version="v2",
+    path_params=("market_id", "type"),
+)
+RECENT_TRADES = Endpoint(
+    "recent_trades",
+    enums.RequestMethod.GET,
+    "mth/matches/{}/",
+    path_params=("market_id",),
+)
+USER_ORDERS = Endpoint(
+    "user_orders",
+    enums.RequestMethod.GET,
+    "odr/orders/",
+    signed=True,
+    params=("market_id", "type", "state", "mode", "identifier", "page"),
+    rate_limit=RATE_LIMIT_PRIVATE,
+    timeout=TIMEOUT_BULK,
+)
+CREATE_ORDER = Endpoint(
+    "create_order",
+    enums.RequestMethod.POST,
+    "odr/orders/",
+    signed=True,
+    params=(
+        "market",
+        "amount1",
+        "price",
+        "mode",
+        "type",
+        "identifier",
+        "price_limit",
+        "price_stop",
+        "price_limit_oco",
+        "amount2",
+    ),
+    required=("market", "amount1", "price", "mode", "type"),
+    location=LOCATION_JSON,
+    rate_limit=RATE_LIMIT_ORDER,
+    timeout=TIMEOUT_ORDER,
+)
+CANCEL_ORDER = Endpoint(
+    "cancel_order",
+    enums.RequestMethod.DELETE,
+    "odr/orders/{}/",
+    signed=True,
+    path_params=("order_id",),
+    rate_limit=RATE_LIMIT_ORDER,
+    timeout=TIMEOUT_ORDER,
+)
+USER_TRADES = Endpoint(
+    "user_trades",
+    enums.RequestMethod.GET,
+    "odr/matches/",
+    signed=True,
+    params=("market_id", "type", "page"),
+    rate_limit=RATE_LIMIT_PRIVATE,
+    timeout=TIMEOUT_BULK,
+)
+
+ENDPOINTS: t.t.Dict[str, Endpoint] = {
+    endpoint.name: endpoint
+    for endpoint in (
+        LOGIN,
+        REFRESH_TOKEN,
+        USER_INFO,
+        CURRENCIES,
+        MARKETS,
+        WALLETS,
+        ORDERBOOK,
+        RECENT_TRADES,
+        USER_ORDERS,
+        CREATE_ORDER,
+        CANCEL_ORDER,
+        USER_TRADES,
+    )
+}
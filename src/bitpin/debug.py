@@ -0,0 +1,274 @@
+"""
+# Debug.
+
+Bounded capture of recent requests for debugging.
+
+# Description.
+`DebugCapture` is a middleware that keeps the metadata of the last `size` requests of a client in a ring buffer:
+method, URL, status, duration, response headers, error and, if `body_bytes` is set, the request payload and
+the result (or error text) truncated to `body_bytes`. Responses themselves are never retained, so memory is
+capped at about `size` entries of metadata plus `2 * body_bytes` each, whatever the size of the payloads.
+
+Every entry is tagged with the thread and the asyncio task that made the request: `last` and `recent` with
+`mine=True` only see the requests of the caller, so concurrent calls can not hide each other's entries. Entries
+never contain the `Authorization` header.
+"""
+
+import asyncio
+import collections
+import json
+import threading
+import time
+
+from . import types as t
+from .exceptions import APIException
+from .middleware import Middleware, RequestContext
+
+DEFAULT_SIZE = 50
+
+REDACTED_HEADERS = frozenset(("authorization", "cookie", "set-cookie"))
+
+
+def _owner() -> str:
+    """Get the name of the current thread and asyncio task, if any."""
+
+    name = threading.current_thread().name
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return f"{name}/{task.get_name()}" if task is not None else name
+
+
+def _truncate(value: t.t.Any, size: int) -> t.OptionalStr:
+    if not size or value is None:
+        return None
+    text: str
+    if isinstance(value, str):
+        text = value
+    else:
+        try:
+            text = json.dumps(value, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            text = repr(value)
+    return text if len(text) <= size else text[:size] + f"...[{len(text) - size} more]"
+
+
+class Capture:  # pylint: disable=too-many-instance-attributes
+    """
+    Capture.
+
+    Metadata of a request.
+
+    Attributes:
+        sent_at (float): Time (epoch) the request was sent.
+        owner (str): Thread (and asyncio task) that made the request.
+        method (str): HTTP method.
+        url (str): URL.
+        endpoint (str): Endpoint template.
+        attempt (int): Attempt number.
+        status (int): HTTP status, `None` if no response was received.
+        elapsed (float): Seconds until the result or the error.
+        headers (dict): Response headers, without cookies.
+        request_body (str): Truncated payload, `None` unless bodies are captured.
+        response_body (str): Truncated result, or error text, `None` unless bodies are captured.
+        error (str): Error, `None` on success.
+    """
+
+    __slots__ = (
+        "sent_at",
+        "owner",
+        "method",
+        "url",
+        "endpoint",
+        "attempt",
+        "status",
+        "elapsed",
+        "headers",
+        "request_body",
+        "response_body",
+        "error",
+    )
+
+    def __init__(self, request: RequestContext, started: float, body_bytes: int) -> None:
+        """
+        Constructor.
+
+        Args:
+            request (RequestContext): Request.
+            started (float): Time (monotonic) the request was sent.
+            body_bytes (int): Maximum length of the captured bodies, `0` to skip them.
+        """
+
+        self.elapsed = time.monotonic() - started
+        self.sent_at = time.time() - self.elapsed
+        self.owner = _owner()
+        self.method = str(request.method).upper()
+        self.url = request.uri
+        self.endpoint = request.endpoint
+        self.attempt = request.attempt
+        response = request.response
+        self.status: t.t.Optional[int] = None
+        self.headers: t.t.Dict[str, str] = {}
+        if response is not None:
+            self.status = getattr(response, "status_code", None) or getattr(response, "status", None)
+            self.headers = {k: v for k, v in response.headers.items() if k.lower() not in REDACTED_HEADERS}
+        payload = request.kwargs.get("json", request.kwargs.get("params"))
+        self.request_body = _truncate(payload, body_bytes)
+        self.response_body: t.OptionalStr = None
+        self.error: t.OptionalStr = None
+
+    def as_dict(self) -> t.DictStrAny:
+        """
+        Get the capture as a dict.
+
+        Returns:
+            dict: Capture.
+        """
+
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        outcome = self.error or self.status
+        return f"Capture({self.method} {self.url} -> {outcome} in {self.elapsed * 1000:.1f}ms, {self.owner})"
+
+
+class DebugCapture(Middleware):
+    """
+    Debug Capture.
+
+    Middleware keeping the metadata of recent requests, usable with `Client` and `AsyncClient`.
+
+    Attributes:
+        size (int): Maximum number of entries kept.
+        body_bytes (int): Maximum length of the captured request and response bodies, `0` to skip them.
+
+    Example:
+        ```python
+        capture = DebugCapture(size=100, body_bytes=512)
+        client = Client(api_key, api_secret, middlewares=[capture])
+        try:
+            client.create_order(...)
+        except APIException:
+            print(capture.last())
+        ```
+    """
+
+    def __init__(self, size: int = DEFAULT_SIZE, body_bytes: int = 0) -> None:
+        """
+        Constructor.
+
+        Args:
+            size (int): Maximum number of entries kept.
+            body_bytes (int): Maximum length of the captured request and response bodies, `0` to skip them.
+        """
+
+        self.size = size
+        self.body_bytes = body_bytes
+        self._entries: t.t.Deque[Capture] = collections.deque(maxlen=size)
+
+    def before_send(self, request: RequestContext) -> None:
+        """
+        Note the start of the request, which is always sent.
+
+        Args:
+            request (RequestContext): Request.
+        """
+
+        request.extra["debug_started"] = time.monotonic()
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:
+        """
+        Capture a result.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result, unchanged.
+        """
+
+        capture = self._capture(request)
+        if capture is not None:
+            capture.response_body = _truncate(result, self.body_bytes)
+        return result
+
+    def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:
+        """
+        Capture an error.
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            None: Always propagates the exception.
+        """
+
+        capture = self._capture(request)
+        if capture is not None:
+            capture.error = f"{type(exc).__name__}: {exc}"
+            if isinstance(exc, APIException):
+                capture.status = exc.status_code
+                capture.response_body = _truncate(exc.text, self.body_bytes)
+
+    def _capture(self, request: RequestContext) -> t.t.Optional[Capture]:
+        started = request.extra.pop("debug_started", None)
+        if started is None:
+            return None
+        capture = Capture(request, started, self.body_bytes)
+        self._entries.append(capture)
+        return capture
+
+    def recent(self, limit: t.t.Optional[int] = None, mine: bool = False) -> t.t.List[Capture]:
+        """
+        Get the recent captures, newest first.
+
+        Args:
+            limit (int): Maximum number of captures, all if `None`.
+            mine (bool): Only the captures of the current thread (and asyncio task).
+
+        Returns:
+            list: Captures.
+        """
+
+        owner = _owner() if mine else None
+        captures = [_ for _ in reversed(self._entries.copy()) if owner is None or _.owner == owner]
+        return captures[:limit] if limit is not None else captures
+
+    def last(self) -> t.t.Optional[Capture]:
+        """
+        Get the last capture of the current thread (and asyncio task).
+
+        Returns:
+            Capture: Capture, `None` if the caller made no captured request.
+        """
+
+        owner = _owner()
+        for capture in reversed(self._entries.copy()):
+            if capture.owner == owner:
+                return capture
+        return None
+
+    def clear(self) -> None:
+        """Drop every capture."""
+
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """
+        Number of captures.
+
+        Returns:
+            int: Number of captures.
+        """
+
+        return len(self._entries)
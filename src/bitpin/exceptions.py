@@ -16,15 +16,21 @@ class APIException(Exception):
     """
     API Exception.
 
+    Only the metadata of the response is kept, not the response itself (see `bitpin.debug` to capture recent
+    requests).
+
     Attributes:
         message (str): Message.
         result (t.Any): Result.
         status_code (int): Status code.
-        response (t.Union[requests.Response, aiohttp.ClientResponse]): Response.
-        request (t.Union[requests.PreparedRequest, aiohttp.ClientRequest]): Request.
+        method (str): HTTP method of the request.
         url (str): URL.
+        headers (dict): Response headers.
+        text (str): Response body, truncated to `MAX_TEXT` characters.
     """
 
+    MAX_TEXT = 2048
+
     def __init__(self, response: t.HttpResponses, status_code: int, text: str):
         """
         Constructor.
@@ -35,19 +41,23 @@ class APIException(Exception):
             text (str): Text.
         """
 
+        self.text = text if len(text) <= self.MAX_TEXT else text[: self.MAX_TEXT]
         try:
             json_res = json.loads(text)
         except ValueError:
-            self.message = f"Invalid JSON error message from Bitpin: {response.text}"
+            self.message = f"Invalid JSON error message from Bitpin: {self.text}"
             self.result = None
         else:
+            json_res = json_res if isinstance(json_res, dict) else {}
             self.message = json_res.get("detail", "Unknown error")
             self.result = json_res.get("result")
 
+        request = getattr(response, "request", None) or getattr(response, "request_info", None)
+        url = getattr(response, "url", None)
         self.status_code = status_code
-        self.response = response
-        self.request = getattr(response, "request", None)
-        self.url = getattr(response, "url", None)
+        self.method = getattr(request, "method", None) or getattr(response, "method", None)
+        self.url = str(url) if url is not None else None
+        self.headers = dict(getattr(response, "headers", None) or {})
 
     def __str__(self) -> str:
         """
@@ -87,3 +97,92 @@ class RequestException(Exception):
         """
 
         return f"RequestException: {self.message}"
+
+
+class OrderValidationException(RequestException):
+    """
+    Order Validation Exception.
+
+    Raised before sending an order that would be rejected by Bitpin.
+
+    Attributes:
+        message (str): Message.
+        field (str): Invalid argument of `create_order`.
+    """
+
+    def __init__(self, message: str, field: t.OptionalStr = None):
+        """
+        Constructor.
+
+        Args:
+            message (str): Message.
+            field (str): Invalid argument of `create_order`.
+        """
+
+        super().__init__(message)
+        self.field = field
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        Returns:
+            str: String representation.
+        """
+
+        return f"OrderValidationException({self.field}): {self.message}"
+
+
+class DeadlineExceeded(RequestException):
+    """
+    Deadline Exceeded.
+
+    Raised when a call is made, or times out, after the deadline of `bitpin.timeouts.deadline`.
+
+    Attributes:
+        message (str): Message.
+    """
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        Returns:
+            str: String representation.
+        """
+
+        return f"DeadlineExceeded: {self.message}"
+
+
+class WorkerException(Exception):
+    """
+    Worker Exception.
+
+    Raised by `bitpin.fleet.Fleet` when a worker process failed.
+
+    Attributes:
+        message (str): Message, with the traceback of the worker.
+        worker (int): Index of the worker.
+    """
+
+    def __init__(self, message: str, worker: int):
+        """
+        Constructor.
+
+        Args:
+            message (str): Message.
+            worker (int): Index of the worker.
+        """
+
+        self.message = message
+        self.worker = worker
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        Returns:
+            str: String representation.
+        """
+
+        return f"WorkerException({self.worker}): {self.message}"
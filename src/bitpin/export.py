@@ -0,0 +1,450 @@
+"""
+# Export.
+
+Columnar export of orders and trades to CSV, Arrow and Parquet.
+
+# Description.
+`ColumnarWriter` converts API items (dicts with numbers encoded as strings) into typed columns and writes
+them in chunks of `chunk_size` rows, so memory is bounded by the chunk size whatever the number of rows.
+Combined with the `stream_*` methods of the clients, which never hold more than one item at a time,
+a full order or fill history is exported in constant memory without building a list of dicts first.
+
+| Format    | Suffix                         | Dependency      |
+|-----------|--------------------------------|-----------------|
+| `csv`     | `.csv`                         | -               |
+| `arrow`   | `.arrow`, `.feather`, `.ipc`   | `pyarrow`       |
+| `parquet` | `.parquet`, `.pq`              | `pyarrow`       |
+
+`pyarrow` (the `arrow` extra) is imported when the first Arrow/Parquet writer is created.
+
+Columns are described by `Column` (name, kind and source field, dotted for nested fields).
+`ORDER_COLUMNS`, `USER_TRADE_COLUMNS` and `RECENT_TRADE_COLUMNS` cover `get_user_orders`,
+`get_user_trades` and `get_recent_trades`. Decimal strings become `float64`, ISO-8601 and epoch times
+become UTC timestamps, missing and empty values become nulls.
+
+# Example.
+```python
+from bitpin.export import USER_TRADE_COLUMNS, export
+
+rows = export(client.stream_user_trades(market_id=1), "fills.parquet", USER_TRADE_COLUMNS)
+```
+"""
+
+import csv
+import datetime
+import importlib
+from pathlib import Path
+
+from . import types as t
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+INT = "int"
+FLOAT = "float"
+STRING = "string"
+BOOL = "bool"
+TIMESTAMP = "timestamp"
+
+FORMATS = {
+    ".csv": "csv",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+PathLike = t.t.Union[str, Path]
+
+
+def _to_int(value: t.t.Any) -> t.OptionalInt:
+    return None if value is None or value == "" else int(value)
+
+
+def _to_float(value: t.t.Any) -> t.t.Optional[float]:
+    return None if value is None or value == "" else float(value)
+
+
+def _to_string(value: t.t.Any) -> t.OptionalStr:
+    return None if value is None else str(value)
+
+
+def _to_bool(value: t.t.Any) -> t.t.Optional[bool]:
+    return None if value is None else bool(value)
+
+
+def _to_timestamp(value: t.t.Any) -> t.t.Optional[datetime.datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+_CONVERTERS: t.t.Dict[str, t.t.Callable[[t.t.Any], t.t.Any]] = {
+    INT: _to_int,
+    FLOAT: _to_float,
+    STRING: _to_string,
+    BOOL: _to_bool,
+    TIMESTAMP: _to_timestamp,
+}
+
+
+class Column:
+    """
+    Column.
+
+    Attributes:
+        name (str): Column name.
+        kind (str): `int`, `float`, `string`, `bool` or `timestamp`.
+        field (str): Source field, dotted for nested fields (e.g. `market.code`).
+    """
+
+    __slots__ = ("name", "kind", "field", "_keys", "_convert")
+
+    def __init__(self, name: str, kind: str = STRING, field: t.OptionalStr = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            name (str): Column name.
+            kind (str): `int`, `float`, `string`, `bool` or `timestamp`.
+            field (str): Source field, defaults to `name`.
+
+        Raises:
+            ValueError: Unknown kind.
+        """
+
+        if kind not in _CONVERTERS:
+            raise ValueError(f"Unknown column kind {kind!r}, expected one of {', '.join(_CONVERTERS)}")
+
+        self.name = name
+        self.kind = kind
+        self.field = field or name
+        self._keys = tuple(self.field.split("."))
+        self._convert = _CONVERTERS[kind]
+
+    def extract(self, item: t.DictStrAny) -> t.t.Any:
+        """
+        Get the converted value of the column from an item.
+
+        Args:
+            item (dict): API item.
+
+        Returns:
+            Any: Converted value, `None` if it is missing.
+        """
+
+        value: t.t.Any = item
+        for key in self._keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return self._convert(value)
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"Column({self.name}: {self.kind})"
+
+
+ORDER_COLUMNS = (
+    Column("id", INT),
+    Column("market_id", INT, "market.id"),
+    Column("market_code", STRING, "market.code"),
+    Column("type", STRING),
+    Column("mode", STRING),
+    Column("state", STRING),
+    Column("identifier", STRING),
+    Column("price", FLOAT),
+    Column("amount1", FLOAT),
+    Column("amount2", FLOAT),
+    Column("price_limit", FLOAT),
+    Column("price_stop", FLOAT),
+    Column("price_limit_oco", FLOAT),
+    Column("exchanged1", FLOAT),
+    Column("exchanged2", FLOAT),
+    Column("remain_amount", FLOAT),
+    Column("average_price", FLOAT),
+    Column("fulfilled", FLOAT),
+    Column("commission", FLOAT),
+    Column("user_commission", FLOAT),
+    Column("created_at", TIMESTAMP),
+    Column("closed_at", TIMESTAMP),
+)
+
+USER_TRADE_COLUMNS = (
+    Column("id", INT),
+    Column("market_id", INT, "market.id"),
+    Column("market_code", STRING, "market.code"),
+    Column("type", STRING),
+    Column("user_type", STRING),
+    Column("price", FLOAT),
+    Column("exchanged1", FLOAT),
+    Column("exchanged2", FLOAT),
+    Column("commission", FLOAT),
+    Column("user_gain", FLOAT),
+    Column("created_at", TIMESTAMP),
+)
+
+RECENT_TRADE_COLUMNS = (
+    Column("match_id", STRING),
+    Column("time", TIMESTAMP),
+    Column("type", STRING),
+    Column("price", FLOAT),
+    Column("match_amount", FLOAT),
+    Column("value", FLOAT),
+)
+
+
+def _pyarrow(module: str = "pyarrow") -> t.t.Any:
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError("Arrow and Parquet export require pyarrow: pip install python-bitpin[arrow]") from e
+
+
+class _CsvSink:
+    """CSV file, timestamps in ISO 8601 and missing values empty."""
+
+    def __init__(self, path: Path, columns: t.t.Sequence[Column]) -> None:
+        self._file = open(path, "w", encoding="utf-8", newline="")  # pylint: disable=consider-using-with
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([column.name for column in columns])
+
+    def write(self, buffers: t.t.List[t.t.List[t.t.Any]]) -> None:
+        """Write the rows of a batch of columns."""
+
+        self._writer.writerows(
+            [
+                "" if value is None else value.isoformat() if isinstance(value, datetime.datetime) else value
+                for value in row
+            ]
+            for row in zip(*buffers)
+        )
+
+    def close(self) -> None:
+        """Close the file."""
+
+        self._file.close()
+
+
+class _ArrowSink:
+    """Arrow IPC file, one record batch per write."""
+
+    _TYPES = {INT: "int64", FLOAT: "float64", STRING: "string", BOOL: "bool_"}
+
+    def __init__(self, path: Path, columns: t.t.Sequence[Column]) -> None:
+        self._pa = _pyarrow()
+        self.schema = self._pa.schema([(column.name, self._type(column.kind)) for column in columns])
+        self._writer = self._open(path)
+
+    def _type(self, kind: str) -> t.t.Any:
+        if kind == TIMESTAMP:
+            return self._pa.timestamp("us", tz="UTC")
+        return getattr(self._pa, self._TYPES[kind])()
+
+    def _open(self, path: Path) -> t.t.Any:
+        return self._pa.ipc.new_file(str(path), self.schema)
+
+    def write(self, buffers: t.t.List[t.t.List[t.t.Any]]) -> None:
+        """Write a batch of columns as a record batch."""
+
+        arrays = [self._pa.array(values, type=field.type) for values, field in zip(buffers, self.schema)]
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        """Write the footer and close the file."""
+
+        self._writer.close()
+
+
+class _ParquetSink(_ArrowSink):
+    """Parquet file, one row group per write."""
+
+    def _open(self, path: Path) -> t.t.Any:
+        return _pyarrow("pyarrow.parquet").ParquetWriter(str(path), self.schema)
+
+
+_SINKS: t.t.Dict[str, t.t.Callable[[Path, t.t.Sequence[Column]], t.t.Any]] = {
+    "csv": _CsvSink,
+    "arrow": _ArrowSink,
+    "parquet": _ParquetSink,
+}
+
+
+class ColumnarWriter:
+    """
+    Columnar Writer.
+
+    Buffers items as typed columns and writes them every `chunk_size` rows.
+
+    Attributes:
+        path (Path): Output file.
+        columns (tuple): Columns.
+        format (str): `csv`, `arrow` or `parquet`.
+        chunk_size (int): Rows per written chunk (record batch / row group).
+        rows (int): Number of written rows.
+
+    Example:
+        ```python
+        with ColumnarWriter("orders.arrow", ORDER_COLUMNS) as writer:
+            for order in client.stream_user_orders(state="closed"):
+                writer.write(order)
+        ```
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        columns: t.t.Sequence[Column],
+        format: t.OptionalStr = None,  # pylint: disable=redefined-builtin
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            path (str): Output file, overwritten.
+            columns (list): Columns.
+            format (str): `csv`, `arrow` or `parquet`, guessed from the suffix of `path` if omitted.
+            chunk_size (int): Rows per written chunk.
+
+        Raises:
+            ValueError: No columns or unknown format.
+            ImportError: `pyarrow` is not installed (Arrow and Parquet only).
+        """
+
+        self.path = Path(path)
+        self.columns = tuple(columns)
+        if not self.columns:
+            raise ValueError("At least one column is required")
+        self.format = format or FORMATS.get(self.path.suffix.lower(), "")
+        if self.format not in _SINKS:
+            raise ValueError(f"Unknown export format for {self.path}, expected one of {', '.join(_SINKS)}")
+        self.chunk_size = max(int(chunk_size), 1)
+        self.rows = 0
+
+        self._sink = _SINKS[self.format](self.path, self.columns)
+        self._buffers: t.t.List[t.t.List[t.t.Any]] = [[] for _ in self.columns]
+
+    def write(self, item: t.DictStrAny) -> None:
+        """
+        Add an item.
+
+        Args:
+            item (dict): API item.
+        """
+
+        for column, values in zip(self.columns, self._buffers):
+            values.append(column.extract(item))
+        if len(self._buffers[0]) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, items: t.t.Iterable[t.DictStrAny]) -> None:
+        """
+        Add items.
+
+        Args:
+            items (iterable): API items.
+        """
+
+        for item in items:
+            self.write(item)
+
+    def flush(self) -> None:
+        """Write the buffered rows."""
+
+        pending = len(self._buffers[0])
+        if not pending:
+            return
+        self._sink.write(self._buffers)
+        self.rows += pending
+        self._buffers = [[] for _ in self.columns]
+
+    def close(self) -> None:
+        """Write the buffered rows and close the file."""
+
+        self.flush()
+        self._sink.close()
+
+    def __enter__(self) -> "ColumnarWriter":
+        """
+        Enter the context.
+
+        Returns:
+            ColumnarWriter: Writer.
+        """
+
+        return self
+
+    def __exit__(self, *args: t.t.Any) -> None:
+        """
+        Exit the context.
+
+        Args:
+            *args: Exception info.
+        """
+
+        self.close()
+
+
+def export(
+    items: t.t.Iterable[t.DictStrAny],
+    path: PathLike,
+    columns: t.t.Sequence[Column],
+    format: t.OptionalStr = None,  # pylint: disable=redefined-builtin
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Export items to a file.
+
+    Args:
+        items (iterable): API items, e.g. `client.stream_user_trades()`.
+        path (str): Output file, overwritten.
+        columns (list): Columns.
+        format (str): `csv`, `arrow` or `parquet`, guessed from the suffix of `path` if omitted.
+        chunk_size (int): Rows per written chunk.
+
+    Returns:
+        int: Number of exported rows.
+    """
+
+    with ColumnarWriter(path, columns, format, chunk_size) as writer:
+        writer.write_many(items)
+    return writer.rows
+
+
+async def export_async(
+    items: t.t.AsyncIterable[t.DictStrAny],
+    path: PathLike,
+    columns: t.t.Sequence[Column],
+    format: t.OptionalStr = None,  # pylint: disable=redefined-builtin
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """
+    Export items of an async iterable to a file.
+
+    Args:
+        items (async iterable): API items, e.g. `client.stream_user_trades()` of `AsyncClient`.
+        path (str): Output file, overwritten.
+        columns (list): Columns.
+        format (str): `csv`, `arrow` or `parquet`, guessed from the suffix of `path` if omitted.
+        chunk_size (int): Rows per written chunk.
+
+    Returns:
+        int: Number of exported rows.
+    """
+
+    with ColumnarWriter(path, columns, format, chunk_size) as writer:
+        async for item in items:
+            writer.write(item)
+    return writer.rows
@@ -0,0 +1,537 @@
+"""
+# Fast Path.
+
+Low-latency order submission over dedicated warm connections.
+
+# Description.
+`OrderFastPath` (`AsyncOrderFastPath` for `AsyncClient`) sends `create_order` and `cancel_order` of a client
+through its own session, whose keep-alive connections are opened ahead of time by `warm` and kept open by
+periodic lightweight pings (a `HEAD` to the API root) on the shared scheduler (see `bitpin.scheduler`), so an
+order never pays for a TCP/TLS handshake or waits behind market-data requests of the client.
+
+Per call, the fast path skips the generic request machinery: headers (including `Authorization`) are built once
+per access token, the timeout is precomputed, and the body is serialized to bytes once (with `orjson` when it is
+installed). The client's middlewares (validation, order tracking, wallet cache, ...) still run unless disabled.
+
+Every call is timed by phase in `latency` (`LatencyHistogram` per phase, see `bitpin.metrics`) and in `last`:
+
+| Phase        | From                                      | To                                        |
+|--------------|-------------------------------------------|-------------------------------------------|
+| `prepare`    | Call, then sender called                  | Payload built, then body serialized       |
+| `middleware` | Payload built                             | Sender called by the middlewares          |
+| `send`       | Body serialized                           | Response headers received                 |
+| `read`       | Response headers received                 | Response body decoded                     |
+| `total`      | Call                                      | Response body decoded (ack)               |
+
+`prepare` is the time spent by the fast path itself, `middleware` the time spent by the client's middlewares
+before the request is sent (`0` without middlewares).
+
+Calls are also recorded in the client's `metrics`.
+"""
+
+import asyncio
+import importlib
+import json
+import threading
+import time
+
+from . import types as t
+from .clients import endpoints
+from .exceptions import DeadlineExceeded
+from .metrics import LatencyHistogram, RequestTimings
+from .middleware import RequestContext, run_async_middlewares, run_middlewares
+from .timeouts import (
+    check as check_deadline,
+    remaining,
+)
+
+PHASES = ("prepare", "middleware", "send", "read", "total")
+
+DEFAULT_CONNECTIONS = 2
+DEFAULT_PING_INTERVAL = 15.0
+
+
+def _json_dumps() -> t.t.Callable[[t.t.Any], bytes]:
+    """Get the fastest available JSON serializer to bytes."""
+
+    try:
+        return importlib.import_module("orjson").dumps  # type: ignore[no-any-return]
+    except ImportError:
+        encoder = json.JSONEncoder(separators=(",", ":"))
+        return lambda value: encoder.encode(value).encode()
+
+
+def _order_args(
+    market: int,
+    amount1: float,
+    price: float,
+    mode: t.OrderModes,
+    type: t.OrderTypes,  # pylint: disable=redefined-builtin
+    identifier: t.OptionalStr = None,
+    price_limit: t.OptionalFloat = None,
+    price_stop: t.OptionalFloat = None,
+    price_limit_oco: t.OptionalFloat = None,
+    amount2: t.OptionalFloat = None,
+) -> t.t.Tuple[t.t.Any, ...]:
+    return (market, amount1, price, mode, type, identifier, price_limit, price_stop, price_limit_oco, amount2)
+
+
+class _Marks:
+    """`time.perf_counter` marks of a call."""
+
+    __slots__ = ("start", "built", "called", "prepared", "sent")
+
+    def __init__(self) -> None:
+        self.start = self.built = self.called = self.prepared = time.perf_counter()
+        self.sent: t.OptionalFloat = None
+
+
+class _FastPath:  # pylint: disable=too-many-instance-attributes
+    """Headers, serialization and timings shared by `OrderFastPath` and `AsyncOrderFastPath`."""
+
+    def __init__(
+        self,
+        client: t.t.Any,
+        connections: int = DEFAULT_CONNECTIONS,
+        ping_interval: t.OptionalFloat = DEFAULT_PING_INTERVAL,
+        scheduler: t.t.Any = None,
+        middlewares: bool = True,
+    ) -> None:
+        self.client = client
+        self.connections = max(int(connections), 1)
+        self.ping_interval = ping_interval
+        self.middlewares = middlewares
+        self.latency = {phase: LatencyHistogram() for phase in PHASES}
+        self.last: t.t.Dict[str, float] = {}
+        self.session: t.t.Any = None
+        self._scheduler = scheduler
+        self._job: t.t.Any = None
+        self._dumps = _json_dumps()
+        self._token: t.OptionalStr = None
+        self._headers: t.t.Dict[str, str] = {}
+        self._timeouts: t.t.Dict[str, t.t.Any] = {}
+
+    def headers(self) -> t.t.Dict[str, str]:
+        """
+        Get the request headers, rebuilt only when the access token changes.
+
+        Returns:
+            dict: Headers.
+        """
+
+        token = self.client.access_token
+        if token != self._token or not self._headers:
+            self._headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "Authorization": f"Bearer {token}",
+            }
+            self._token = token
+        return self._headers
+
+    def _timeout(self, endpoint: endpoints.Endpoint) -> t.t.Any:
+        left = check_deadline(endpoint.name)
+        if left is not None:
+            return self.client.request_timeout(endpoint, left)
+        timeout = self._timeouts.get(endpoint.name)
+        if timeout is None:
+            timeout = self._timeouts[endpoint.name] = self.client.request_timeout(endpoint)
+        return timeout
+
+    def _prepare(
+        self, endpoint: endpoints.Endpoint, payload: t.OptionalDictStrAny, marks: _Marks
+    ) -> t.t.Tuple[t.t.Optional[bytes], t.t.Dict[str, str], t.t.Any]:
+        marks.called = time.perf_counter()
+        body = self._dumps(payload) if payload is not None else None
+        prepared = body, self.headers(), self._timeout(endpoint)
+        marks.prepared = time.perf_counter()
+        return prepared
+
+    def _record(
+        self,
+        endpoint: endpoints.Endpoint,
+        status: t.t.Union[int, str],
+        marks: _Marks,
+        bytes_out: int,
+        bytes_in: int,
+    ) -> None:
+        done = time.perf_counter()
+        start, sent = marks.start, marks.sent
+        last = {
+            "prepare": (marks.built - start) + (marks.prepared - marks.called),
+            "middleware": marks.called - marks.built,
+            "total": done - start,
+        }
+        if sent is not None:
+            last["send"] = sent - marks.prepared
+            last["read"] = done - sent
+        for phase, seconds in last.items():
+            self.latency[phase].record(seconds)
+        self.last = last
+
+        metrics = self.client.metrics
+        if metrics is not None:
+            timings = RequestTimings()
+            timings.start = start
+            timings.ttfb = sent - start if sent is not None else None
+            timings.bytes_out = bytes_out
+            metrics.observe(endpoint.method, endpoint.template, status, timings, bytes_in)
+
+    def _context(
+        self, endpoint: endpoints.Endpoint, path: str, payload: t.OptionalDictStrAny
+    ) -> t.t.Optional[RequestContext]:
+        if not (self.middlewares and self.client.middlewares):
+            return None
+        kwargs: t.DictStrAny = {} if payload is None else {endpoint.location: payload}
+        return RequestContext(endpoint.method, self.client.api_url + path, True, kwargs, endpoint.template, endpoint)
+
+    def snapshot(self) -> t.DictStrAny:
+        """
+        Snapshot of the latencies.
+
+        Returns:
+            dict: `LatencyHistogram.snapshot` by phase.
+        """
+
+        return {phase: histogram.snapshot() for phase, histogram in self.latency.items()}
+
+
+class OrderFastPath(_FastPath):
+    """
+    Order Fast Path.
+
+    Order submission for `Client` over dedicated warm connections.
+
+    Attributes:
+        client (Client): Client, provides the access token, middlewares and metrics.
+        connections (int): Number of connections kept warm.
+        latency (dict): `LatencyHistogram` by phase.
+        last (dict): Seconds by phase of the last call.
+        session (requests.Session): Dedicated session.
+
+    Example:
+        ```python
+        client = Client(api_key, api_secret)
+        with OrderFastPath(client) as fast:
+            order = fast.create_order(1, 0.01, 1_000_000_000, "limit", "buy")
+            fast.last  # {"prepare": ..., "send": ..., "read": ..., "total": ...}
+        ```
+    """
+
+    def __init__(
+        self,
+        client: t.t.Any,
+        connections: int = DEFAULT_CONNECTIONS,
+        ping_interval: t.OptionalFloat = DEFAULT_PING_INTERVAL,
+        scheduler: t.t.Any = None,
+        middlewares: bool = True,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            client (Client): Client.
+            connections (int): Number of connections kept warm.
+            ping_interval (float): Seconds between two pings of the connections, `None` to disable pings.
+            scheduler (Scheduler): Scheduler of the pings, defaults to the shared one.
+            middlewares (bool): Run the client's middlewares.
+        """
+
+        import requests  # pylint: disable=import-outside-toplevel
+
+        super().__init__(client, connections, ping_interval, scheduler, middlewares)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.connections)
+        self.session = requests.Session()
+        self.session.headers.clear()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._timeout_error = requests.Timeout
+
+    def warm(self) -> None:
+        """Open (or keep open) the connections with concurrent `HEAD` requests to the API root."""
+
+        if self.connections == 1:
+            self._ping()
+            return
+        threads = [threading.Thread(target=self._ping, daemon=True) for _ in range(self.connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _ping(self) -> None:
+        try:
+            self.session.head(self.client.api_url + "/", timeout=self.client.REQUEST_TIMEOUT).close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def start(self) -> "OrderFastPath":
+        """
+        Warm the connections and schedule the pings.
+
+        Returns:
+            OrderFastPath: Fast path.
+        """
+
+        self.warm()
+        if self.ping_interval and self._job is None:
+            from .scheduler import get_scheduler  # pylint: disable=import-outside-toplevel
+
+            scheduler = self._scheduler or get_scheduler()
+            self._job = scheduler.schedule(self.warm, self.ping_interval, name="order-fast-path-ping")
+        return self
+
+    def close(self) -> None:
+        """Cancel the pings and close the connections."""
+
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        self.session.close()
+
+    def __enter__(self) -> "OrderFastPath":
+        """
+        Enter the context, warming the connections.
+
+        Returns:
+            OrderFastPath: Fast path.
+        """
+
+        return self.start()
+
+    def __exit__(self, *args: t.t.Any) -> None:
+        """Close the fast path."""
+
+        self.close()
+
+    def create_order(self, *args: t.t.Any, **kwargs: t.t.Any) -> t.CreateOrderResponse:
+        """
+        Create order, same arguments as `Client.create_order`.
+
+        Args:
+            *args: `market`, `amount1`, `price`, `mode`, `type`, ...
+            **kwargs: Same, by name.
+
+        Returns:
+            Response (CreateOrderResponse): Response.
+        """
+
+        return self._submit(endpoints.CREATE_ORDER, _order_args(*args, **kwargs))  # type: ignore[no-any-return]
+
+    def cancel_order(self, order_id: t.t.Any) -> t.CancelOrderResponse:
+        """
+        Cancel order.
+
+        Args:
+            order_id (str): Order ID.
+
+        Returns:
+            Response (CancelOrderResponse): Response.
+        """
+
+        return self._submit(endpoints.CANCEL_ORDER, (order_id,))  # type: ignore[no-any-return]
+
+    def _submit(self, endpoint: endpoints.Endpoint, args: t.t.Sequence[t.t.Any]) -> t.t.Any:
+        client = self.client
+        client.ensure_ready()
+        marks = _Marks()
+
+        path, payload = endpoint.prepare(args)
+        request = self._context(endpoint, path, payload)
+        marks.built = time.perf_counter()
+        if request is None:
+            return self._send(endpoint, client.api_url + path, payload, marks)
+        return run_middlewares(
+            client.middlewares,
+            request,
+            lambda _: self._send(endpoint, _.uri, _.kwargs.get(endpoint.location), marks, _),
+        )
+
+    def _send(
+        self,
+        endpoint: endpoints.Endpoint,
+        uri: str,
+        payload: t.OptionalDictStrAny,
+        marks: _Marks,
+        request: t.t.Optional[RequestContext] = None,
+    ) -> t.t.Any:
+        body, headers, timeout = self._prepare(endpoint, payload, marks)
+        status: t.t.Union[int, str] = "error"
+        bytes_in = 0
+        try:
+            with self.session.request(
+                endpoint.method, uri, data=body, headers=headers, timeout=timeout, stream=True
+            ) as response:
+                marks.sent = time.perf_counter()
+                if request is not None:
+                    request.response = response
+                status = response.status_code
+                bytes_in = len(response.content)
+                return self.client.handle_response(response)
+        except self._timeout_error as e:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded during {endpoint.name}") from e
+            raise
+        finally:
+            self._record(endpoint, status, marks, len(body or b""), bytes_in)
+
+
+class AsyncOrderFastPath(_FastPath):
+    """
+    Async Order Fast Path.
+
+    Order submission for `AsyncClient` over dedicated warm connections, the session is created on the running
+    event loop by `start` (or the first call).
+
+    Attributes:
+        client (AsyncClient): Client, provides the access token, middlewares and metrics.
+        connections (int): Number of connections kept warm.
+        latency (dict): `LatencyHistogram` by phase.
+        last (dict): Seconds by phase of the last call.
+        session (aiohttp.ClientSession): Dedicated session, `None` before `start`.
+
+    Example:
+        ```python
+        async with AsyncClient(api_key, api_secret) as client, AsyncOrderFastPath(client) as fast:
+            order = await fast.create_order(1, 0.01, 1_000_000_000, "limit", "buy")
+        ```
+    """
+
+    async def warm(self) -> None:
+        """Open (or keep open) the connections with concurrent `HEAD` requests to the API root."""
+
+        session = self._session()
+        await asyncio.gather(*(self._ping(session) for _ in range(self.connections)))
+
+    async def _ping(self, session: t.t.Any) -> None:
+        try:
+            async with session.head(self.client.api_url + "/"):
+                pass
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def _session(self) -> t.t.Any:
+        if self.session is None:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+
+            # connections must outlive the interval between two pings
+            keepalive = max((self.ping_interval or 0) * 2, 30.0)
+            connector = aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=keepalive)
+            self.session = aiohttp.ClientSession(connector=connector, skip_auto_headers=("User-Agent",))
+        return self.session
+
+    async def start(self) -> "AsyncOrderFastPath":
+        """
+        Warm the connections and schedule the pings.
+
+        Returns:
+            AsyncOrderFastPath: Fast path.
+        """
+
+        await self.warm()
+        if self.ping_interval and self._job is None:
+            from .scheduler import get_async_scheduler  # pylint: disable=import-outside-toplevel
+
+            scheduler = self._scheduler or get_async_scheduler()
+            self._job = scheduler.schedule(self.warm, self.ping_interval, name="order-fast-path-ping")
+        return self
+
+    async def close(self) -> None:
+        """Cancel the pings and close the connections."""
+
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncOrderFastPath":
+        """
+        Enter the context, warming the connections.
+
+        Returns:
+            AsyncOrderFastPath: Fast path.
+        """
+
+        return await self.start()
+
+    async def __aexit__(self, *args: t.t.Any) -> None:
+        """Close the fast path."""
+
+        await self.close()
+
+    async def create_order(self, *args: t.t.Any, **kwargs: t.t.Any) -> t.CreateOrderResponse:
+        """
+        Create order, same arguments as `AsyncClient.create_order`.
+
+        Args:
+            *args: `market`, `amount1`, `price`, `mode`, `type`, ...
+            **kwargs: Same, by name.
+
+        Returns:
+            Response (CreateOrderResponse): Response.
+        """
+
+        return await self._submit(endpoints.CREATE_ORDER, _order_args(*args, **kwargs))  # type: ignore[no-any-return]
+
+    async def cancel_order(self, order_id: t.t.Any) -> t.CancelOrderResponse:
+        """
+        Cancel order.
+
+        Args:
+            order_id (str): Order ID.
+
+        Returns:
+            Response (CancelOrderResponse): Response.
+        """
+
+        return await self._submit(endpoints.CANCEL_ORDER, (order_id,))  # type: ignore[no-any-return]
+
+    async def _submit(self, endpoint: endpoints.Endpoint, args: t.t.Sequence[t.t.Any]) -> t.t.Any:
+        client = self.client
+        await client.ensure_ready()
+        marks = _Marks()
+
+        path, payload = endpoint.prepare(args)
+        request = self._context(endpoint, path, payload)
+        marks.built = time.perf_counter()
+        if request is None:
+            return await self._send(endpoint, client.api_url + path, payload, marks)
+        return await run_async_middlewares(
+            client.middlewares,
+            request,
+            lambda _: self._send(endpoint, _.uri, _.kwargs.get(endpoint.location), marks, _),
+        )
+
+    async def _send(
+        self,
+        endpoint: endpoints.Endpoint,
+        uri: str,
+        payload: t.OptionalDictStrAny,
+        marks: _Marks,
+        request: t.t.Optional[RequestContext] = None,
+    ) -> t.t.Any:
+        session = self._session()
+        body, headers, timeout = self._prepare(endpoint, payload, marks)
+        status: t.t.Union[int, str] = "error"
+        response = None
+        try:
+            # pylint cannot infer `ClientSession.request` through the typing overloads of aiohttp
+            async with session.request(  # pylint: disable=not-async-context-manager
+                endpoint.method, uri, data=body, headers=headers, timeout=timeout
+            ) as response:
+                marks.sent = time.perf_counter()
+                if request is not None:
+                    request.response = response
+                status = response.status
+                return await self.client.handle_response(response)
+        except asyncio.TimeoutError as e:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded during {endpoint.name}") from e
+            raise
+        finally:
+            bytes_in = response.content.total_bytes if response is not None else 0
+            self._record(endpoint, status, marks, len(body or b""), bytes_in)
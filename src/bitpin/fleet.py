@@ -0,0 +1,385 @@
+"""
+# Fleet.
+
+Worker processes sharing the markets of an account.
+
+# Description.
+A single `AsyncClient` runs on one event loop, so decoding and strategy work are bound to one core. `Fleet` runs
+a worker coroutine in `processes` child processes, each with its own event loop and `AsyncClient`, and gives
+every worker a shard of the markets: market `m` goes to worker `crc32(str(m)) % processes`, so a market always
+lands on the same worker whatever the order of the list.
+
+```python
+async def worker(client, markets, emit):
+    while True:
+        for market in markets:
+            emit((market, await client.get_orderbook(market, "buy")))
+        await asyncio.sleep(1)
+```
+
+Workers report to the parent with `emit` (events, in order per worker) and with their return value (results),
+both sent pickled over one pipe per worker; the parent waits on all pipes at once in `events`.
+
+The parent logs in once and hands the tokens to the workers, which do not log in themselves; with
+`refresh_interval`, the parent refreshes the access token on the shared scheduler and sends it to every worker.
+
+Notes:
+    Processes are started with `spawn` by default: the worker must be importable (a module-level coroutine
+    function), and its arguments, events and results picklable. With `fork`, clients inherited by a child drop the
+    parent's session and background jobs (see `bitpin.clients.core`).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import traceback
+import zlib
+from multiprocessing.connection import wait
+
+from . import types as t
+from .exceptions import WorkerException
+
+Emit = t.t.Callable[[t.t.Any], None]
+Worker = t.t.Callable[[t.t.Any, t.t.List[t.t.Any], Emit], t.t.Awaitable[t.t.Any]]
+
+
+def shard(market: t.t.Any, processes: int) -> int:
+    """
+    Get the worker of a market.
+
+    Args:
+        market (t.Any): Market ID or symbol.
+        processes (int): Number of workers.
+
+    Returns:
+        int: Worker index.
+    """
+
+    return zlib.crc32(str(market).encode()) % processes
+
+
+def _listen(control: t.t.Any, loop: asyncio.AbstractEventLoop, client: t.t.Any, task: "asyncio.Task[t.t.Any]") -> None:
+    """Apply the messages of the parent, in a thread of the worker process."""
+
+    while True:
+        try:
+            message = control.recv()
+        except (EOFError, OSError):
+            message = ("stop",)
+        try:
+            if message[0] == "token":
+                loop.call_soon_threadsafe(_set_tokens, client, message[1], message[2])
+            elif message[0] == "stop":
+                loop.call_soon_threadsafe(task.cancel)
+                return
+        except RuntimeError:  # the loop is closed, the worker is done
+            return
+
+
+def _set_tokens(client: t.t.Any, access_token: t.OptionalStr, refresh_token: t.OptionalStr) -> None:
+    client.access_token = access_token
+    client.refresh_token = refresh_token
+
+
+async def _work(
+    index: int,
+    worker: Worker,
+    markets: t.t.List[t.t.Any],
+    client_params: t.DictStrAny,
+    api_url: str,
+    control: t.t.Any,
+    events: t.t.Any,
+) -> t.t.Any:
+    from .clients.async_client import AsyncClient  # pylint: disable=import-outside-toplevel
+
+    def emit(event: t.t.Any) -> None:
+        events.send(("event", index, event))
+
+    async with AsyncClient(**client_params) as client:
+        client.api_url = api_url
+        task = asyncio.ensure_future(worker(client, markets, emit))
+        threading.Thread(target=_listen, args=(control, asyncio.get_running_loop(), client, task), daemon=True).start()
+        try:
+            return await task
+        except asyncio.CancelledError:
+            return None
+
+
+def _run_worker(
+    index: int,
+    worker: Worker,
+    markets: t.t.List[t.t.Any],
+    client_params: t.DictStrAny,
+    api_url: str,
+    control: t.t.Any,
+    events: t.t.Any,
+) -> None:
+    """Entry point of a worker process."""
+
+    try:
+        result = asyncio.run(_work(index, worker, markets, client_params, api_url, control, events))
+        events.send(("result", index, result))
+    except BaseException:  # pylint: disable=broad-except
+        events.send(("error", index, traceback.format_exc()))
+    finally:
+        events.close()
+
+
+class Fleet:  # pylint: disable=too-many-instance-attributes
+    """
+    Fleet.
+
+    Worker processes with one `AsyncClient` each, the markets sharded between them.
+
+    Attributes:
+        worker (callable): Coroutine function run in every process as `worker(client, markets, emit)`.
+        shards (dict): Markets by worker index, workers without market are not started.
+        results (dict): Return value by worker index, once the worker is done.
+        errors (dict): `WorkerException` by worker index, for the workers that failed.
+        access_token (str): Access token sent to the workers.
+        refresh_token (str): Refresh token sent to the workers.
+        api_url (str): API root of the workers, `None` for `AsyncClient.API_URL`.
+
+    Example:
+        ```python
+        if __name__ == "__main__":
+            with Fleet(worker, markets=range(1, 101), processes=4, api_key=key, api_secret=secret) as fleet:
+                for index, event in fleet.events():
+                    print(index, event)
+            print(fleet.results)
+        ```
+    """
+
+    def __init__(
+        self,
+        worker: Worker,
+        markets: t.t.Iterable[t.t.Any],
+        processes: t.t.Optional[int] = None,
+        api_key: t.OptionalStr = None,
+        api_secret: t.OptionalStr = None,
+        access_token: t.OptionalStr = None,
+        refresh_token: t.OptionalStr = None,
+        refresh_interval: t.t.Optional[float] = None,
+        start_method: str = "spawn",
+        api_url: t.OptionalStr = None,
+        **client_params: t.t.Any,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            worker (callable): Coroutine function `worker(client, markets, emit)`, its return value is the result.
+            markets (list): Market IDs (or symbols) to shard.
+            processes (int): Number of workers, defaults to the number of CPUs.
+            api_key (str): API key, used by the parent to log in.
+            api_secret (str): API secret.
+            access_token (str): Access token, skips the login.
+            refresh_token (str): Refresh token.
+            refresh_interval (float): Seconds between two refreshes of the access token, `None` to disable.
+            start_method (str): `multiprocessing` start method.
+            api_url (str): API root of the workers and of the login of the parent, defaults to `AsyncClient.API_URL`.
+            **client_params: Other `AsyncClient` arguments of the workers (`requests_params`, `timeouts`, ...).
+        """
+
+        processes = processes or os.cpu_count() or 1
+        self.worker = worker
+        self.shards: t.t.Dict[int, t.t.List[t.t.Any]] = {}
+        for market in markets:
+            self.shards.setdefault(shard(market, processes), []).append(market)
+        self.results: t.t.Dict[int, t.t.Any] = {}
+        self.errors: t.t.Dict[int, WorkerException] = {}
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.refresh_interval = refresh_interval
+        self.api_url = api_url
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self._client_params = client_params
+        self._context: t.t.Any = multiprocessing.get_context(start_method)
+        self._processes: t.t.Dict[int, t.t.Any] = {}
+        self._controls: t.t.Dict[int, t.t.Any] = {}
+        self._events: t.t.Dict[t.t.Any, int] = {}
+        self._client: t.t.Any = None
+        self._job: t.t.Any = None
+
+    def start(self) -> "Fleet":
+        """
+        Log in if needed and start the workers.
+
+        Returns:
+            Fleet: Fleet.
+        """
+
+        from .clients.async_client import AsyncClient  # pylint: disable=import-outside-toplevel
+        from .clients.client import Client  # pylint: disable=import-outside-toplevel
+
+        api_url = self.api_url or AsyncClient.API_URL
+        self._client = Client(
+            self._api_key, self._api_secret, self.access_token, self.refresh_token, enable_metrics=False
+        )
+        self._client.api_url = api_url  # log in on the server of the workers
+        if not self._client.access_token:
+            self._client.login()
+        self.access_token, self.refresh_token = self._client.access_token, self._client.refresh_token
+
+        params = {
+            **self._client_params,
+            "api_key": self._client.api_key,
+            "api_secret": self._client.api_secret,
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "background_relogin": False,
+            "background_refresh_token": False,
+        }
+        for index, markets in sorted(self.shards.items()):
+            control_out, control_in = self._context.Pipe(duplex=False)
+            events_out, events_in = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_run_worker,
+                args=(index, self.worker, markets, dict(params), api_url, control_out, events_in),
+                name=f"bitpin-fleet-{index}",
+                daemon=True,
+            )
+            process.start()
+            control_out.close()
+            events_in.close()
+            self._processes[index] = process
+            self._controls[index] = control_in
+            self._events[events_out] = index
+
+        if self.refresh_interval:
+            from .scheduler import get_scheduler  # pylint: disable=import-outside-toplevel
+
+            self._job = get_scheduler().schedule(self.refresh, self.refresh_interval, name="fleet-refresh-token")
+        return self
+
+    def refresh(self) -> None:
+        """Refresh the access token and send it to the workers."""
+
+        self._client.refresh_access_token()
+        self.set_tokens(self._client.access_token, self._client.refresh_token)
+
+    def set_tokens(self, access_token: t.OptionalStr, refresh_token: t.OptionalStr = None) -> None:
+        """
+        Send tokens to the workers.
+
+        Args:
+            access_token (str): Access token.
+            refresh_token (str): Refresh token, unchanged if `None`.
+        """
+
+        self.access_token = access_token
+        self.refresh_token = refresh_token or self.refresh_token
+        self._broadcast(("token", self.access_token, self.refresh_token))
+
+    def _broadcast(self, message: t.t.Tuple[t.t.Any, ...]) -> None:
+        for control in self._controls.values():
+            try:
+                control.send(message)
+            except (BrokenPipeError, OSError):
+                pass
+
+    def events(self, timeout: t.t.Optional[float] = None) -> t.t.Iterator[t.t.Tuple[int, t.t.Any]]:
+        """
+        Iterate over the events of the workers until they are all done.
+
+        Args:
+            timeout (float): Seconds to wait for an event before returning, `None` to wait for the workers.
+
+        Yields:
+            tuple: `(worker index, event)`.
+        """
+
+        while self._events:
+            ready: t.t.List[t.t.Any] = wait(list(self._events), timeout)
+            if not ready:
+                return
+            for connection in ready:
+                try:
+                    kind, index, payload = connection.recv()
+                except (EOFError, OSError):
+                    self._done(connection)
+                    continue
+                if kind == "event":
+                    yield index, payload
+                elif kind == "result":
+                    self.results[index] = payload
+                else:
+                    self.errors[index] = WorkerException(payload, index)
+
+    def _done(self, connection: t.t.Any) -> None:
+        index = self._events.pop(connection)
+        connection.close()
+        process = self._processes[index]
+        process.join()
+        if index not in self.results and index not in self.errors:
+            self.errors[index] = WorkerException(f"worker exited with code {process.exitcode}", index)
+
+    def run(self, on_event: t.t.Optional[t.t.Callable[[int, t.t.Any], t.t.Any]] = None) -> t.t.Dict[int, t.t.Any]:
+        """
+        Start the workers if needed and wait for them.
+
+        Args:
+            on_event (callable): Called with `(worker index, event)` for every event.
+
+        Returns:
+            dict: Results by worker index.
+
+        Raises:
+            WorkerException: A worker failed.
+        """
+
+        if not self._processes:
+            self.start()
+        try:
+            for index, event in self.events():
+                if on_event is not None:
+                    on_event(index, event)
+        finally:
+            self.stop()
+        if self.errors:
+            raise self.errors[min(self.errors)]
+        return self.results
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Cancel the workers and wait for them.
+
+        Args:
+            timeout (float): Seconds to wait before terminating the workers still running.
+        """
+
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        self._broadcast(("stop",))
+        for _ in self.events(timeout):
+            pass
+        for process in self._processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for control in self._controls.values():
+            control.close()
+        self._controls.clear()
+        for connection in list(self._events):
+            self._done(connection)
+        if self._client is not None:
+            self._client.close_connection()
+            self._client = None
+
+    def __enter__(self) -> "Fleet":
+        """
+        Start the workers.
+
+        Returns:
+            Fleet: Fleet.
+        """
+
+        return self.start()
+
+    def __exit__(self, *args: t.t.Any) -> None:
+        """Stop the workers."""
+
+        self.stop()
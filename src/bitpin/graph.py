@@ -0,0 +1,388 @@
+"""
+# Graph.
+
+Cross rates and triangular cycles between the currencies of all markets.
+
+# Description.
+`MarketGraph` turns the market registry (`currency1`/`currency2` of `get_markets_info`) into a graph of currencies
+with two directed edges per market: selling the base (base -> quote at the best bid) and buying it (quote -> base
+at one over the best ask), both net of `fee`.
+
+Everything that does not depend on prices is built once by `load`: the edges, and every triangle of currencies
+linked by three markets (e.g. `BTC -> USDT -> IRT -> BTC`), in both directions, indexed by market. `update` (or
+`update_orderbook`) then sets the best prices of one market and re-prices only the cycles going through it,
+keeping the set of profitable cycles current, so each tick costs O(cycles of the market) whatever the number of
+markets:
+
+- `rate(source, target)`: best implied rate over paths of at most two markets.
+- `opportunities(min_profit)`: cycles whose rate exceeds `1 + min_profit`, best first.
+
+# Example.
+```python
+graph = MarketGraph(fee=0.002)
+graph.refresh(client)
+for market_id in graph.markets:
+    graph.update_orderbook(market_id, client.get_orderbook(market_id, "buy"), "buy")
+    graph.update_orderbook(market_id, client.get_orderbook(market_id, "sell"), "sell")
+graph.rate("BTC", "ETH"), graph.opportunities(0.001)
+```
+"""
+
+import itertools
+import math
+
+from . import types as t
+
+NAN = float("nan")
+
+
+class Route:
+    """
+    Route.
+
+    A path (or cycle) of trades between currencies.
+
+    Attributes:
+        currencies (tuple): Currencies in order, the first one repeated last for a cycle.
+        markets (tuple): Market ID of each trade.
+        sides (tuple): Side of each trade (`sell` the base for its quote, `buy` the base with its quote).
+        rate (float): Units of the last currency per unit of the first one, net of fees.
+    """
+
+    __slots__ = ("currencies", "markets", "sides", "rate")
+
+    def __init__(
+        self,
+        currencies: t.t.Tuple[str, ...],
+        markets: t.t.Tuple[int, ...],
+        sides: t.t.Tuple[str, ...],
+        rate: float,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            currencies (tuple): Currencies in order.
+            markets (tuple): Market ID of each trade.
+            sides (tuple): Side of each trade.
+            rate (float): Rate.
+        """
+
+        self.currencies = currencies
+        self.markets = markets
+        self.sides = sides
+        self.rate = rate
+
+    @property
+    def profit(self) -> float:
+        """
+        Profit of a cycle.
+
+        Returns:
+            float: `rate - 1`.
+        """
+
+        return self.rate - 1
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"Route({' -> '.join(self.currencies)}, rate={self.rate:.6g})"
+
+
+class _Edge:
+    """A trade from one currency to another on a market."""
+
+    __slots__ = ("source", "target", "market_id", "side", "rate")
+
+    def __init__(self, source: str, target: str, market_id: int, side: str) -> None:
+        self.source = source
+        self.target = target
+        self.market_id = market_id
+        self.side = side
+        self.rate = NAN
+
+
+class _Cycles:
+    """Triangular cycles of the edges, with their rates and the cycles of every market."""
+
+    __slots__ = ("edges", "rates", "by_market", "profitable")
+
+    def __init__(self, edges: t.t.Dict[str, t.t.Dict[str, _Edge]]) -> None:
+        cycles: t.t.List[t.t.Tuple[_Edge, ...]] = []
+        for first in sorted(edges):
+            # every triangle once per direction, starting from its smallest currency
+            for second, third in itertools.permutations(sorted(edges[first]), 2):
+                if first < second and first < third and third in edges[second]:
+                    cycles.append((edges[first][second], edges[second][third], edges[third][first]))
+
+        self.edges = cycles
+        self.rates = [NAN] * len(cycles)
+        self.by_market: t.t.Dict[int, t.t.List[int]] = {}
+        self.profitable: t.t.Set[int] = set()
+        for index, cycle in enumerate(cycles):
+            for edge in cycle:
+                self.by_market.setdefault(edge.market_id, []).append(index)
+            self.price(index)
+
+    def price(self, index: int) -> None:
+        """Re-price a cycle from the rates of its edges."""
+
+        rate = 1.0
+        for edge in self.edges[index]:
+            rate *= edge.rate
+        self.rates[index] = rate
+        if rate > 1:
+            self.profitable.add(index)
+        else:
+            self.profitable.discard(index)
+
+    def reprice(self, market_id: int) -> None:
+        """Re-price the cycles of a market."""
+
+        for index in self.by_market.get(market_id, ()):
+            self.price(index)
+
+
+class MarketGraph:
+    """
+    Market Graph.
+
+    Attributes:
+        fee (float): Fee taken on every trade (e.g. `0.002`).
+        currencies (set): Currency codes.
+        updates (int): Number of `update` calls.
+    """
+
+    def __init__(self, markets: t.t.Optional[t.t.Iterable[t.DictStrAny]] = None, fee: float = 0.0) -> None:
+        """
+        Constructor.
+
+        Args:
+            markets (list): `MarketInfo` list, see `load`.
+            fee (float): Fee taken on every trade.
+        """
+
+        self.fee = fee
+        self.currencies: t.t.Set[str] = set()
+        self.updates = 0
+        self._markets: t.t.Dict[int, t.t.Tuple[_Edge, _Edge]] = {}
+        self._edges: t.t.Dict[str, t.t.Dict[str, _Edge]] = {}
+        self._cycles = _Cycles(self._edges)
+        if markets is not None:
+            self.load(markets)
+
+    @property
+    def markets(self) -> t.t.List[int]:
+        """
+        Markets of the graph.
+
+        Returns:
+            list: Market IDs.
+        """
+
+        return list(self._markets)
+
+    @property
+    def cycles(self) -> int:
+        """
+        Number of triangular cycles.
+
+        Returns:
+            int: Number of cycles (each triangle counts twice, once per direction).
+        """
+
+        return len(self._cycles.edges)
+
+    def load(self, markets: t.t.Iterable[t.DictStrAny]) -> None:
+        """
+        Add markets and rebuild the cycles, prices of the markets already known are kept.
+
+        Args:
+            markets (list): `MarketInfo` list, as returned by `get_markets_info`.
+        """
+
+        for market in markets:
+            try:
+                market_id = int(market["id"])
+                base = str(market["currency1"]["code"]).upper()
+                quote = str(market["currency2"]["code"]).upper()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if market_id in self._markets or base == quote or quote in self._edges.get(base, {}):
+                continue
+            sell, buy = _Edge(base, quote, market_id, "sell"), _Edge(quote, base, market_id, "buy")
+            self._markets[market_id] = (sell, buy)
+            self._edges.setdefault(base, {})[quote] = sell
+            self._edges.setdefault(quote, {})[base] = buy
+            self.currencies.update((base, quote))
+        self._cycles = _Cycles(self._edges)
+
+    def refresh(self, client: t.t.Any) -> None:
+        """
+        Load all markets with `Client`.
+
+        Args:
+            client (Client): Client.
+        """
+
+        page = 1
+        while True:
+            response = client.get_markets_info(page)
+            self.load(response.get("results") or [])
+            if not response.get("next"):
+                return
+            page += 1
+
+    async def refresh_async(self, client: t.t.Any) -> None:
+        """
+        Load all markets with `AsyncClient`.
+
+        Args:
+            client (AsyncClient): Client.
+        """
+
+        page = 1
+        while True:
+            response = await client.get_markets_info(page)
+            self.load(response.get("results") or [])
+            if not response.get("next"):
+                return
+            page += 1
+
+    def update(self, market_id: int, bid: t.t.Any = None, ask: t.t.Any = None) -> None:
+        """
+        Set the best prices of a market and re-price its cycles.
+
+        Args:
+            market_id (int): Market ID.
+            bid (float): Best bid, unchanged if `None`, `nan` if the side is empty.
+            ask (float): Best ask, unchanged if `None`, `nan` if the side is empty.
+
+        Raises:
+            KeyError: Unknown market.
+        """
+
+        sell, buy = self._markets[market_id]
+        net = 1 - self.fee
+        if bid is not None:
+            bid = float(bid)
+            sell.rate = bid * net if bid > 0 else NAN
+        if ask is not None:
+            ask = float(ask)
+            buy.rate = net / ask if ask > 0 else NAN
+        self.updates += 1
+        self._cycles.reprice(market_id)
+
+    def update_orderbook(
+        self,
+        market_id: int,
+        orderbook: t.OrderbookResponse,
+        type: t.OrderTypes,  # pylint: disable=redefined-builtin
+    ) -> None:
+        """
+        Set a best price of a market from a `get_orderbook` response.
+
+        Args:
+            market_id (int): Market ID.
+            orderbook (OrderbookResponse): Response of `get_orderbook(market_id, type)`.
+            type (str): Side of the response, `buy` for the bids, `sell` for the asks.
+
+        Raises:
+            KeyError: Unknown market.
+        """
+
+        prices = [float(order["price"]) for order in orderbook.get("orders") or []]
+        if type == "buy":
+            self.update(market_id, bid=max(prices, default=NAN))
+        else:
+            self.update(market_id, ask=min(prices, default=NAN))
+
+    def rate(self, source: str, target: str) -> float:
+        """
+        Get the best implied rate from a currency to another over at most two markets.
+
+        Args:
+            source (str): Currency code.
+            target (str): Currency code.
+
+        Returns:
+            float: Units of `target` per unit of `source`, `nan` if there is no priced path.
+        """
+
+        route = self.route(source, target)
+        return route.rate if route is not None else NAN
+
+    def route(self, source: str, target: str) -> t.t.Optional[Route]:
+        """
+        Get the best path from a currency to another over at most two markets.
+
+        Args:
+            source (str): Currency code.
+            target (str): Currency code.
+
+        Returns:
+            Route: Best path, `None` if there is no priced path.
+        """
+
+        source, target = source.upper(), target.upper()
+        edges = self._edges.get(source, {})
+        best: t.t.Optional[t.t.Tuple[float, t.t.Tuple[_Edge, ...]]] = None
+        direct = edges.get(target)
+        if direct is not None and not math.isnan(direct.rate):
+            best = (direct.rate, (direct,))
+        for middle, first in edges.items():
+            second = self._edges[middle].get(target)
+            if second is None:
+                continue
+            rate = first.rate * second.rate
+            if rate > (best[0] if best is not None else 0):
+                best = (rate, (first, second))
+        if best is None:
+            return None
+        return self._route(best[1], best[0])
+
+    def opportunities(self, min_profit: float = 0.0) -> t.t.List[Route]:
+        """
+        Get the cycles with a rate above `1 + min_profit`, best first.
+
+        Args:
+            min_profit (float): Minimum profit (e.g. `0.001` for 0.1%), net of fees.
+
+        Returns:
+            list: Cycles.
+        """
+
+        cycles = self._cycles
+        threshold = 1 + min_profit
+        indexes = cycles.profitable if min_profit >= 0 else range(len(cycles.edges))
+        rates = cycles.rates
+        found = sorted((index for index in indexes if rates[index] > threshold), key=lambda i: -rates[i])
+        return [self._route(cycles.edges[index], rates[index]) for index in found]
+
+    @staticmethod
+    def _route(edges: t.t.Sequence[_Edge], rate: float) -> Route:
+        return Route(
+            (edges[0].source, *(edge.target for edge in edges)),
+            tuple(edge.market_id for edge in edges),
+            tuple(edge.side for edge in edges),
+            rate,
+        )
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return (
+            f"MarketGraph({len(self.currencies)} currencies, {len(self._markets)} markets, "
+            f"{len(self._cycles.edges)} cycles, {len(self._cycles.profitable)} profitable)"
+        )
@@ -0,0 +1,275 @@
+"""
+# Hedging.
+
+Hedged requests for latency-critical reads of `AsyncClient`.
+
+# Description.
+With a `HedgePolicy`, a GET to one of its endpoints (by default `orderbook` and `recent_trades`) that has not
+answered after the policy's percentile of the recent latencies of that endpoint is sent a second time, on another
+connection of the pool; the first successful response wins and the other request is cancelled. A slow connection
+then costs about the threshold instead of the whole tail.
+
+Hedges are bounded by a budget: every request earns `budget` hedge credits (up to `burst`) and a hedge spends
+one, so at most `budget` extra requests per request are sent on average (5% by default), whatever the latency.
+Until `min_samples` latencies of an endpoint are known, its requests are not hedged.
+
+Both attempts go through the session like any request, so `metrics` records the ones that complete (the
+cancelled loser is not recorded); middlewares see a single request, whose `response` is the winner's.
+
+Only idempotent requests may be hedged: the policy refuses endpoints whose method is not GET.
+"""
+
+import asyncio
+import collections
+import copy
+import time
+
+from . import types as t
+from .clients import endpoints
+
+DEFAULT_ENDPOINTS = ("orderbook", "recent_trades")
+
+
+class _Latencies:
+    """Recent latencies of an endpoint, with their percentile refreshed every few samples."""
+
+    __slots__ = ("samples", "threshold", "_since")
+
+    def __init__(self, window: int) -> None:
+        self.samples: t.t.Deque[float] = collections.deque(maxlen=window)
+        self.threshold: t.OptionalFloat = None
+        self._since = 0
+
+    def add(self, latency: float, percentile: float, min_samples: int) -> None:
+        """Add a latency, the threshold is only set once `min_samples` are known."""
+
+        self.samples.append(latency)
+        self._since += 1
+        count = len(self.samples)
+        if count < min_samples or (self.threshold is not None and self._since < max(count // 8, 1)):
+            return
+        ordered = sorted(self.samples)
+        self.threshold = ordered[min(int(percentile * count), count - 1)]
+        self._since = 0
+
+
+class HedgePolicy:  # pylint: disable=too-many-instance-attributes
+    """
+    Hedge Policy.
+
+    Attributes:
+        percentile (float): Percentile of the recent latencies after which a request is hedged.
+        min_delay (float): Minimum hedge delay in seconds.
+        max_delay (float): Maximum hedge delay in seconds.
+        budget (float): Hedges allowed per request.
+        burst (float): Maximum hedge credits.
+        requests (int): Number of requests handled by the policy.
+        hedged (int): Number of hedges sent.
+        won (int): Number of hedges that answered first.
+
+    Example:
+        ```python
+        policy = HedgePolicy(percentile=0.9, budget=0.05)
+        client = AsyncClient(hedging=policy)
+        await client.get_orderbook(1, "buy")
+        policy.hedged, policy.won
+        ```
+    """
+
+    def __init__(
+        self,
+        names: t.t.Iterable[str] = DEFAULT_ENDPOINTS,
+        percentile: float = 0.95,
+        min_delay: float = 0.005,
+        max_delay: float = 1.0,
+        budget: float = 0.05,
+        burst: float = 5.0,
+        window: int = 256,
+        min_samples: int = 20,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            names (list): Names of the endpoints to hedge (see `bitpin.clients.endpoints.ENDPOINTS`).
+            percentile (float): Percentile of the recent latencies after which a request is hedged.
+            min_delay (float): Minimum hedge delay in seconds.
+            max_delay (float): Maximum hedge delay in seconds.
+            budget (float): Hedges allowed per request (e.g. `0.05` for 5% extra requests).
+            burst (float): Maximum hedge credits accumulated.
+            window (int): Number of recent latencies kept per endpoint.
+            min_samples (int): Latencies needed before an endpoint is hedged.
+
+        Raises:
+            ValueError: An endpoint is not a GET.
+        """
+
+        self._templates = set()
+        for name in names:
+            endpoint = endpoints.ENDPOINTS[name]
+            if str(endpoint.method).lower() != "get":
+                raise ValueError(f"{name} is not idempotent ({str(endpoint.method).upper()}), it can not be hedged")
+            self._templates.add(endpoint.template)
+
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.burst = burst
+        self.window = window
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+        self._credit = burst
+        self._latencies: t.t.Dict[str, _Latencies] = {}
+
+    def applies(self, method: str, template: t.OptionalStr) -> bool:
+        """
+        Whether a request is handled by the policy.
+
+        Args:
+            method (str): HTTP method.
+            template (str): Endpoint template.
+
+        Returns:
+            bool: Whether the request may be hedged.
+        """
+
+        return template in self._templates and str(method).lower() == "get"
+
+    def delay(self, template: str) -> t.OptionalFloat:
+        """
+        Get the hedge delay of an endpoint.
+
+        Args:
+            template (str): Endpoint template.
+
+        Returns:
+            float: Seconds after which a request is hedged, `None` until enough latencies are known.
+        """
+
+        latencies = self._latencies.get(template)
+        if latencies is None or latencies.threshold is None:
+            return None
+        return min(max(latencies.threshold, self.min_delay), self.max_delay)
+
+    def _observe(self, template: str, latency: float) -> None:
+        latencies = self._latencies.get(template)
+        if latencies is None:
+            latencies = self._latencies[template] = _Latencies(self.window)
+        latencies.add(latency, self.percentile, self.min_samples)
+
+    async def run(self, template: str, attempt: t.t.Callable[[], t.t.Awaitable[t.t.Any]]) -> t.t.Any:
+        """
+        Run a request, hedging it if it is slow and the budget allows.
+
+        Args:
+            template (str): Endpoint template.
+            attempt (callable): Sends the request, called once or twice.
+
+        Returns:
+            t.Any: Result of the first successful attempt.
+        """
+
+        self.requests += 1
+        self._credit = min(self._credit + self.budget, self.burst)
+        delay = self.delay(template)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt())
+        try:
+            if delay is not None:
+                await asyncio.wait((primary,), timeout=delay)
+            if primary.done() or delay is None or self._credit < 1:
+                result = await primary
+                self._observe(template, time.monotonic() - started)
+                return result
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+
+        self._credit -= 1
+        self.hedged += 1
+        hedge = asyncio.ensure_future(attempt())
+        try:
+            winner = await _first_success((primary, hedge))
+            if winner is hedge:
+                self.won += 1
+            return winner.result()
+        finally:
+            # the primary's latency, or a lower bound of it if it lost
+            self._observe(template, time.monotonic() - started)
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # retrieved, so a failed loser is not logged
+
+    async def send(
+        self,
+        template: str,
+        request: t.t.Any,
+        attempt: t.t.Callable[[t.t.Any], t.t.Awaitable[t.t.Any]],
+    ) -> t.t.Any:
+        """
+        Run a request like `run`, every attempt recording its raw response on its own copy of `request`.
+
+        Only the response of the attempt that won (or whose error is raised) is set on `request`, so a cancelled
+        or failed loser can not overwrite it.
+
+        Args:
+            template (str): Endpoint template.
+            request (RequestContext): Middleware request context, `None` without middlewares.
+            attempt (callable): Sends the request with the context of the attempt.
+
+        Returns:
+            t.Any: Result of the first successful attempt.
+        """
+
+        if request is None:
+            return await self.run(template, lambda: attempt(None))
+
+        failed: t.t.Dict[int, t.t.Any] = {}
+
+        async def start() -> t.t.Tuple[t.t.Any, t.t.Any]:
+            own = copy.copy(request)
+            try:
+                result = await attempt(own)
+            except Exception as exc:
+                failed[id(exc)] = own.response
+                raise
+            return own.response, result
+
+        try:
+            request.response, result = await self.run(template, start)
+        except Exception as exc:
+            request.response = failed.get(id(exc), request.response)
+            raise
+        return result
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"HedgePolicy(p{self.percentile * 100:g}, {self.hedged}/{self.requests} hedged, {self.won} won)"
+
+
+async def _first_success(tasks: t.t.Iterable["asyncio.Future[t.t.Any]"]) -> "asyncio.Future[t.t.Any]":
+    """Wait for the first task that succeeds, or raise the error of the first one that failed."""
+
+    pending: t.t.Set["asyncio.Future[t.t.Any]"] = set(tasks)
+    error: t.t.Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        task: "asyncio.Future[t.t.Any]"
+        for task in done:
+            if task.cancelled():
+                continue
+            if task.exception() is None:
+                return task
+            error = error or task.exception()
+    raise error if error is not None else asyncio.CancelledError()
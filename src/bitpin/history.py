@@ -0,0 +1,248 @@
+"""
+# History.
+
+Incremental synchronization of the user trade history.
+
+# Description.
+`TradeHistorySync` (and `AsyncTradeHistorySync`) pages through `get_user_trades` newest-first and hands the
+trades made since the previous run to a handler, page by page, stopping at the high-water mark (id and time
+of the newest trade of the previous run). Progress is checkpointed to a local JSON file after every page,
+so an interrupted run resumes from the page it stopped at and a run only costs O(new trades).
+
+Trades are delivered at least once: if the handler (or the process) fails in the middle of a page,
+that page is delivered again on the next run. Trade ids are assumed to increase with time.
+
+# Checkpoint.
+```json
+{
+    "version": 1,
+    "market_id": null,
+    "type": null,
+    "high_water": {"id": 3482, "created_at": "2022-04-10T14:20:01.574922+04:30"},
+    "pending": {"newest": {"id": 3490, "created_at": "..."}, "last_id": 3485, "page": 2}
+}
+```
+`pending` is only present while a run is in progress (or was interrupted).
+"""
+
+import inspect
+import json
+import os
+from pathlib import Path
+
+from . import types as t
+
+CHECKPOINT_VERSION = 1
+
+Handler = t.t.Callable[[t.t.List[t.DictStrAny]], t.t.Any]
+
+
+class _TradeHistory:
+    """Checkpoint handling shared by `TradeHistorySync` and `AsyncTradeHistorySync`."""
+
+    def __init__(
+        self,
+        client: t.t.Any,
+        path: t.t.Union[str, Path],
+        market_id: t.OptionalInt = None,
+        type: t.OptionalOrderTypes = None,  # pylint: disable=redefined-builtin
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            client (Client): Logged in client.
+            path (str): Checkpoint file, created on the first run.
+            market_id (int): Only sync trades of this market.
+            type (OrderTypes): Only sync trades of this type.
+
+        Raises:
+            ValueError: The checkpoint was created with other filters.
+        """
+
+        self.client = client
+        self.path = Path(path)
+        self.market_id = market_id
+        self.type = str(type) if type is not None else None
+        self.checkpoint = self._load()
+
+    @property
+    def high_water(self) -> t.OptionalDictStrAny:
+        """
+        Id and time of the newest synced trade.
+
+        Returns:
+            dict: `{"id": ..., "created_at": ...}`, `None` before the first complete run.
+        """
+
+        return self.checkpoint["high_water"]  # type: ignore[no-any-return]
+
+    def reset(self) -> None:
+        """Forget the checkpoint, the next run syncs the whole history."""
+
+        self.path.unlink(missing_ok=True)
+        self.checkpoint = self._load()
+
+    def _load(self) -> t.DictStrAny:
+        if not self.path.exists():
+            return {
+                "version": CHECKPOINT_VERSION,
+                "market_id": self.market_id,
+                "type": self.type,
+                "high_water": None,
+                "pending": None,
+            }
+
+        checkpoint: t.DictStrAny = json.loads(self.path.read_text(encoding="utf-8"))
+        if (checkpoint.get("market_id"), checkpoint.get("type")) != (self.market_id, self.type):
+            raise ValueError(
+                f"{self.path} was created for market_id={checkpoint.get('market_id')} type={checkpoint.get('type')}"
+            )
+        return checkpoint
+
+    def _save(self) -> None:
+        """Write the checkpoint atomically (write a temporary file, fsync, rename)."""
+
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.checkpoint, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+
+    def _start(self) -> int:
+        """Start (or resume) a run, returns the first page to fetch."""
+
+        pending = self.checkpoint["pending"]
+        if pending is None:
+            pending = self.checkpoint["pending"] = {"newest": None, "last_id": None, "page": 1}
+        return int(pending["page"])
+
+    def _select(self, results: t.t.List[t.DictStrAny]) -> t.t.Tuple[t.t.List[t.DictStrAny], bool]:
+        """
+        Select the trades of a page that have not been synced yet.
+
+        Trades at or below the high-water mark end the run. Trades at or above the oldest trade already
+        delivered in this run are skipped (pages shift when trades are made while paging).
+
+        Returns:
+            tuple: New trades and whether the high-water mark was reached.
+        """
+
+        high_water = self.checkpoint["high_water"]
+        last_id = self.checkpoint["pending"]["last_id"]
+        trades: t.t.List[t.DictStrAny] = []
+        for trade in results:
+            if high_water is not None and trade["id"] <= high_water["id"]:
+                return trades, True
+            if last_id is not None and trade["id"] >= last_id:
+                continue
+            trades.append(trade)
+        return trades, False
+
+    def _commit_page(self, trades: t.t.List[t.DictStrAny], page: int) -> None:
+        pending = self.checkpoint["pending"]
+        if trades:
+            newest = max(trades, key=lambda trade: trade["id"])
+            if pending["newest"] is None:
+                pending["newest"] = {"id": newest["id"], "created_at": newest.get("created_at")}
+            pending["last_id"] = min(trade["id"] for trade in trades)
+        pending["page"] = page + 1
+        self._save()
+
+    def _finish(self) -> None:
+        pending = self.checkpoint["pending"]
+        if pending["newest"] is not None:
+            self.checkpoint["high_water"] = pending["newest"]
+        self.checkpoint["pending"] = None
+        self._save()
+
+
+class TradeHistorySync(_TradeHistory):
+    """
+    Trade History Sync.
+
+    Incremental sync of the user trade history with `Client`.
+
+    Example:
+        ```python
+        sync = TradeHistorySync(client, "trades.checkpoint.json", market_id=1)
+        count = sync.run(lambda trades: database.insert(trades))
+        ```
+    """
+
+    def run(self, handler: Handler) -> int:
+        """
+        Deliver the trades made since the previous run.
+
+        Args:
+            handler (callable): Called with the new trades of each page (newest first),
+                the checkpoint is saved after it returns.
+
+        Returns:
+            int: Number of delivered trades.
+        """
+
+        page = self._start()
+        count = 0
+        while True:
+            response = self.client.get_user_trades(self.market_id, self.type, page)
+            results = response.get("results") or []
+            trades, reached = self._select(results)
+            if trades:
+                handler(trades)
+                count += len(trades)
+            self._commit_page(trades, page)
+
+            if reached or not results or not response.get("next"):
+                break
+            page += 1
+
+        self._finish()
+        return count
+
+
+class AsyncTradeHistorySync(_TradeHistory):
+    """
+    Async Trade History Sync.
+
+    Incremental sync of the user trade history with `AsyncClient`.
+
+    Example:
+        ```python
+        sync = AsyncTradeHistorySync(client, "trades.checkpoint.json", market_id=1)
+        count = await sync.run(database.insert_many)
+        ```
+    """
+
+    async def run(self, handler: Handler) -> int:
+        """
+        Deliver the trades made since the previous run.
+
+        Args:
+            handler (callable): Function or coroutine function called with the new trades of each page
+                (newest first), the checkpoint is saved after it returns.
+
+        Returns:
+            int: Number of delivered trades.
+        """
+
+        page = self._start()
+        count = 0
+        while True:
+            response = await self.client.get_user_trades(self.market_id, self.type, page)
+            results = response.get("results") or []
+            trades, reached = self._select(results)
+            if trades:
+                result = handler(trades)
+                if inspect.isawaitable(result):
+                    await result
+                count += len(trades)
+            self._commit_page(trades, page)
+
+            if reached or not results or not response.get("next"):
+                break
+            page += 1
+
+        self._finish()
+        return count
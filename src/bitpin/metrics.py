@@ -0,0 +1,437 @@
+"""
+# Metrics.
+
+Request metrics for the bitpin clients.
+
+# Description.
+This module contains the in-process instrumentation used by `Client` and `AsyncClient`.
+
+Every call that goes through `_request` is recorded per endpoint template and HTTP method:
+status code counters, bytes sent/received and latency histograms for each request phase
+(`queue`, `connect`, `ttfb` and `total`).
+
+Histograms are HDR-style (log-linear buckets) so recording is O(1), memory is bounded and
+percentiles keep a relative error below 1% regardless of the number of samples.
+"""
+
+import re
+import threading
+import time
+from functools import lru_cache
+
+from . import types as t
+
+PHASES = ("queue", "connect", "ttfb", "total")
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(path: str) -> str:
+    """
+    Get endpoint template of a formatted path.
+
+    Numeric path segments and query values are replaced with `{}`, so
+    `mth/actives/1/?type=buy` becomes `mth/actives/{}/?type={}`.
+
+    Args:
+        path (str): Formatted path.
+
+    Returns:
+        str: Endpoint template.
+    """
+
+    path, _, query = path.partition("?")
+    template = "/".join("{}" if _NUMERIC_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+    if query:
+        template += "?" + "&".join(part.partition("=")[0] + "={}" for part in query.split("&"))
+
+    return template
+
+
+class LatencyHistogram:
+    """
+    Latency Histogram.
+
+    Log-linear (HDR-style) histogram of durations with microsecond resolution.
+
+    Attributes:
+        buckets (dict): Sample count per bucket index.
+        count (int): Number of recorded samples.
+        total (float): Sum of recorded samples in seconds.
+        min (float): Smallest recorded sample in seconds.
+        max (float): Largest recorded sample in seconds.
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        """Constructor."""
+
+        self.buckets: t.t.Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Record a duration.
+
+        Args:
+            seconds (float): Duration in seconds.
+        """
+
+        value = int(seconds * 1_000_000) if seconds > 0 else 0
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        index = (shift << self.SUB_BUCKET_BITS) | (value >> shift) if shift > 0 else value
+
+        counts = self.buckets
+        counts[index] = counts.get(index, 0) + 1
+
+        if not self.count or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.count += 1
+        self.total += seconds
+
+    @classmethod
+    def _bucket_value(cls, index: int) -> float:
+        """
+        Get the representative (midpoint) value of a bucket in seconds.
+
+        Args:
+            index (int): Bucket index.
+
+        Returns:
+            float: Value in seconds.
+        """
+
+        shift = index >> cls.SUB_BUCKET_BITS
+        sub_bucket = index & ((1 << cls.SUB_BUCKET_BITS) - 1)
+        if not shift:
+            return sub_bucket / 1_000_000
+
+        lower = sub_bucket << shift
+        upper = ((sub_bucket + 1) << shift) - 1
+        return (lower + upper) / 2 / 1_000_000
+
+    def percentile(self, quantile: float) -> float:
+        """
+        Get the value at quantile.
+
+        Args:
+            quantile (float): Quantile between 0 and 1.
+
+        Returns:
+            float: Value in seconds (0 when empty).
+        """
+
+        if not self.count:
+            return 0.0
+
+        threshold = max(1, int(quantile * self.count + 0.5))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= threshold:
+                return min(max(self._bucket_value(index), self.min), self.max)
+
+        return self.max
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Merge another histogram into this one.
+
+        Args:
+            other (LatencyHistogram): Histogram.
+        """
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def snapshot(self) -> t.DictStrAny:
+        """
+        Snapshot.
+
+        Returns:
+            dict: `count`, `sum`, `min`, `max`, `mean` and percentiles (`p50`, `p90`, `p99`, `p999`) in seconds.
+        """
+
+        result: t.DictStrAny = {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0.0,
+        }
+        for quantile in QUANTILES:
+            result["p" + f"{quantile * 100:g}".replace(".", "")] = self.percentile(quantile)
+
+        return result
+
+
+class RequestTimings:
+    """
+    Request Timings.
+
+    Mutable per-request record filled by the clients while a request is in flight.
+
+    Attributes:
+        start (float): `time.perf_counter()` when the request started.
+        queue (float): Time spent waiting for a free connection.
+        connect (float): Time spent establishing a new connection.
+        ttfb (float): Time to first byte (response headers received).
+        bytes_out (int): Request body size.
+    """
+
+    __slots__ = ("start", "queue", "connect", "ttfb", "bytes_out")
+
+    def __init__(self) -> None:
+        """Constructor."""
+
+        self.start = time.perf_counter()
+        self.queue: t.OptionalFloat = None
+        self.connect: t.OptionalFloat = None
+        self.ttfb: t.OptionalFloat = None
+        self.bytes_out = 0
+
+
+class _EndpointStats:
+    """Counters and histograms of a single (method, endpoint) pair."""
+
+    __slots__ = ("statuses", "bytes_out", "bytes_in", "histograms")
+
+    def __init__(self) -> None:
+        self.statuses: t.t.Dict[str, int] = {}
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.histograms = {phase: LatencyHistogram() for phase in PHASES}
+
+
+class RequestMetrics:
+    """
+    Request Metrics.
+
+    Thread-safe registry of per-endpoint request metrics.
+
+    Methods:
+        observe: Record a finished request.
+        snapshot: Get a point-in-time copy of all metrics.
+        to_prometheus: Render metrics in Prometheus text exposition format.
+        reset: Drop all recorded metrics.
+    """
+
+    def __init__(self) -> None:
+        """Constructor."""
+
+        self._lock = threading.Lock()
+        self._stats: t.t.Dict[t.t.Tuple[str, str], _EndpointStats] = {}
+
+    def observe(
+        self,
+        method: str,
+        endpoint: str,
+        status: t.t.Union[int, str],
+        timings: RequestTimings,
+        bytes_in: int = 0,
+        end: t.OptionalFloat = None,
+    ) -> None:
+        """
+        Record a finished request.
+
+        Args:
+            method (str): HTTP method.
+            endpoint (str): Endpoint template (see `endpoint_template`).
+            status (int | str): HTTP status code or `"error"` when no response was received.
+            timings (RequestTimings): Request timings.
+            bytes_in (int): Response body size.
+            end (float): `time.perf_counter()` when the request finished, defaults to now.
+        """
+
+        total = (end if end is not None else time.perf_counter()) - timings.start
+        key = (str(method).upper(), endpoint)
+        status = str(status)
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes_out += timings.bytes_out
+            stats.bytes_in += bytes_in
+
+            histograms = stats.histograms
+            histograms["total"].record(total)
+            if timings.ttfb is not None:
+                histograms["ttfb"].record(timings.ttfb)
+            if timings.queue is not None:
+                histograms["queue"].record(timings.queue)
+            if timings.connect is not None:
+                histograms["connect"].record(timings.connect)
+
+    def snapshot(self) -> t.t.List[t.DictStrAny]:
+        """
+        Get a point-in-time copy of all metrics.
+
+        Returns:
+            list: One dict per (method, endpoint) with `method`, `endpoint`, `requests`, `statuses`,
+                `bytes_out`, `bytes_in` and `latency` (phase -> histogram snapshot, empty phases omitted).
+        """
+
+        with self._lock:
+            result = []
+            for (method, endpoint), stats in sorted(self._stats.items()):
+                result.append(
+                    {
+                        "method": method,
+                        "endpoint": endpoint,
+                        "requests": sum(stats.statuses.values()),
+                        "statuses": dict(stats.statuses),
+                        "bytes_out": stats.bytes_out,
+                        "bytes_in": stats.bytes_in,
+                        "latency": {
+                            phase: histogram.snapshot()
+                            for phase, histogram in stats.histograms.items()
+                            if histogram.count
+                        },
+                    }
+                )
+
+            return result
+
+    def to_prometheus(self, prefix: str = "bitpin") -> str:
+        """
+        Render metrics in Prometheus text exposition format.
+
+        Latency histograms are exported as summaries (quantiles, `_sum` and `_count`).
+
+        Args:
+            prefix (str): Metric name prefix.
+
+        Returns:
+            str: Prometheus text.
+        """
+
+        requests_total = f"{prefix}_requests_total"
+        bytes_out = f"{prefix}_request_bytes_total"
+        bytes_in = f"{prefix}_response_bytes_total"
+        duration = f"{prefix}_request_duration_seconds"
+
+        counters: t.t.List[str] = []
+        sent: t.t.List[str] = []
+        received: t.t.List[str] = []
+        summaries: t.t.List[str] = []
+
+        for item in self.snapshot():
+            labels = f'method="{item["method"]}",endpoint="{_escape(item["endpoint"])}"'
+            for status, count in sorted(item["statuses"].items()):
+                counters.append(f'{requests_total}{{{labels},status="{status}"}} {count}')
+            sent.append(f"{bytes_out}{{{labels}}} {item['bytes_out']}")
+            received.append(f"{bytes_in}{{{labels}}} {item['bytes_in']}")
+            summaries.extend(_summary_lines(duration, labels, item["latency"]))
+
+        lines = [
+            f"# HELP {requests_total} Requests by endpoint and status code.",
+            f"# TYPE {requests_total} counter",
+            *counters,
+            f"# HELP {bytes_out} Request body bytes sent.",
+            f"# TYPE {bytes_out} counter",
+            *sent,
+            f"# HELP {bytes_in} Response body bytes received.",
+            f"# TYPE {bytes_in} counter",
+            *received,
+            f"# HELP {duration} Request latency by phase.",
+            f"# TYPE {duration} summary",
+            *summaries,
+        ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop all recorded metrics."""
+
+        with self._lock:
+            self._stats.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _summary_lines(name: str, labels: str, latency: t.DictStrAny) -> t.t.List[str]:
+    """Render the summary lines (quantiles, `_sum` and `_count`) of each latency phase."""
+
+    lines = []
+    for phase, snapshot in latency.items():
+        phase_labels = f'{labels},phase="{phase}"'
+        for quantile in QUANTILES:
+            key = "p" + f"{quantile * 100:g}".replace(".", "")
+            lines.append(f'{name}{{{phase_labels},quantile="{quantile:g}"}} {snapshot[key]:.6f}')
+        lines.append(f"{name}_sum{{{phase_labels}}} {snapshot['sum']:.6f}")
+        lines.append(f"{name}_count{{{phase_labels}}} {snapshot['count']}")
+
+    return lines
+
+
+def create_trace_config() -> t.t.Any:
+    """
+    Create an `aiohttp.TraceConfig` filling `RequestTimings` passed as `trace_request_ctx`.
+
+    Returns:
+        aiohttp.TraceConfig: Trace config.
+    """
+
+    import aiohttp  # pylint: disable=import-outside-toplevel
+
+    async def on_request_start(_session, context, _params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings):
+            context.mark = time.perf_counter()
+
+    async def on_connection_queued_end(_session, context, _params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings):
+            now = time.perf_counter()
+            timings.queue = now - context.mark
+            context.mark = now
+
+    async def on_connection_create_start(_session, context, _params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings):
+            context.mark = time.perf_counter()
+
+    async def on_connection_create_end(_session, context, _params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings):
+            timings.connect = time.perf_counter() - context.mark
+
+    async def on_request_chunk_sent(_session, context, params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings) and params.chunk:
+            timings.bytes_out += len(params.chunk)
+
+    async def on_request_end(_session, context, _params):  # type: ignore[no-untyped-def]
+        timings = context.trace_request_ctx
+        if isinstance(timings, RequestTimings):
+            timings.ttfb = time.perf_counter() - timings.start
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
@@ -0,0 +1,280 @@
+"""
+# Middleware.
+
+Request/response middleware for the bitpin clients.
+
+# Description.
+Middlewares are called in order around every request sent by `Client` and `AsyncClient`:
+
+- `before_send` is called in chain order before the request is sent. It may mutate `request.kwargs`
+  (headers, params, timeout, ...) or return a result to skip sending (e.g. a cache hit), in which case
+  the remaining middlewares and the HTTP call are skipped.
+- `after_receive` is called in reverse order with the decoded result and returns the (possibly replaced) result.
+- `on_error` is called in reverse order when sending or any hook raised. It may return a result to recover,
+  set `request.retry = True` to send the request again or return `None` to let the exception propagate.
+
+`AsyncClient` awaits hooks that return awaitables, so both `Middleware` and `AsyncMiddleware` can be used with it.
+"""
+
+import inspect
+
+from . import types as t
+
+
+class RequestContext:  # pylint: disable=too-many-instance-attributes
+    """
+    Request Context.
+
+    State of a single request shared by all middlewares.
+
+    Attributes:
+        method (str): HTTP method.
+        uri (str): Full URI.
+        signed (bool): Whether the request is signed.
+        kwargs (dict): Keyword arguments passed to the HTTP session.
+        endpoint (str): Endpoint template (e.g. `v2/mth/actives/{}/?type={}`).
+        spec (Endpoint): Endpoint definition (see `bitpin.clients.endpoints`), `None` if the request
+            was not made through the endpoint table.
+        attempt (int): Attempt number, starts at 1 and is incremented on every retry.
+        retry (bool): Set in `on_error` to send the request again.
+        response (t.Union[requests.Response, aiohttp.ClientResponse]): Raw response of the current attempt.
+        extra (dict): Free-form storage for middlewares.
+    """
+
+    __slots__ = ("method", "uri", "signed", "kwargs", "endpoint", "spec", "attempt", "retry", "response", "extra")
+
+    def __init__(
+        self,
+        method: t.RequestMethods,
+        uri: str,
+        signed: bool,
+        kwargs: t.DictStrAny,
+        endpoint: str,
+        spec: t.t.Any = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            method (str): HTTP method.
+            uri (str): Full URI.
+            signed (bool): Whether the request is signed.
+            kwargs (dict): Keyword arguments passed to the HTTP session.
+            endpoint (str): Endpoint template.
+            spec (Endpoint): Endpoint definition.
+        """
+
+        self.method = method
+        self.uri = uri
+        self.signed = signed
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.spec = spec
+        self.attempt = 1
+        self.retry = False
+        self.response: t.t.Any = None
+        self.extra: t.DictStrAny = {}
+
+    @property
+    def succeeded(self) -> bool:
+        """
+        Whether the current attempt got a 2xx response.
+
+        Returns:
+            bool: `False` if there is no response (e.g. a result returned by a middleware).
+        """
+
+        status = getattr(self.response, "status_code", None) or getattr(self.response, "status", None)
+        return isinstance(status, int) and 200 <= status < 300
+
+
+class Middleware:
+    """
+    Middleware.
+
+    Base class of synchronous middlewares, every hook is a no-op by default.
+    """
+
+    def before_send(self, request: RequestContext) -> t.OptionalDictStrAny:
+        """
+        Called before the request is sent.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            dict: Result to return without sending the request, or `None` to continue.
+        """
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:  # pylint: disable=unused-argument
+        """
+        Called after a result has been received.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result.
+        """
+
+        return result
+
+    def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:
+        """
+        Called when sending the request or a hook raised.
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            t.Any: Result to recover with, or `None` to propagate the exception (or retry if `request.retry` is set).
+        """
+
+
+class AsyncMiddleware(Middleware):
+    """
+    Async Middleware.
+
+    Base class of asynchronous middlewares (only usable with `AsyncClient`), every hook is a no-op by default.
+    """
+
+    async def before_send(self, request: RequestContext) -> t.OptionalDictStrAny:  # type: ignore[override]  # pylint: disable=invalid-overridden-method
+        """
+        Called before the request is sent.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            dict: Result to return without sending the request, or `None` to continue.
+        """
+
+        return None
+
+    async def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:  # type: ignore[override]  # pylint: disable=invalid-overridden-method
+        """
+        Called after a result has been received.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result.
+        """
+
+        return result
+
+    async def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:  # type: ignore[override]  # pylint: disable=invalid-overridden-method
+        """
+        Called when sending the request or a hook raised.
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            t.Any: Result to recover with, or `None` to propagate the exception (or retry if `request.retry` is set).
+        """
+
+        return None
+
+
+def run_middlewares(
+    middlewares: t.t.Sequence[Middleware],
+    request: RequestContext,
+    send: t.t.Callable[[RequestContext], t.t.Any],
+) -> t.t.Any:
+    """
+    Run a request through synchronous middlewares.
+
+    Args:
+        middlewares (list): Middlewares.
+        request (RequestContext): Request.
+        send (callable): Sends the request and returns the decoded result.
+
+    Returns:
+        t.Any: Result.
+    """
+
+    while True:
+        try:
+            result = None
+            called = 0
+            for middleware in middlewares:
+                called += 1
+                result = middleware.before_send(request)
+                if result is not None:
+                    break
+            else:
+                result = send(request)
+
+            for middleware in reversed(middlewares[:called]):
+                result = middleware.after_receive(request, result)
+
+            return result
+        except Exception as exc:  # pylint: disable=broad-except
+            for middleware in reversed(middlewares):
+                recovered = middleware.on_error(request, exc)
+                if recovered is not None:
+                    return recovered
+
+            if not request.retry:
+                raise
+
+            request.retry = False
+            request.attempt += 1
+
+
+async def _resolve(value: t.t.Any) -> t.t.Any:
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+async def run_async_middlewares(
+    middlewares: t.t.Sequence[Middleware],
+    request: RequestContext,
+    send: t.t.Callable[[RequestContext], t.t.Awaitable[t.t.Any]],
+) -> t.t.Any:
+    """
+    Run a request through synchronous and/or asynchronous middlewares.
+
+    Args:
+        middlewares (list): Middlewares.
+        request (RequestContext): Request.
+        send (callable): Coroutine function that sends the request and returns the decoded result.
+
+    Returns:
+        t.Any: Result.
+    """
+
+    while True:
+        try:
+            result = None
+            called = 0
+            for middleware in middlewares:
+                called += 1
+                result = await _resolve(middleware.before_send(request))
+                if result is not None:
+                    break
+            else:
+                result = await send(request)
+
+            for middleware in reversed(middlewares[:called]):
+                result = await _resolve(middleware.after_receive(request, result))
+
+            return result
+        except Exception as exc:  # pylint: disable=broad-except
+            for middleware in reversed(middlewares):
+                recovered = await _resolve(middleware.on_error(request, exc))
+                if recovered is not None:
+                    return recovered
+
+            if not request.retry:
+                raise
+
+            request.retry = False
+            request.attempt += 1
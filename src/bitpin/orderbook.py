@@ -0,0 +1,453 @@
+"""
+# Order Book.
+
+Vectorized order book analytics: depth, VWAP for a size, slippage and imbalance.
+
+# Description.
+`OrderBook` keeps both sides of a market as NumPy arrays, best level first, with their cumulative amounts and
+values computed once, so a query is a binary search over the levels (about a microsecond) instead of a Python
+loop over `get_orderbook` results:
+
+- `depth(bps)`: amount available within `bps` basis points of the best price.
+- `vwap(size)`: average fill price of a market order of `size` (base amount), `nan` if the book is too thin.
+- `slippage(size)`: distance between that price and the best price, in basis points (positive is a cost).
+- `imbalance(bps)`: `(bids - asks) / (bids + asks)` of the depths within `bps`, in `[-1, 1]`.
+
+`OrderBooks` stacks the books of many markets into padded 2-D arrays and answers the same queries for all of
+them at once (one value per market, sizes may differ per market).
+
+Levels use the `remain` amount of each level (`amount` if absent). `side` is the side of the order being
+considered: `buy` fills against the asks (the `sell` orders), `sell` against the bids.
+
+`numpy` (the `numpy` extra) is imported when the first book is created.
+
+# Example.
+```python
+book = OrderBook.from_responses(client.get_orderbook(1, "buy"), client.get_orderbook(1, "sell"))
+book.vwap(0.5, "buy"), book.slippage(0.5, "buy"), book.depth(25), book.imbalance(25)
+```
+"""
+
+import bisect
+import importlib
+
+from . import types as t
+
+BPS = 1e4
+
+
+def _numpy() -> t.t.Any:
+    try:
+        return importlib.import_module("numpy")
+    except ImportError as e:
+        raise ImportError("Order book analytics require numpy: pip install python-bitpin[numpy]") from e
+
+
+def _levels(numpy: t.t.Any, orders: t.t.Sequence[t.t.Any]) -> t.t.Tuple[t.t.Any, t.t.Any]:
+    """Prices and amounts of orders shaped like `InnerOrderbookResponse`."""
+
+    count = len(orders)
+    prices = numpy.fromiter((order["price"] for order in orders), dtype=numpy.float64, count=count)
+    amounts = numpy.fromiter(
+        (order.get("remain", order.get("amount")) for order in orders), dtype=numpy.float64, count=count
+    )
+    return prices, amounts
+
+
+class _Side:
+    """Levels of one side of a book, best first, with their cumulative amounts and values."""
+
+    __slots__ = ("prices", "amounts", "cum_amount", "cum_value", "sign", "best", "_lists")
+
+    def __init__(self, numpy: t.t.Any, prices: t.t.Any, amounts: t.t.Any, sign: int) -> None:
+        prices = numpy.asarray(prices, dtype=numpy.float64)
+        amounts = numpy.asarray(amounts, dtype=numpy.float64)
+        keep = amounts > 0
+        if not keep.all():
+            prices, amounts = prices[keep], amounts[keep]
+        # asks ascending (sign 1), bids descending (sign -1): `keys` is ascending in both cases
+        order = numpy.argsort(sign * prices, kind="stable")
+        self.prices = prices[order]
+        self.amounts = amounts[order]
+        self.cum_amount = numpy.cumsum(self.amounts)
+        self.cum_value = numpy.cumsum(self.amounts * self.prices)
+        self.sign = sign
+        self.best = float(self.prices[0]) if self.prices.size else float("nan")
+        # scalar queries bisect plain lists: a NumPy call costs more than the whole search at these sizes
+        self._lists: t.t.Tuple[t.t.List[float], ...] = (
+            (sign * self.prices).tolist(),
+            self.prices.tolist(),
+            self.cum_amount.tolist(),
+            self.cum_value.tolist(),
+        )
+
+    def depth(self, bps: float) -> float:
+        """Base amount within `bps` of the best price."""
+
+        keys, _, cum_amount, _ = self._lists
+        if not keys:
+            return 0.0
+        count = bisect.bisect_right(keys, keys[0] * (1 + self.sign * bps / BPS))
+        return cum_amount[count - 1] if count else 0.0
+
+    def vwap(self, size: float) -> float:
+        """Average price of a `size` market order, `nan` if the side can not fill it."""
+
+        _, prices, cum_amount, cum_value = self._lists
+        index = bisect.bisect_left(cum_amount, size)
+        if size <= 0 or index >= len(cum_amount):
+            return float("nan")
+        if not index:
+            return prices[0]
+        return (cum_value[index - 1] + (size - cum_amount[index - 1]) * prices[index]) / size
+
+
+class OrderBook:
+    """
+    Order Book.
+
+    Both sides of a market as arrays.
+
+    Attributes:
+        market_id (int): Market ID, if known.
+    """
+
+    def __init__(
+        self,
+        bids: t.t.Tuple[t.t.Any, t.t.Any],
+        asks: t.t.Tuple[t.t.Any, t.t.Any],
+        market_id: t.OptionalInt = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            bids (tuple): `(prices, amounts)` of the buy orders, in any order.
+            asks (tuple): `(prices, amounts)` of the sell orders, in any order.
+            market_id (int): Market ID.
+
+        Raises:
+            ImportError: `numpy` is not installed.
+        """
+
+        numpy = _numpy()
+        self.market_id = market_id
+        self._sides = {"sell": _Side(numpy, *bids, sign=-1), "buy": _Side(numpy, *asks, sign=1)}
+
+    @classmethod
+    def from_responses(
+        cls,
+        bids: t.OrderbookResponse,
+        asks: t.OrderbookResponse,
+        market_id: t.OptionalInt = None,
+    ) -> "OrderBook":
+        """
+        Create a book from `get_orderbook` responses.
+
+        Args:
+            bids (OrderbookResponse): Response of `get_orderbook(market_id, "buy")`.
+            asks (OrderbookResponse): Response of `get_orderbook(market_id, "sell")`.
+            market_id (int): Market ID.
+
+        Returns:
+            OrderBook: Book.
+        """
+
+        numpy = _numpy()
+        return cls(_levels(numpy, bids["orders"]), _levels(numpy, asks["orders"]), market_id)
+
+    def levels(self, side: t.OrderTypes) -> t.t.Tuple[t.t.Any, t.t.Any]:
+        """
+        Get the levels an order fills against, best first.
+
+        Args:
+            side (str): Side of the order, `buy` (asks) or `sell` (bids).
+
+        Returns:
+            tuple: `(prices, amounts)` arrays.
+        """
+
+        levels = self._sides[side]
+        return levels.prices, levels.amounts
+
+    @property
+    def best_bid(self) -> float:
+        """
+        Best bid.
+
+        Returns:
+            float: Price, `nan` if there are no bids.
+        """
+
+        return self._sides["sell"].best
+
+    @property
+    def best_ask(self) -> float:
+        """
+        Best ask.
+
+        Returns:
+            float: Price, `nan` if there are no asks.
+        """
+
+        return self._sides["buy"].best
+
+    @property
+    def mid(self) -> float:
+        """
+        Mid price.
+
+        Returns:
+            float: Price, `nan` if a side is empty.
+        """
+
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread_bps(self) -> float:
+        """
+        Spread.
+
+        Returns:
+            float: Spread in basis points of the mid price, `nan` if a side is empty.
+        """
+
+        return (self.best_ask - self.best_bid) / self.mid * BPS
+
+    def depth(self, bps: float, side: t.t.Optional[t.OrderTypes] = None) -> t.t.Union[float, t.t.Tuple[float, float]]:
+        """
+        Get the amount within `bps` of the best price.
+
+        Args:
+            bps (float): Distance from the best price in basis points.
+            side (str): Side of the order (`buy` for the asks, `sell` for the bids), both if `None`.
+
+        Returns:
+            t.Union[float, tuple]: Base amount, `(bids, asks)` if `side` is `None`.
+        """
+
+        if side is None:
+            return self._sides["sell"].depth(bps), self._sides["buy"].depth(bps)
+        return self._sides[side].depth(bps)
+
+    def vwap(self, size: float, side: t.OrderTypes) -> float:
+        """
+        Get the average fill price of a market order.
+
+        Args:
+            size (float): Base amount.
+            side (str): Side of the order.
+
+        Returns:
+            float: Price, `nan` if the book can not fill `size`.
+        """
+
+        return self._sides[side].vwap(size)
+
+    def slippage(self, size: float, side: t.OrderTypes) -> float:
+        """
+        Get the slippage of a market order.
+
+        Args:
+            size (float): Base amount.
+            side (str): Side of the order.
+
+        Returns:
+            float: Distance between the average fill price and the best price in basis points, positive for a cost,
+                `nan` if the book can not fill `size`.
+        """
+
+        levels = self._sides[side]
+        return levels.sign * (levels.vwap(size) / levels.best - 1) * BPS
+
+    def imbalance(self, bps: float) -> float:
+        """
+        Get the imbalance of the depths within `bps` of the best prices.
+
+        Args:
+            bps (float): Distance from the best prices in basis points.
+
+        Returns:
+            float: `(bids - asks) / (bids + asks)`, `nan` if the book is empty.
+        """
+
+        bids = self._sides["sell"].depth(bps)
+        asks = self._sides["buy"].depth(bps)
+        total = bids + asks
+        return (bids - asks) / total if total else float("nan")
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        bids, asks = self._sides["sell"], self._sides["buy"]
+        return (
+            f"OrderBook({self.market_id}, {bids.prices.size} bids @ {self.best_bid}, "
+            f"{asks.prices.size} asks @ {self.best_ask})"
+        )
+
+
+class _Stack:
+    """One side of many books, padded to the deepest one."""
+
+    __slots__ = ("best", "keys", "prices", "cum_amount", "cum_value", "sign")
+
+    def __init__(self, numpy: t.t.Any, levels: t.t.Sequence[t.t.Tuple[t.t.Any, t.t.Any]], sign: int) -> None:
+        rows = len(levels)
+        width = max((prices.size for prices, _ in levels), default=0)
+        self.sign = sign
+        self.best = numpy.full(rows, numpy.nan)
+        self.keys = numpy.full((rows, width), numpy.inf)
+        # one more column: the price after the last level is `nan`, so orders too large for a book get `nan`
+        self.prices = numpy.full((rows, width + 1), numpy.nan)
+        # leading zero column: amount/value filled before level `i` is column `i`
+        self.cum_amount = numpy.zeros((rows, width + 1))
+        self.cum_value = numpy.zeros((rows, width + 1))
+        for row, (prices, amounts) in enumerate(levels):
+            count = prices.size
+            if not count:
+                continue
+            cum_amount = numpy.cumsum(amounts)
+            cum_value = numpy.cumsum(amounts * prices)
+            self.best[row] = prices[0]
+            self.keys[row, :count] = sign * prices
+            self.prices[row, :count] = prices
+            self.cum_amount[row, 1 : count + 1] = cum_amount  # noqa: E203
+            self.cum_amount[row, count + 1 :] = cum_amount[-1]  # noqa: E203
+            self.cum_value[row, 1 : count + 1] = cum_value  # noqa: E203
+            self.cum_value[row, count + 1 :] = cum_value[-1]  # noqa: E203
+
+    def depth(self, numpy: t.t.Any, bps: t.t.Any) -> t.t.Any:
+        """Base amounts within `bps` of the best prices, per book."""
+
+        limit = self.sign * self.best * (1 + self.sign * numpy.asarray(bps, dtype=numpy.float64) / BPS)
+        count = (self.keys <= limit[:, None]).sum(axis=1)
+        return self.cum_amount[numpy.arange(count.size), count]
+
+    def vwap(self, numpy: t.t.Any, size: t.t.Any) -> t.t.Any:
+        """Average prices of `size` market orders, per book."""
+
+        size = numpy.broadcast_to(numpy.asarray(size, dtype=numpy.float64), self.best.shape)
+        rows = numpy.arange(size.size)
+        index = (self.cum_amount[:, 1:] < size[:, None]).sum(axis=1)
+        amount = self.cum_amount[rows, index]
+        value = self.cum_value[rows, index]
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            vwap = (value + (size - amount) * self.prices[rows, index]) / size
+        return numpy.where(size > 0, vwap, numpy.nan)
+
+
+class OrderBooks:
+    """
+    Order Books.
+
+    Books of many markets queried at once, every query returns an array with one value per market of `markets`.
+
+    Attributes:
+        markets (list): Market IDs (or keys), in the order of the results.
+    """
+
+    def __init__(self, books: t.t.Mapping[t.t.Any, OrderBook]) -> None:
+        """
+        Constructor.
+
+        Args:
+            books (dict): `OrderBook` by market ID.
+
+        Raises:
+            ImportError: `numpy` is not installed.
+        """
+
+        self._numpy = numpy = _numpy()
+        self.markets = list(books)
+        values = [books[market] for market in self.markets]
+        self._stacks = {
+            "sell": _Stack(numpy, [book.levels("sell") for book in values], -1),
+            "buy": _Stack(numpy, [book.levels("buy") for book in values], 1),
+        }
+
+    @property
+    def mid(self) -> t.t.Any:
+        """
+        Mid prices.
+
+        Returns:
+            numpy.ndarray: Prices, `nan` where a side is empty.
+        """
+
+        return (self._stacks["sell"].best + self._stacks["buy"].best) / 2
+
+    def depth(self, bps: t.t.Any, side: t.OrderTypes) -> t.t.Any:
+        """
+        Get the amounts within `bps` of the best prices.
+
+        Args:
+            bps (t.Union[float, numpy.ndarray]): Distance from the best price in basis points, per market or for all.
+            side (str): Side of the order (`buy` for the asks, `sell` for the bids).
+
+        Returns:
+            numpy.ndarray: Base amounts.
+        """
+
+        return self._stacks[side].depth(self._numpy, bps)
+
+    def vwap(self, size: t.t.Any, side: t.OrderTypes) -> t.t.Any:
+        """
+        Get the average fill prices of market orders.
+
+        Args:
+            size (t.Union[float, numpy.ndarray]): Base amount, per market or for all.
+            side (str): Side of the orders.
+
+        Returns:
+            numpy.ndarray: Prices, `nan` where the book can not fill the size.
+        """
+
+        return self._stacks[side].vwap(self._numpy, size)
+
+    def slippage(self, size: t.t.Any, side: t.OrderTypes) -> t.t.Any:
+        """
+        Get the slippages of market orders.
+
+        Args:
+            size (t.Union[float, numpy.ndarray]): Base amount, per market or for all.
+            side (str): Side of the orders.
+
+        Returns:
+            numpy.ndarray: Slippages in basis points, positive for a cost.
+        """
+
+        stack = self._stacks[side]
+        return stack.sign * (stack.vwap(self._numpy, size) / stack.best - 1) * BPS
+
+    def imbalance(self, bps: t.t.Any) -> t.t.Any:
+        """
+        Get the imbalances of the depths within `bps` of the best prices.
+
+        Args:
+            bps (t.Union[float, numpy.ndarray]): Distance from the best prices in basis points.
+
+        Returns:
+            numpy.ndarray: `(bids - asks) / (bids + asks)`, `nan` where the book is empty.
+        """
+
+        numpy = self._numpy
+        bids = self._stacks["sell"].depth(numpy, bps)
+        asks = self._stacks["buy"].depth(numpy, bps)
+        total = bids + asks
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return numpy.where(total > 0, (bids - asks) / total, numpy.nan)
+
+    def __len__(self) -> int:
+        """
+        Number of markets.
+
+        Returns:
+            int: Number of markets.
+        """
+
+        return len(self.markets)
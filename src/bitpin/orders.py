@@ -0,0 +1,352 @@
+"""
+# Orders.
+
+Local index of the open orders of the account.
+
+# Description.
+`OrderTracker` is a middleware that keeps the open orders in memory from the responses of `create_order`,
+`cancel_order` and `get_user_orders` going through the client, so what is open can be looked up in O(1)
+(by id or `identifier`) or per market without calling `get_user_orders`.
+
+Orders that change on the exchange side (fills, cancellations from another session) are picked up by
+`reconcile` (`reconcile_async` for `AsyncClient`), which sweeps the active orders page by page with
+`stream_user_orders(state="active")` and diffs them with the index. Call it periodically; its cost is
+one request per page of active orders, whatever the number of calls made between two sweeps.
+
+Every change of the index is emitted as an `OrderEvent` to the subscribed callbacks.
+
+| Event        | When                                                                          |
+|--------------|-------------------------------------------------------------------------------|
+| `created`    | An order was created through the client.                                      |
+| `discovered` | An active order unknown to the tracker was found (e.g. created elsewhere).    |
+| `filled`     | The executed amount (`exchanged1`) of an order grew.                          |
+| `canceled`   | An order was canceled through the client.                                     |
+| `closed`     | An order is no longer active (fully filled or canceled elsewhere).            |
+"""
+
+import threading
+import time
+from decimal import Decimal
+
+from . import types as t
+from .clients import endpoints
+from .enums import OrderState
+from .middleware import Middleware, RequestContext
+
+CREATED = "created"
+DISCOVERED = "discovered"
+FILLED = "filled"
+CANCELED = "canceled"
+CLOSED = "closed"
+
+EventHandler = t.t.Callable[["OrderEvent"], t.t.Any]
+
+
+class OrderEvent:
+    """
+    Order Event.
+
+    Attributes:
+        kind (str): `created`, `discovered`, `filled`, `canceled` or `closed`.
+        order (dict): Order, as last seen.
+        previous (dict): Order before the change, `None` for `created` and `discovered`.
+    """
+
+    __slots__ = ("kind", "order", "previous")
+
+    def __init__(self, kind: str, order: t.DictStrAny, previous: t.OptionalDictStrAny = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            kind (str): Kind.
+            order (dict): Order.
+            previous (dict): Order before the change.
+        """
+
+        self.kind = kind
+        self.order = order
+        self.previous = previous
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"OrderEvent({self.kind}: {self.order.get('id')})"
+
+
+def _market_id(order: t.DictStrAny) -> t.OptionalInt:
+    market = order.get("market")
+    return market.get("id") if isinstance(market, dict) else market
+
+
+def _exchanged(order: t.DictStrAny) -> Decimal:
+    return Decimal(str(order.get("exchanged1") or 0))
+
+
+class OrderTracker(Middleware):
+    """
+    Order Tracker.
+
+    Middleware keeping an index of the open orders, usable with `Client` and `AsyncClient`.
+
+    Attributes:
+        last_reconcile (float): Time (epoch) of the last completed `reconcile`, `None` before the first one.
+
+    Example:
+        ```python
+        tracker = OrderTracker()
+        tracker.subscribe(print)
+        client = Client(api_key, api_secret, middlewares=[tracker])
+        client.create_order(1, 0.01, 1_000_000, "limit", "buy", identifier="a1")
+        tracker.by_identifier("a1")
+        tracker.reconcile(client)  # periodically
+        ```
+    """
+
+    def __init__(self, on_event: t.t.Optional[EventHandler] = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            on_event (callable): Called with every `OrderEvent`, more can be added with `subscribe`.
+        """
+
+        self.last_reconcile: t.t.Optional[float] = None
+        self._handlers: t.t.List[EventHandler] = [on_event] if on_event is not None else []
+        self._lock = threading.RLock()
+        self._orders: t.t.Dict[int, t.DictStrAny] = {}
+        self._identifiers: t.t.Dict[str, int] = {}
+        self._markets: t.t.Dict[t.t.Any, t.t.Dict[int, t.DictStrAny]] = {}
+        self._touched: t.t.Dict[int, float] = {}
+
+    def subscribe(self, handler: EventHandler) -> None:
+        """
+        Add an event callback.
+
+        Args:
+            handler (callable): Called with every `OrderEvent`.
+        """
+
+        self._handlers.append(handler)
+
+    def unsubscribe(self, handler: EventHandler) -> None:
+        """
+        Remove an event callback.
+
+        Args:
+            handler (callable): Callback added with `subscribe`.
+        """
+
+        self._handlers.remove(handler)
+
+    def get(self, order_id: int) -> t.OptionalDictStrAny:
+        """
+        Get an open order.
+
+        Args:
+            order_id (int): Order ID.
+
+        Returns:
+            dict: Order, `None` if it is not open.
+        """
+
+        return self._orders.get(int(order_id))
+
+    def by_identifier(self, identifier: str) -> t.OptionalDictStrAny:
+        """
+        Get an open order by its client identifier.
+
+        Args:
+            identifier (str): Identifier given to `create_order`.
+
+        Returns:
+            dict: Order, `None` if it is not open.
+        """
+
+        order_id = self._identifiers.get(identifier)
+        return self._orders.get(order_id) if order_id is not None else None
+
+    def market(self, market_id: int) -> t.t.List[t.DictStrAny]:
+        """
+        Get the open orders of a market.
+
+        Args:
+            market_id (int): Market ID.
+
+        Returns:
+            list: Orders.
+        """
+
+        return list(self._markets.get(market_id, {}).values())
+
+    @property
+    def orders(self) -> t.t.List[t.DictStrAny]:
+        """
+        Get the open orders.
+
+        Returns:
+            list: Orders.
+        """
+
+        return list(self._orders.values())
+
+    def __len__(self) -> int:
+        """
+        Number of open orders.
+
+        Returns:
+            int: Number of open orders.
+        """
+
+        return len(self._orders)
+
+    def __contains__(self, order_id: t.t.Any) -> bool:
+        """
+        Whether an order is open.
+
+        Args:
+            order_id (int): Order ID.
+
+        Returns:
+            bool: Whether the order is open.
+        """
+
+        return order_id in self._orders
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:
+        """
+        Update the index from the result.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result, unchanged.
+        """
+
+        spec = request.spec
+        if spec is endpoints.CREATE_ORDER:
+            self.observe(result, CREATED)
+        elif spec is endpoints.CANCEL_ORDER:
+            # the order is only known to be gone if the exchange accepted the cancel
+            if request.succeeded and isinstance(result, dict) and result.get("status") == "success":
+                order_id = result.get("id") or request.uri.rstrip("/").rsplit("/", 1)[-1]
+                self._remove(int(order_id), CANCELED)
+        elif spec is endpoints.USER_ORDERS and isinstance(result, dict):
+            for order in result.get("results") or ():
+                self.observe(order, DISCOVERED)
+        return result
+
+    def observe(self, order: t.DictStrAny, kind: str = DISCOVERED) -> None:
+        """
+        Update the index with an order as returned by the API.
+
+        Args:
+            order (dict): Order.
+            kind (str): Event to emit if the order is new and active.
+        """
+
+        order_id = order.get("id")
+        if order_id is None:
+            return
+        order_id = int(order_id)
+        active = order.get("state") in (OrderState.ACTIVE.value, OrderState.INITIAL.value)
+
+        with self._lock:
+            previous = self._orders.get(order_id)
+            if previous is None:
+                if active:
+                    self._add(order_id, order)
+                    self._emit(OrderEvent(kind, order))
+                elif kind == CREATED:
+                    self._emit(OrderEvent(CREATED, order))
+                    self._emit(OrderEvent(CLOSED, order, order))
+                return
+
+            if _exchanged(order) > _exchanged(previous):
+                self._emit(OrderEvent(FILLED, order, previous))
+            if active:
+                self._add(order_id, order)
+            else:
+                self._remove(order_id, CLOSED, order)
+
+    def _add(self, order_id: int, order: t.DictStrAny) -> None:
+        self._orders[order_id] = order
+        self._markets.setdefault(_market_id(order), {})[order_id] = order
+        identifier = order.get("identifier")
+        if identifier:
+            self._identifiers[identifier] = order_id
+        self._touched[order_id] = time.time()
+
+    def _remove(self, order_id: int, kind: str, order: t.OptionalDictStrAny = None) -> None:
+        with self._lock:
+            previous = self._orders.pop(order_id, None)
+            self._touched.pop(order_id, None)
+            if previous is None:
+                return
+            market = self._markets.get(_market_id(previous))
+            if market is not None:
+                market.pop(order_id, None)
+                if not market:
+                    self._markets.pop(_market_id(previous), None)
+            identifier = previous.get("identifier")
+            if identifier and self._identifiers.get(identifier) == order_id:
+                del self._identifiers[identifier]
+            self._emit(OrderEvent(kind, order or previous, previous))
+
+    def _emit(self, event: OrderEvent) -> None:
+        for handler in self._handlers:
+            handler(event)
+
+    def _sweep_end(self, started: float, seen: t.t.Set[int]) -> None:
+        """Close the orders missing from a complete sweep, except those touched since it started."""
+
+        with self._lock:
+            for order_id in [order_id for order_id in self._orders if order_id not in seen]:
+                if self._touched.get(order_id, 0.0) < started:
+                    self._remove(order_id, CLOSED)
+        self.last_reconcile = time.time()
+
+    def reconcile(self, client: t.t.Any, market_id: t.OptionalInt = None) -> None:
+        """
+        Sweep the active orders with `Client` and update the index.
+
+        Args:
+            client (Client): Client.
+            market_id (int): Only reconcile this market.
+        """
+
+        started = time.time()
+        seen: t.t.Set[int] = set()
+        for order in client.stream_user_orders(market_id=market_id, state=OrderState.ACTIVE.value):
+            seen.add(int(order["id"]))
+            self.observe(order)
+        self._sweep_end(started, seen if market_id is None else seen | self._outside(market_id))
+
+    async def reconcile_async(self, client: t.t.Any, market_id: t.OptionalInt = None) -> None:
+        """
+        Sweep the active orders with `AsyncClient` and update the index.
+
+        Args:
+            client (AsyncClient): Client.
+            market_id (int): Only reconcile this market.
+        """
+
+        started = time.time()
+        seen: t.t.Set[int] = set()
+        async for order in client.stream_user_orders(market_id=market_id, state=OrderState.ACTIVE.value):
+            seen.add(int(order["id"]))
+            self.observe(order)
+        self._sweep_end(started, seen if market_id is None else seen | self._outside(market_id))
+
+    def _outside(self, market_id: int) -> t.t.Set[int]:
+        """Orders of other markets, kept by a sweep limited to `market_id`."""
+
+        with self._lock:
+            return {order_id for order_id, order in self._orders.items() if _market_id(order) != market_id}
@@ -0,0 +1,382 @@
+"""
+# Pool.
+
+Clients of several accounts sharing one connection pool.
+
+# Description.
+`AccountPool` (`AsyncAccountPool` for asyncio) holds one client per account, keyed by a name of your choice,
+all sending their requests through a single session: connections (and their TLS handshakes) are reused across
+accounts instead of each client opening its own pool, so memory and sockets stay flat as accounts are added.
+
+What belongs to an account stays per account:
+
+- Tokens: every client logs in and refreshes its own tokens (`background_refresh_token` runs on the shared
+  scheduler, see `bitpin.scheduler`).
+- Rate limits: every account gets its own `RateLimiter` (see `bitpin.ratelimit`), the exchange limits
+  requests per account.
+
+Middlewares given to the pool and `metrics` are shared by all accounts.
+"""
+
+from . import types as t
+from .metrics import RequestMetrics, create_trace_config
+from .middleware import Middleware
+from .ratelimit import AsyncRateLimiter, RateLimiter
+
+Limits = t.t.Optional[t.t.Dict[str, t.t.Tuple[float, int]]]
+
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+class _Pool:
+    """Accounts registry shared by `AccountPool` and `AsyncAccountPool`."""
+
+    def __init__(
+        self,
+        limits: Limits = None,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        enable_metrics: bool = True,
+        **client_params: t.t.Any,
+    ) -> None:
+        self.limits = limits
+        self.middlewares: t.t.List[Middleware] = list(middlewares or [])
+        self.metrics: t.t.Optional[RequestMetrics] = RequestMetrics() if enable_metrics else None
+        self.limiters: t.t.Dict[str, RateLimiter] = {}
+        self.session: t.t.Any = None
+        self._client_params = client_params
+        self._clients: t.t.Dict[str, t.t.Any] = {}
+
+    def __getitem__(self, key: str) -> t.t.Any:
+        """
+        Get the client of an account.
+
+        Args:
+            key (str): Account key.
+
+        Returns:
+            Client: Client (`AsyncClient` for `AsyncAccountPool`).
+
+        Raises:
+            KeyError: Unknown account.
+        """
+
+        return self._clients[key]
+
+    def __contains__(self, key: t.t.Any) -> bool:
+        """
+        Whether an account is in the pool.
+
+        Args:
+            key (str): Account key.
+
+        Returns:
+            bool: Whether the account is in the pool.
+        """
+
+        return key in self._clients
+
+    def __len__(self) -> int:
+        """
+        Number of accounts.
+
+        Returns:
+            int: Number of accounts.
+        """
+
+        return len(self._clients)
+
+    def keys(self) -> t.t.List[str]:
+        """
+        Get the account keys.
+
+        Returns:
+            list: Account keys.
+        """
+
+        return list(self._clients)
+
+    def call(self, key: str, name: str, **kwargs: t.t.Any) -> t.t.Any:
+        """
+        Call an endpoint of the endpoint table with the client of an account.
+
+        Args:
+            key (str): Account key.
+            name (str): Endpoint name (see `bitpin.clients.endpoints.ENDPOINTS`).
+            **kwargs: Endpoint parameters and session kwargs.
+
+        Returns:
+            t.Any: Response (awaitable for `AsyncAccountPool`).
+
+        Raises:
+            KeyError: Unknown account or endpoint.
+        """
+
+        return self._clients[key].call(name, **kwargs)
+
+    def _params(self, key: str, limiter: RateLimiter, params: t.DictStrAny) -> t.DictStrAny:
+        if key in self._clients:
+            raise ValueError(f"account {key!r} is already in the pool")
+        self.limiters[key] = limiter
+        return {
+            **self._client_params,
+            **params,
+            "enable_metrics": False,
+            "middlewares": [limiter, *self.middlewares],
+            "session": self.session,
+        }
+
+    def _register(self, key: str, client: t.t.Any) -> t.t.Any:
+        client.metrics = self.metrics
+        self._clients[key] = client
+        return client
+
+
+class AccountPool(_Pool):
+    """
+    Account Pool.
+
+    `Client` per account over a shared `requests.Session`.
+
+    Attributes:
+        limits (dict): Default rate limits of the accounts (see `bitpin.ratelimit.RateLimiter`).
+        middlewares (list): Middlewares shared by all accounts, run after the account's rate limiter.
+        metrics (RequestMetrics): Request metrics of all accounts, `None` if disabled.
+        limiters (dict): `RateLimiter` by account key.
+        session (requests.Session): Shared session.
+
+    Example:
+        ```python
+        pool = AccountPool(background_refresh_token=True)
+        pool.add("alice", api_key_1, api_secret_1)
+        pool.add("bob", api_key_2, api_secret_2)
+        pool["alice"].get_wallets()
+        pool.call("bob", "user_orders", state="active")
+        pool.close()
+        ```
+    """
+
+    def __init__(
+        self,
+        limits: Limits = None,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        enable_metrics: bool = True,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        **client_params: t.t.Any,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            limits (dict): Default rate limits of the accounts, defaults to `bitpin.ratelimit.DEFAULT_LIMITS`.
+            middlewares (list): Middlewares shared by all accounts.
+            enable_metrics (bool): Record the requests of all accounts in `metrics`.
+            max_connections (int): Maximum number of connections kept open.
+            **client_params: Other `Client` arguments (`requests_params`, `background_refresh_token`, ...).
+        """
+
+        import requests  # pylint: disable=import-outside-toplevel
+
+        super().__init__(limits, middlewares, enable_metrics, **client_params)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_connections)
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
+        self.session.headers["Accept"] = "application/json"
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def add(
+        self, key: str, api_key: t.OptionalStr = None, api_secret: t.OptionalStr = None, **params: t.t.Any
+    ) -> t.t.Any:
+        """
+        Add an account, its client logs in on its first signed request.
+
+        Args:
+            key (str): Account key.
+            api_key (str): API key.
+            api_secret (str): API secret.
+            **params: `Client` arguments of this account (`access_token`, ...), `limits` overrides the pool's.
+
+        Returns:
+            Client: Client of the account.
+
+        Raises:
+            ValueError: The account is already in the pool.
+        """
+
+        from .clients.client import Client  # pylint: disable=import-outside-toplevel
+
+        limiter = RateLimiter(params.pop("limits", self.limits))
+        client_params = self._params(key, limiter, params)
+        try:
+            client = Client(api_key, api_secret, **client_params)
+        except BaseException:
+            self.limiters.pop(key, None)
+            raise
+        return self._register(key, client)
+
+    def remove(self, key: str) -> None:
+        """
+        Remove an account and cancel its background jobs.
+
+        Args:
+            key (str): Account key.
+        """
+
+        client = self._clients.pop(key, None)
+        self.limiters.pop(key, None)
+        if client is not None:
+            client.close_connection()
+
+    def close(self) -> None:
+        """Remove every account and close the session."""
+
+        for key in self.keys():
+            self.remove(key)
+        self.session.close()
+
+    def __enter__(self) -> "AccountPool":
+        """
+        Enter the context.
+
+        Returns:
+            AccountPool: Pool.
+        """
+
+        return self
+
+    def __exit__(self, *args: t.t.Any) -> None:
+        """Close the pool."""
+
+        self.close()
+
+
+class AsyncAccountPool(_Pool):
+    """
+    Async Account Pool.
+
+    `AsyncClient` per account over a shared `aiohttp.ClientSession`, created on the running event loop with
+    the first account.
+
+    Attributes:
+        limits (dict): Default rate limits of the accounts (see `bitpin.ratelimit.AsyncRateLimiter`).
+        middlewares (list): Middlewares shared by all accounts, run after the account's rate limiter.
+        metrics (RequestMetrics): Request metrics of all accounts, `None` if disabled.
+        limiters (dict): `AsyncRateLimiter` by account key.
+        session (aiohttp.ClientSession): Shared session, `None` before the first account.
+
+    Example:
+        ```python
+        async with AsyncAccountPool(background_refresh_token=True) as pool:
+            await asyncio.gather(*(pool.add(name, key, secret) for name, (key, secret) in accounts.items()))
+            wallets = await asyncio.gather(*(pool[name].get_wallets() for name in pool.keys()))
+        ```
+    """
+
+    def __init__(
+        self,
+        limits: Limits = None,
+        middlewares: t.t.Optional[t.t.List[Middleware]] = None,
+        enable_metrics: bool = True,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        session_params: t.OptionalDictStrAny = None,
+        **client_params: t.t.Any,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            limits (dict): Default rate limits of the accounts, defaults to `bitpin.ratelimit.DEFAULT_LIMITS`.
+            middlewares (list): Middlewares shared by all accounts.
+            enable_metrics (bool): Record the requests of all accounts in `metrics`.
+            max_connections (int): Maximum number of simultaneous connections.
+            session_params (dict): `aiohttp.ClientSession` params.
+            **client_params: Other `AsyncClient` arguments (`requests_params`, `background_refresh_token`, ...).
+        """
+
+        super().__init__(limits, middlewares, enable_metrics, **client_params)
+        self.max_connections = max_connections
+        self._session_params = session_params or {}
+
+    def _init_session(self) -> t.t.Any:
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        session_params = dict(self._session_params)
+        session_params.setdefault("connector", aiohttp.TCPConnector(limit=self.max_connections))
+        if self.metrics is not None:
+            session_params["trace_configs"] = [*session_params.get("trace_configs", []), create_trace_config()]
+        return aiohttp.ClientSession(
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+            **session_params,
+        )
+
+    async def add(
+        self, key: str, api_key: t.OptionalStr = None, api_secret: t.OptionalStr = None, **params: t.t.Any
+    ) -> t.t.Any:
+        """
+        Add an account, logging in with its credentials.
+
+        Args:
+            key (str): Account key.
+            api_key (str): API key.
+            api_secret (str): API secret.
+            **params: `AsyncClient` arguments of this account (`access_token`, ...), `limits` overrides the pool's.
+
+        Returns:
+            AsyncClient: Client of the account.
+
+        Raises:
+            ValueError: The account is already in the pool.
+        """
+
+        from .clients.async_client import AsyncClient  # pylint: disable=import-outside-toplevel
+
+        if self.session is None:
+            self.session = self._init_session()
+        limiter = AsyncRateLimiter(params.pop("limits", self.limits))
+        client_params = self._params(key, limiter, params)
+        try:
+            client = await AsyncClient.create(api_key, api_secret, **client_params)
+        except BaseException:
+            self.limiters.pop(key, None)
+            raise
+        return self._register(key, client)
+
+    async def remove(self, key: str) -> None:
+        """
+        Remove an account and cancel its background jobs.
+
+        Args:
+            key (str): Account key.
+        """
+
+        client = self._clients.pop(key, None)
+        self.limiters.pop(key, None)
+        if client is not None:
+            await client.close_connection()
+
+    async def close(self) -> None:
+        """Remove every account and close the session."""
+
+        for key in self.keys():
+            await self.remove(key)
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> "AsyncAccountPool":
+        """
+        Enter the context.
+
+        Returns:
+            AsyncAccountPool: Pool.
+        """
+
+        return self
+
+    async def __aexit__(self, *args: t.t.Any) -> None:
+        """Close the pool."""
+
+        await self.close()
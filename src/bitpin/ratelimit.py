@@ -0,0 +1,180 @@
+"""
+# Rate Limit.
+
+Client-side rate limiting per endpoint rate-limit class.
+
+# Description.
+Every endpoint of `bitpin.clients.endpoints` belongs to a rate-limit class (`auth`, `public`, `private`,
+`order`). `RateLimiter` (and `AsyncRateLimiter` for `AsyncClient`) is a middleware holding one token bucket
+per class: a request takes a token, and waits for the bucket to refill when it is empty, so bursts are
+smoothed locally instead of being rejected by the exchange.
+
+Buckets hand out reservations (the wait time of a request is decided when it arrives), so concurrent
+requests are served in arrival order without busy polling. A request that would wait past the current deadline
+(see `bitpin.timeouts.deadline`) fails right away with `DeadlineExceeded` and gives its token back.
+
+Pages of `stream_user_orders` and `stream_user_trades` take a token too, although other middlewares
+are not applied to streams.
+
+`DEFAULT_LIMITS` are conservative; pass the limits of your account to the constructor.
+"""
+
+import asyncio
+import threading
+import time
+
+from . import types as t
+from .clients import endpoints
+from .exceptions import DeadlineExceeded
+from .middleware import AsyncMiddleware, Middleware, RequestContext
+from .timeouts import remaining
+
+# Requests per second and burst size by rate-limit class
+DEFAULT_LIMITS: t.t.Dict[str, t.t.Tuple[float, int]] = {
+    endpoints.RATE_LIMIT_AUTH: (0.5, 5),
+    endpoints.RATE_LIMIT_PUBLIC: (20.0, 40),
+    endpoints.RATE_LIMIT_PRIVATE: (5.0, 10),
+    endpoints.RATE_LIMIT_ORDER: (5.0, 10),
+}
+
+
+class TokenBucket:
+    """
+    Token Bucket.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (int): Maximum number of tokens (burst size).
+        tokens (float): Available tokens, negative when requests are waiting.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "_updated", "_lock")
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        """
+        Constructor.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum number of tokens.
+        """
+
+        self.rate = float(rate)
+        self.capacity = max(int(capacity), 1)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token.
+
+        Returns:
+            float: Seconds to wait before the token is available (0 if available now).
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self._updated) * self.rate, self.capacity) - 1
+            self._updated = now
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def cancel(self) -> None:
+        """Give back a token taken with `reserve`."""
+
+        with self._lock:
+            self.tokens = min(self.tokens + 1, self.capacity)
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"TokenBucket({self.rate}/s, burst {self.capacity})"
+
+
+class RateLimiter(Middleware):
+    """
+    Rate Limiter.
+
+    Middleware delaying requests that exceed the limits of their rate-limit class.
+
+    Attributes:
+        buckets (dict): `TokenBucket` by rate-limit class.
+        waited (float): Total seconds requests were delayed.
+    """
+
+    def __init__(self, limits: t.t.Optional[t.t.Dict[str, t.t.Tuple[float, int]]] = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            limits (dict): Requests per second and burst size by rate-limit class, classes that are missing
+                are not limited. Defaults to `DEFAULT_LIMITS`.
+        """
+
+        self.buckets = {
+            name: TokenBucket(rate, burst)
+            for name, (rate, burst) in (DEFAULT_LIMITS if limits is None else limits).items()
+        }
+        self.waited = 0.0
+
+    def _reserve(self, request: RequestContext) -> float:
+        spec = request.spec
+        bucket = self.buckets.get(spec.rate_limit) if spec is not None else None
+        if bucket is None:
+            return 0.0
+        wait = bucket.reserve()
+        left = remaining()
+        if left is not None and wait > left:
+            bucket.cancel()
+            raise DeadlineExceeded(f"{spec.rate_limit} rate limit would delay {spec.name} past the deadline")
+        self.waited += wait
+        return wait
+
+    def before_send(self, request: RequestContext) -> None:
+        """
+        Wait for a token of the request's rate-limit class.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            None: The request is always sent.
+
+        Raises:
+            DeadlineExceeded: The wait would exceed the current deadline.
+        """
+
+        wait = self._reserve(request)
+        if wait:
+            time.sleep(wait)
+
+
+class AsyncRateLimiter(AsyncMiddleware, RateLimiter):  # type: ignore[misc]
+    """
+    Async Rate Limiter.
+
+    `RateLimiter` for `AsyncClient`, waiting requests yield to the event loop.
+    """
+
+    async def before_send(self, request: RequestContext) -> None:  # type: ignore[override]
+        """
+        Wait for a token of the request's rate-limit class.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            None: The request is always sent.
+
+        Raises:
+            DeadlineExceeded: The wait would exceed the current deadline.
+        """
+
+        wait = self._reserve(request)
+        if wait:
+            await asyncio.sleep(wait)
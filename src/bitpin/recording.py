@@ -0,0 +1,640 @@
+"""
+# Recording.
+
+Record-and-replay transport for the bitpin clients.
+
+# Description.
+`Recorder` (and `AsyncRecorder` for `AsyncClient`) is a middleware that captures every request/response
+pair going through `_request` (method, URI, status, headers, raw body and latency) into an append-only file.
+
+`ReplaySession` (and `AsyncReplaySession`) is a drop-in replacement for the client's HTTP session
+that serves recorded responses back, waiting the recorded latency multiplied by `time_scale`
+(`0` serves responses immediately), so decode and strategy code can be benchmarked offline on real payloads.
+
+# File format.
+The file starts with `MAGIC`, followed by one record per exchange:
+a big-endian `uint32` metadata length, a big-endian `uint32` body length,
+the metadata encoded as JSON and the raw response body.
+"""
+
+import asyncio
+import datetime
+import io
+import json
+import struct
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+
+from . import types as t
+from .exceptions import RequestException
+from .metrics import endpoint_template
+from .middleware import (
+    AsyncMiddleware,
+    Middleware,
+    RequestContext,
+)
+
+MAGIC = b"BPREC\x01"
+
+DEFAULT_EXCLUDE = ("usr/api/login/", "usr/refresh_token/")
+
+_HEADER = struct.Struct(">II")
+
+PathLike = t.t.Union[str, Path]
+
+
+class Exchange:
+    """
+    Exchange.
+
+    A recorded request/response pair.
+
+    Attributes:
+        method (str): HTTP method (lowercase).
+        uri (str): Full URI.
+        status (int): Status code.
+        headers (dict): Response headers.
+        body (bytes): Raw response body.
+        elapsed (float): Latency of the request in seconds.
+        timestamp (float): Unix time the request was sent at.
+    """
+
+    __slots__ = ("method", "uri", "status", "headers", "body", "elapsed", "timestamp")
+
+    def __init__(
+        self,
+        method: str,
+        uri: str,
+        status: int,
+        headers: t.t.Dict[str, str],
+        body: bytes,
+        elapsed: float,
+        timestamp: float,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            method (str): HTTP method.
+            uri (str): Full URI.
+            status (int): Status code.
+            headers (dict): Response headers.
+            body (bytes): Raw response body.
+            elapsed (float): Latency of the request in seconds.
+            timestamp (float): Unix time the request was sent at.
+        """
+
+        self.method = method.lower()
+        self.uri = uri
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+        self.timestamp = timestamp
+
+    @property
+    def endpoint(self) -> str:
+        """
+        Endpoint template of the URI (e.g. `v1/mth/actives/{}/?type={}`).
+
+        Returns:
+            str: Endpoint template.
+        """
+
+        return _uri_template(self.uri)
+
+
+def _uri_template(uri: str) -> str:
+    parts = urlsplit(uri)
+    path = parts.path.lstrip("/")
+    return endpoint_template(f"{path}?{parts.query}" if parts.query else path)
+
+
+class RecordingWriter:
+    """
+    Recording Writer.
+
+    Thread-safe append-only writer of recording files.
+    """
+
+    def __init__(self, path: PathLike) -> None:
+        """
+        Constructor.
+
+        Args:
+            path (str): Recording file, created if missing and appended to otherwise.
+        """
+
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")  # pylint: disable=consider-using-with
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def write(self, exchange: Exchange) -> None:
+        """
+        Append an exchange.
+
+        Args:
+            exchange (Exchange): Exchange.
+        """
+
+        meta = json.dumps(
+            {
+                "method": exchange.method,
+                "uri": exchange.uri,
+                "status": exchange.status,
+                "headers": exchange.headers,
+                "elapsed": exchange.elapsed,
+                "timestamp": exchange.timestamp,
+            },
+            separators=(",", ":"),
+        ).encode()
+
+        with self._lock:
+            self._file.write(_HEADER.pack(len(meta), len(exchange.body)))
+            self._file.write(meta)
+            self._file.write(exchange.body)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path: PathLike) -> t.t.Iterator[Exchange]:
+    """
+    Read a recording file.
+
+    A truncated trailing record (e.g. the recording process was killed mid-write) is ignored.
+
+    Args:
+        path (str): Recording file.
+
+    Yields:
+        Exchange: Recorded exchanges in recording order.
+
+    Raises:
+        ValueError: The file is not a recording.
+    """
+
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a bitpin recording")
+
+        while True:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+
+            meta_size, body_size = _HEADER.unpack(header)
+            meta = file.read(meta_size)
+            body = file.read(body_size)
+            if len(meta) < meta_size or len(body) < body_size:
+                return
+
+            _ = json.loads(meta)
+            yield Exchange(_["method"], _["uri"], _["status"], _["headers"], body, _["elapsed"], _["timestamp"])
+
+
+class Recorder(Middleware):
+    """
+    Recorder.
+
+    Middleware recording every response received by `Client` (use `AsyncRecorder` with `AsyncClient`).
+
+    Notes:
+        Request bodies are not recorded. Responses of `exclude` endpoints (login and token refresh by default)
+        are skipped so tokens do not end up in recordings.
+    """
+
+    def __init__(self, path: PathLike, exclude: t.t.Sequence[str] = DEFAULT_EXCLUDE) -> None:
+        """
+        Constructor.
+
+        Args:
+            path (str): Recording file, created if missing and appended to otherwise.
+            exclude (list): Endpoints (substrings of the endpoint template) not to record.
+        """
+
+        self.writer = RecordingWriter(path)
+        self.exclude = tuple(exclude)
+
+    def before_send(self, request: RequestContext) -> None:
+        """
+        Stamp the request start time.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            None: Always sends the request.
+        """
+
+        request.extra["recorder"] = (time.time(), time.perf_counter(), None)
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:
+        """
+        Record the response.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result.
+        """
+
+        response = self._pending(request)
+        if response is not None:
+            self._write(request, response.status_code, dict(response.headers), response.content)
+        return result
+
+    def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:
+        """
+        Record the error response, if any.
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            None: Never recovers.
+        """
+
+        self.after_receive(request, None)
+
+    def close(self) -> None:
+        """Close the recording file."""
+
+        self.writer.close()
+
+    def _pending(self, request: RequestContext) -> t.t.Any:
+        """Get the response of the request if it has not been recorded yet."""
+
+        response = request.response
+        if response is None or "recorder" not in request.extra or request.extra["recorder"][2] is response:
+            return None
+        if any(endpoint in request.endpoint for endpoint in self.exclude):
+            return None
+        return response
+
+    def _write(self, request: RequestContext, status: int, headers: t.t.Dict[str, str], body: bytes) -> None:
+        timestamp, start, _ = request.extra["recorder"]
+        request.extra["recorder"] = (timestamp, start, request.response)
+        self.writer.write(
+            Exchange(request.method, request.uri, status, headers, body, time.perf_counter() - start, timestamp)
+        )
+
+
+class AsyncRecorder(AsyncMiddleware, Recorder):  # type: ignore[misc]
+    """
+    Async Recorder.
+
+    Middleware recording every response received by `AsyncClient`.
+
+    Notes:
+        Request bodies are not recorded. Responses of `exclude` endpoints (login and token refresh by default)
+        are skipped so tokens do not end up in recordings.
+    """
+
+    async def before_send(self, request: RequestContext) -> None:  # type: ignore[override]
+        """
+        Stamp the request start time.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            None: Always sends the request.
+        """
+
+        Recorder.before_send(self, request)
+
+    async def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:  # type: ignore[override]
+        """
+        Record the response.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result.
+        """
+
+        response = self._pending(request)
+        if response is not None:
+            # The connection is released by now (`read` raises), the body read by `_handle_response` is kept by aiohttp.
+            body = response._body or b""  # pylint: disable=protected-access
+            self._write(request, response.status, dict(response.headers), body)
+        return result
+
+    async def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:  # type: ignore[override]
+        """
+        Record the error response, if any.
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            None: Never recovers.
+        """
+
+        await self.after_receive(request, None)
+        return None
+
+
+class _ReplayIndex:
+    """Recorded exchanges indexed by exact URI and by endpoint template."""
+
+    def __init__(self, recording: t.t.Union[PathLike, t.t.Iterable[Exchange]], cycle: bool) -> None:
+        exchanges = read_recording(recording) if isinstance(recording, (str, Path)) else recording
+        self._by_uri: t.t.Dict[t.t.Tuple[str, str], t.t.Deque[Exchange]] = {}
+        self._by_endpoint: t.t.Dict[t.t.Tuple[str, str], t.t.Deque[Exchange]] = {}
+        for exchange in exchanges:
+            self._by_uri.setdefault((exchange.method, exchange.uri), deque()).append(exchange)
+            self._by_endpoint.setdefault((exchange.method, exchange.endpoint), deque()).append(exchange)
+        self._cycle = cycle
+        self._lock = threading.Lock()
+
+    def lookup(self, method: str, uri: str) -> Exchange:
+        """Get the next recorded exchange of a request."""
+
+        method = method.lower()
+        with self._lock:
+            queue = self._by_uri.get((method, uri)) or self._by_endpoint.get((method, _uri_template(uri)))
+            if not queue:
+                raise RequestException(f"No recorded response for {method.upper()} {uri}")
+
+            exchange = queue.popleft()
+            if self._cycle:
+                queue.append(exchange)
+            return exchange
+
+
+class ReplaySession(requests.Session):
+    """
+    Replay Session.
+
+    `requests` session serving recorded responses, replaces `Client.session`.
+
+    Responses are matched by method and URI, falling back to the endpoint template
+    (so `get_orderbook(2, ...)` is served with a recorded `get_orderbook(1, ...)`).
+    Responses recorded for the same key are served in recording order.
+    """
+
+    def __init__(
+        self,
+        recording: t.t.Union[PathLike, t.t.Iterable[Exchange]],
+        time_scale: float = 1.0,
+        cycle: bool = True,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            recording (str): Recording file or exchanges.
+            time_scale (float): Multiplier of recorded latencies, `0` to respond immediately.
+            cycle (bool): Start over when the responses of a key are exhausted, raise `RequestException` otherwise.
+        """
+
+        super().__init__()
+        self._index = _ReplayIndex(recording, cycle)
+        self.time_scale = time_scale
+
+    def request(  # type: ignore[no-untyped-def, override]
+        self, method: str, url: str, *_, **kwargs
+    ) -> requests.Response:
+        """
+        Serve a recorded response.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL.
+            **kwargs: Request kwargs.
+
+        Returns:
+            requests.Response: Response.
+        """
+
+        exchange = self._index.lookup(method, url)
+        if self.time_scale > 0 and exchange.elapsed > 0:
+            time.sleep(exchange.elapsed * self.time_scale)
+
+        response = requests.Response()
+        response.status_code = exchange.status
+        response.headers = requests.structures.CaseInsensitiveDict(exchange.headers)
+        response.raw = io.BytesIO(exchange.body)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+        response.url = url
+        response.elapsed = datetime.timedelta(seconds=exchange.elapsed)
+        response.request = requests.Request(
+            method.upper(),
+            url,
+            headers=kwargs.get("headers"),
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            json=kwargs.get("json"),
+        ).prepare()
+        return response
+
+
+class _ReplayContent:
+    """Stand-in of `aiohttp.StreamReader` exposing the number of bytes received and the body in chunks."""
+
+    __slots__ = ("total_bytes", "_body")
+
+    def __init__(self, body: bytes) -> None:
+        self.total_bytes = len(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        """
+        Read the body.
+
+        Returns:
+            bytes: Body.
+        """
+
+        return self._body
+
+    async def iter_chunked(self, size: int) -> t.t.AsyncIterator[bytes]:
+        """
+        Iterate over the body.
+
+        Args:
+            size (int): Chunk size.
+
+        Yields:
+            bytes: Chunks of at most `size` bytes.
+        """
+
+        body = memoryview(self._body)
+        while body:
+            chunk, body = body[:size], body[size:]
+            yield bytes(chunk)
+
+
+class ReplayResponse:
+    """
+    Replay Response.
+
+    Subset of `aiohttp.ClientResponse` used by `AsyncClient`, served by `AsyncReplaySession`.
+
+    Attributes:
+        method (str): HTTP method.
+        url (yarl.URL): URL.
+        status (int): Status code.
+        headers (dict): Response headers.
+        request_info (aiohttp.RequestInfo): Request info.
+        content (object): Exposes `total_bytes` and `iter_chunked`.
+    """
+
+    def __init__(self, method: str, url: str, exchange: Exchange, time_scale: float) -> None:
+        """
+        Constructor.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL.
+            exchange (Exchange): Recorded exchange.
+            time_scale (float): Multiplier of the recorded latency.
+        """
+
+        import aiohttp  # pylint: disable=import-outside-toplevel
+        from multidict import CIMultiDict, CIMultiDictProxy  # pylint: disable=import-outside-toplevel
+        from yarl import URL  # pylint: disable=import-outside-toplevel
+
+        self.method = method.upper()
+        self.url = URL(url)
+        self.status = exchange.status
+        self.headers = CIMultiDictProxy(CIMultiDict(exchange.headers))
+        self.request_info = aiohttp.RequestInfo(self.url, self.method, CIMultiDictProxy(CIMultiDict()), self.url)
+        self.content = _ReplayContent(exchange.body)
+        self._delay = exchange.elapsed * time_scale
+
+    async def __aenter__(self) -> "ReplayResponse":
+        """Wait the (scaled) recorded latency."""
+
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+        return self
+
+    async def __aexit__(self, *_: t.t.Any) -> None:
+        """Nothing to release."""
+
+    async def read(self) -> bytes:
+        """
+        Read the body.
+
+        Returns:
+            bytes: Body.
+        """
+
+        return await self.content.read()
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        """
+        Read the body as text.
+
+        Args:
+            encoding (str): Encoding.
+
+        Returns:
+            str: Body.
+        """
+
+        return (await self.content.read()).decode(encoding)
+
+    async def json(self, loads: t.t.Callable[[t.t.Any], t.t.Any] = json.loads) -> t.t.Any:
+        """
+        Read the body as JSON.
+
+        Args:
+            loads (callable): JSON decoder.
+
+        Returns:
+            t.Any: Decoded body.
+        """
+
+        body = await self.content.read()
+        return loads(body) if body else None
+
+
+class AsyncReplaySession:
+    """
+    Async Replay Session.
+
+    Stand-in of `aiohttp.ClientSession` serving recorded responses, replaces `AsyncClient.session`.
+
+    Responses are matched by method and URI, falling back to the endpoint template
+    (so `get_orderbook(2, ...)` is served with a recorded `get_orderbook(1, ...)`).
+    Responses recorded for the same key are served in recording order.
+    """
+
+    def __init__(
+        self,
+        recording: t.t.Union[PathLike, t.t.Iterable[Exchange]],
+        time_scale: float = 1.0,
+        cycle: bool = True,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            recording (str): Recording file or exchanges.
+            time_scale (float): Multiplier of recorded latencies, `0` to respond immediately.
+            cycle (bool): Start over when the responses of a key are exhausted, raise `RequestException` otherwise.
+        """
+
+        self._index = _ReplayIndex(recording, cycle)
+        self.time_scale = time_scale
+        self.closed = False
+
+    def request(self, method: str, url: str, **_: t.t.Any) -> ReplayResponse:
+        """
+        Serve a recorded response.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL.
+
+        Returns:
+            ReplayResponse: Response, to be used as an async context manager.
+        """
+
+        return ReplayResponse(method, url, self._index.lookup(method, url), self.time_scale)
+
+    def get(self, url: str, **kwargs: t.t.Any) -> ReplayResponse:
+        """Serve a recorded GET response."""
+
+        return self.request("get", url, **kwargs)
+
+    def post(self, url: str, **kwargs: t.t.Any) -> ReplayResponse:
+        """Serve a recorded POST response."""
+
+        return self.request("post", url, **kwargs)
+
+    def put(self, url: str, **kwargs: t.t.Any) -> ReplayResponse:
+        """Serve a recorded PUT response."""
+
+        return self.request("put", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: t.t.Any) -> ReplayResponse:
+        """Serve a recorded DELETE response."""
+
+        return self.request("delete", url, **kwargs)
+
+    async def close(self) -> None:
+        """Close the session."""
+
+        self.closed = True
@@ -0,0 +1,433 @@
+"""
+# Scheduler.
+
+Shared timer heap for periodic background work.
+
+# Description.
+`Scheduler` runs periodic jobs (token refresh, relogin, cache refresh, order reconciliation, ...) of any
+number of clients on a single daemon thread: jobs are kept in a heap ordered by their next run time and the
+thread sleeps until the earliest one is due. `AsyncScheduler` does the same with a single task per event loop.
+Thread (or task) count is constant whatever the number of clients; each job costs a heap entry.
+
+Clients use the shared default schedulers (`get_scheduler`, `get_async_scheduler`) for `background_relogin`
+and `background_refresh_token` unless another scheduler is given, and cancel their jobs on `close_connection`.
+
+A job that raises is retried after `retry` seconds (default `min(interval, 30)`) instead of its interval,
+the exception is kept in `Job.last_error` and passed to the scheduler's `on_error` callback.
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import os
+import threading
+import time
+import weakref
+
+from . import types as t
+
+DEFAULT_RETRY = 30.0
+
+ErrorHandler = t.t.Callable[["Job", BaseException], t.t.Any]
+
+
+class Job:  # pylint: disable=too-many-instance-attributes
+    """
+    Job.
+
+    A periodic callback registered in a `Scheduler` or an `AsyncScheduler`.
+
+    Attributes:
+        callback (callable): Function (or coroutine function for `AsyncScheduler`) called without arguments.
+        interval (float): Seconds between two runs.
+        retry (float): Seconds before the next run after a failure.
+        name (str): Name.
+        next_run (float): Time (monotonic) of the next run.
+        runs (int): Number of runs.
+        failures (int): Number of consecutive failures.
+        last_error (BaseException): Exception of the last failed run, `None` after a success.
+        cancelled (bool): Whether the job was cancelled.
+    """
+
+    __slots__ = (
+        "callback",
+        "interval",
+        "retry",
+        "name",
+        "next_run",
+        "runs",
+        "failures",
+        "last_error",
+        "cancelled",
+    )
+
+    def __init__(
+        self,
+        callback: t.t.Callable[[], t.t.Any],
+        interval: float,
+        retry: t.t.Optional[float] = None,
+        name: t.OptionalStr = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            callback (callable): Called without arguments.
+            interval (float): Seconds between two runs.
+            retry (float): Seconds before the next run after a failure.
+            name (str): Name.
+        """
+
+        self.callback = callback
+        self.interval = float(interval)
+        self.retry = float(retry) if retry is not None else min(self.interval, DEFAULT_RETRY)
+        self.name = name or getattr(callback, "__qualname__", repr(callback))
+        self.next_run = 0.0
+        self.runs = 0
+        self.failures = 0
+        self.last_error: t.t.Optional[BaseException] = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel the job, it is dropped from the heap when it is next due."""
+
+        self.cancelled = True
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"Job({self.name}, every {self.interval}s)"
+
+
+class _Heap:
+    """Timer heap shared by `Scheduler` and `AsyncScheduler`."""
+
+    def __init__(self, on_error: t.t.Optional[ErrorHandler] = None) -> None:
+        self.on_error = on_error
+        self._heap: t.t.List[t.t.Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        """
+        Number of scheduled jobs.
+
+        Returns:
+            int: Number of jobs (cancelled jobs are counted until they are dropped).
+        """
+
+        return len(self._heap)
+
+    def _push(self, job: Job, delay: float) -> None:
+        job.next_run = time.monotonic() + max(delay, 0.0)
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+
+    def _pop_due(self, now: float) -> t.t.List[Job]:
+        due = []
+        heap = self._heap
+        while heap and (heap[0][0] <= now or heap[0][2].cancelled):
+            job = heapq.heappop(heap)[2]
+            if not job.cancelled:
+                due.append(job)
+        return due
+
+    def _timeout(self, now: float) -> t.t.Optional[float]:
+        return max(self._heap[0][0] - now, 0.0) if self._heap else None
+
+    def _done(self, job: Job, error: t.t.Optional[BaseException]) -> float:
+        """Record the outcome of a run and return the delay before the next one."""
+
+        job.runs += 1
+        job.last_error = error
+        if error is None:
+            job.failures = 0
+            return job.interval
+
+        job.failures += 1
+        if self.on_error is not None:
+            try:
+                self.on_error(job, error)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        return job.retry
+
+
+class Scheduler(_Heap):
+    """
+    Scheduler.
+
+    Runs periodic jobs on a single daemon thread, started with the first job.
+
+    Example:
+        ```python
+        scheduler = Scheduler()
+        job = scheduler.schedule(lambda: tracker.reconcile(client), interval=30)
+        ...
+        job.cancel()
+        ```
+    """
+
+    def __init__(self, on_error: t.t.Optional[ErrorHandler] = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            on_error (callable): Called with the job and the exception when a job raises.
+        """
+
+        super().__init__(on_error)
+        self._condition = threading.Condition()
+        self._thread: t.t.Optional[threading.Thread] = None
+        self._stopped = False
+
+    def schedule(
+        self,
+        callback: t.t.Callable[[], t.t.Any],
+        interval: float,
+        delay: t.t.Optional[float] = None,
+        retry: t.t.Optional[float] = None,
+        name: t.OptionalStr = None,
+    ) -> Job:
+        """
+        Run a callback every `interval` seconds.
+
+        Args:
+            callback (callable): Called without arguments, on the scheduler thread.
+            interval (float): Seconds between two runs.
+            delay (float): Seconds before the first run, defaults to `interval`.
+            retry (float): Seconds before the next run after a failure.
+            name (str): Name.
+
+        Returns:
+            Job: Job, cancel it with `Job.cancel`.
+        """
+
+        job = Job(callback, interval, retry, name)
+        with self._condition:
+            self._push(job, job.interval if delay is None else delay)
+            self._stopped = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="bitpin-scheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def shutdown(self) -> None:
+        """Stop the thread and drop every job."""
+
+        with self._condition:
+            self._stopped = True
+            self._heap.clear()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.monotonic()
+                    due = self._pop_due(now)
+                    if due:
+                        break
+                    self._condition.wait(self._timeout(now))
+
+            for job in due:
+                error: t.t.Optional[BaseException] = None
+                try:
+                    job.callback()
+                except Exception as e:  # pylint: disable=broad-except
+                    error = e
+                delay = self._done(job, error)
+                if not job.cancelled:
+                    with self._condition:
+                        self._push(job, delay)
+
+
+class AsyncScheduler(_Heap):
+    """
+    Async Scheduler.
+
+    Runs periodic jobs with a single task on the running event loop, started with the first job.
+    Callbacks may be functions or coroutine functions; coroutines run as short-lived tasks so a slow job
+    does not delay the others, and a job never overlaps with itself.
+
+    Example:
+        ```python
+        scheduler = get_async_scheduler()
+        scheduler.schedule(client.refresh_access_token, interval=60 * 13)
+        ```
+    """
+
+    def __init__(self, on_error: t.t.Optional[ErrorHandler] = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            on_error (callable): Called with the job and the exception when a job raises.
+        """
+
+        super().__init__(on_error)
+        self._wakeup: t.t.Optional[asyncio.Event] = None
+        self._task: t.t.Optional["asyncio.Task[None]"] = None
+        self._running: t.t.Set["asyncio.Task[None]"] = set()
+
+    def schedule(
+        self,
+        callback: t.t.Callable[[], t.t.Any],
+        interval: float,
+        delay: t.t.Optional[float] = None,
+        retry: t.t.Optional[float] = None,
+        name: t.OptionalStr = None,
+    ) -> Job:
+        """
+        Run a callback every `interval` seconds, must be called with a running event loop.
+
+        Args:
+            callback (callable): Function or coroutine function called without arguments.
+            interval (float): Seconds between two runs.
+            delay (float): Seconds before the first run, defaults to `interval`.
+            retry (float): Seconds before the next run after a failure.
+            name (str): Name.
+
+        Returns:
+            Job: Job, cancel it with `Job.cancel`.
+        """
+
+        job = Job(callback, interval, retry, name)
+        self._push(job, job.interval if delay is None else delay)
+        self._wake()
+        return job
+
+    def _wake(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+
+    async def shutdown(self) -> None:
+        """Stop the task, drop every job and wait for running jobs."""
+
+        self._heap.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None
+        while True:
+            now = time.monotonic()
+            for job in self._pop_due(now):
+                self._start(job)
+            if not self._heap:
+                self._task = None
+                return
+
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), self._timeout(time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    def _start(self, job: Job) -> None:
+        try:
+            result = job.callback()
+        except Exception as e:  # pylint: disable=broad-except
+            self._finish(job, e)
+            return
+
+        if not inspect.isawaitable(result):
+            self._finish(job, None)
+            return
+
+        task = asyncio.ensure_future(self._await(job, result))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _await(self, job: Job, awaitable: t.t.Awaitable[t.t.Any]) -> None:
+        try:
+            await awaitable
+        except Exception as e:  # pylint: disable=broad-except
+            self._finish(job, e)
+        else:
+            self._finish(job, None)
+
+    def _finish(self, job: Job, error: t.t.Optional[BaseException]) -> None:
+        delay = self._done(job, error)
+        if job.cancelled:
+            return
+        self._push(job, delay)
+        self._wake()
+
+
+class _Shared:
+    """Process-wide default schedulers."""
+
+    __slots__ = ("scheduler", "lock", "async_schedulers")
+
+    def __init__(self) -> None:
+        self.scheduler: t.t.Optional[Scheduler] = None
+        self.lock = threading.Lock()
+        self.async_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncScheduler]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+
+_shared = _Shared()
+
+
+def _after_fork_in_child() -> None:
+    """Drop the schedulers inherited by a forked child process, their thread and loops are not running in it."""
+
+    _shared.scheduler = None
+    _shared.lock = threading.Lock()
+    _shared.async_schedulers.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Get the process-wide scheduler used by `Client`.
+
+    Returns:
+        Scheduler: Scheduler.
+    """
+
+    with _shared.lock:
+        if _shared.scheduler is None:
+            _shared.scheduler = Scheduler()
+        return _shared.scheduler
+
+
+def get_async_scheduler(loop: t.OptionalEventLoop = None) -> AsyncScheduler:
+    """
+    Get the scheduler of an event loop used by `AsyncClient`.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): Event loop, defaults to the running one.
+
+    Returns:
+        AsyncScheduler: Scheduler.
+    """
+
+    loop = loop or asyncio.get_running_loop()
+    scheduler = _shared.async_schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _shared.async_schedulers[loop] = AsyncScheduler()
+    return scheduler
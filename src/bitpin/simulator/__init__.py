@@ -0,0 +1,35 @@
+"""
+# Exchange Simulator.
+
+Local exchange simulator for load and dry-run testing.
+
+[Engine](engine) Submodule contains the price-time-priority matching engine.
+[Server](server) Submodule contains the HTTP front-end speaking the Bitpin API.
+
+Example:
+    ```python
+    from bitpin import Client
+    from bitpin.simulator import Simulator
+
+    with Simulator(initial_balances={"IRT": "1000000000", "BTC": "10"}) as simulator:
+        client = Client()
+        client.api_url = simulator.url
+        client.api_key, client.api_secret = "account-1", "secret"
+        client.login()
+        client.create_order(1, 0.1, 1_000_000_000, "limit", "buy")
+    ```
+"""
+
+from .engine import (
+    Market,
+    MatchingEngine,
+    SimulatorException,
+)
+from .server import Simulator
+
+__all__ = [
+    "Market",
+    "MatchingEngine",
+    "Simulator",
+    "SimulatorException",
+]
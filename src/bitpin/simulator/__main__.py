@@ -0,0 +1,32 @@
+"""
+# Run the exchange simulator.
+
+Usage:
+    python -m bitpin.simulator [--host 127.0.0.1] [--port 8000] [--balance IRT=1000000000 --balance BTC=10]
+"""
+
+import argparse
+
+from aiohttp import web
+
+from .server import Simulator
+
+
+def main() -> None:
+    """Run the simulator until interrupted."""
+
+    parser = argparse.ArgumentParser(prog="python -m bitpin.simulator", description="Bitpin exchange simulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--balance", action="append", default=[], help="CODE=AMOUNT credited to every new account")
+    parser.add_argument("--no-balance-check", action="store_true", help="accept orders regardless of balances")
+    args = parser.parse_args()
+
+    balances = dict(item.split("=", 1) for item in args.balance)
+    simulator = Simulator(initial_balances=balances, check_balance=not args.no_balance_check)
+    print(f"Bitpin simulator listening on http://{args.host}:{args.port}")
+    web.run_app(simulator.create_app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,668 @@
+"""
+# Matching Engine.
+
+In-process price-time-priority matching engine used by the exchange simulator.
+
+# Description.
+Each market keeps two sides of resting limit orders. A side is a sorted list of price levels and a
+FIFO queue of orders per level, so matching and inserting at an existing level are O(1), a new price
+level costs O(levels) and cancelling costs O(orders at that level).
+
+Amounts and prices are `decimal.Decimal` so the results match the string values returned by Bitpin.
+Commissions are not simulated.
+"""
+
+import itertools
+import time
+from bisect import bisect_left
+from collections import deque
+from decimal import Decimal
+
+from .. import types as t
+from .. import enums
+
+ZERO = Decimal(0)
+
+
+class SimulatorException(Exception):
+    """
+    Simulator Exception.
+
+    Attributes:
+        message (str): Message.
+        status_code (int): HTTP status code returned by the simulator.
+    """
+
+    def __init__(self, message: str, status_code: int = 400):
+        """
+        Constructor.
+
+        Args:
+            message (str): Message.
+            status_code (int): HTTP status code.
+        """
+
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        Returns:
+            str: String representation.
+        """
+
+        return f"SimulatorException(code={self.status_code}): {self.message}"
+
+
+class Market:
+    """
+    Market.
+
+    Attributes:
+        id (int): Market ID.
+        base (str): Base currency code (`currency1`).
+        quote (str): Quote currency code (`currency2`).
+        bids (BookSide): Resting buy orders.
+        asks (BookSide): Resting sell orders.
+        trades (deque): Recent trades, oldest first.
+    """
+
+    __slots__ = ("id", "base", "quote", "bids", "asks", "trades")
+
+    def __init__(self, id: int, base: str, quote: str):  # pylint: disable=redefined-builtin
+        """
+        Constructor.
+
+        Args:
+            id (int): Market ID.
+            base (str): Base currency code.
+            quote (str): Quote currency code.
+        """
+
+        self.id = id
+        self.base = base
+        self.quote = quote
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.trades: t.t.Deque[Trade] = deque()
+
+    @property
+    def code(self) -> str:
+        """Market code (e.g. `BTC_IRT`)."""
+
+        return f"{self.base}_{self.quote}"
+
+
+class Order:  # pylint: disable=too-many-instance-attributes
+    """
+    Order.
+
+    Attributes:
+        id (int): Order ID.
+        account (str): Owner account.
+        market (Market): Market.
+        type (str): `buy` or `sell`.
+        mode (str): `limit` or `market`.
+        price (Decimal): Limit price (0 for market orders).
+        amount (Decimal): Base amount.
+        remain (Decimal): Remaining base amount.
+        exchanged2 (Decimal): Quote amount exchanged so far.
+        identifier (str): Client identifier.
+        state (str): `active` or `closed`.
+        created_at (float): Creation timestamp.
+        closed_at (float): Closing timestamp.
+    """
+
+    __slots__ = (
+        "id",
+        "account",
+        "market",
+        "type",
+        "mode",
+        "price",
+        "amount",
+        "remain",
+        "exchanged2",
+        "reserved",
+        "identifier",
+        "state",
+        "created_at",
+        "closed_at",
+    )
+
+    def __init__(
+        self,
+        id: int,  # pylint: disable=redefined-builtin
+        account: str,
+        market: Market,
+        type: str,  # pylint: disable=redefined-builtin
+        mode: str,
+        price: Decimal,
+        amount: Decimal,
+        identifier: t.OptionalStr = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            id (int): Order ID.
+            account (str): Owner account.
+            market (Market): Market.
+            type (str): `buy` or `sell`.
+            mode (str): `limit` or `market`.
+            price (Decimal): Limit price.
+            amount (Decimal): Base amount.
+            identifier (str): Client identifier.
+        """
+
+        self.id = id
+        self.account = account
+        self.market = market
+        self.type = type
+        self.mode = mode
+        self.price = price
+        self.amount = amount
+        self.remain = amount
+        self.exchanged2 = ZERO
+        self.reserved = ZERO
+        self.identifier = identifier
+        self.state = enums.OrderState.ACTIVE.value
+        self.created_at = time.time()
+        self.closed_at: t.OptionalFloat = None
+
+    @property
+    def exchanged1(self) -> Decimal:
+        """Base amount exchanged so far."""
+
+        return self.amount - self.remain
+
+
+class Trade:  # pylint: disable=too-many-instance-attributes
+    """
+    Trade.
+
+    Attributes:
+        id (int): Match ID.
+        market (Market): Market.
+        price (Decimal): Price.
+        amount (Decimal): Base amount.
+        type (str): Taker side.
+        time (float): Timestamp.
+        maker (Order): Resting order.
+        taker (Order): Incoming order.
+    """
+
+    __slots__ = ("id", "market", "price", "amount", "type", "time", "maker", "taker")
+
+    def __init__(
+        self,
+        id: int,  # pylint: disable=redefined-builtin
+        market: Market,
+        price: Decimal,
+        amount: Decimal,
+        type: str,  # pylint: disable=redefined-builtin
+        maker: Order,
+        taker: Order,
+    ):
+        """
+        Constructor.
+
+        Args:
+            id (int): Match ID.
+            market (Market): Market.
+            price (Decimal): Price.
+            amount (Decimal): Base amount.
+            type (str): Taker side.
+            maker (Order): Resting order.
+            taker (Order): Incoming order.
+        """
+
+        self.id = id
+        self.market = market
+        self.price = price
+        self.amount = amount
+        self.type = type
+        self.time = time.time()
+        self.maker = maker
+        self.taker = taker
+
+
+class BookSide:
+    """
+    One side of an order book.
+
+    Attributes:
+        prices (list): Sorted (ascending) price levels.
+        levels (dict): Price -> FIFO queue of resting orders.
+    """
+
+    __slots__ = ("prices", "levels", "is_bid")
+
+    def __init__(self, is_bid: bool):
+        """
+        Constructor.
+
+        Args:
+            is_bid (bool): Whether this is the buy side (best price is the highest).
+        """
+
+        self.prices: t.t.List[Decimal] = []
+        self.levels: t.t.Dict[Decimal, t.t.Deque[Order]] = {}
+        self.is_bid = is_bid
+
+    def best(self) -> t.t.Optional[Decimal]:
+        """
+        Best price.
+
+        Returns:
+            Decimal: Best price or `None` when the side is empty.
+        """
+
+        if not self.prices:
+            return None
+        return self.prices[-1] if self.is_bid else self.prices[0]
+
+    def add(self, order: Order) -> None:
+        """
+        Append a resting order at the end of its price level.
+
+        Args:
+            order (Order): Order.
+        """
+
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = deque()
+            prices = self.prices
+            prices.insert(bisect_left(prices, order.price), order.price)
+        level.append(order)
+
+    def remove(self, order: Order) -> None:
+        """
+        Remove a resting order.
+
+        Args:
+            order (Order): Order.
+        """
+
+        level = self.levels.get(order.price)
+        if level is None:
+            return
+
+        try:
+            level.remove(order)
+        except ValueError:
+            return
+
+        if not level:
+            self.drop_level(order.price)
+
+    def drop_level(self, price: Decimal) -> None:
+        """
+        Drop a price level.
+
+        Args:
+            price (Decimal): Price.
+        """
+
+        del self.levels[price]
+        prices = self.prices
+        del prices[bisect_left(prices, price)]
+
+    def depth(self, limit: int) -> t.t.List[t.DictStrAny]:
+        """
+        Aggregated price levels, best first.
+
+        Args:
+            limit (int): Maximum number of levels.
+
+        Returns:
+            list: Levels shaped like `InnerOrderbookResponse`.
+        """
+
+        prices = reversed(self.prices) if self.is_bid else iter(self.prices)
+        result = []
+        for price in itertools.islice(prices, limit):
+            level = self.levels[price]
+            amount = sum((order.amount for order in level), ZERO)
+            remain = sum((order.remain for order in level), ZERO)
+            result.append(
+                {"amount": str(amount), "price": str(price), "remain": str(remain), "value": str(remain * price)}
+            )
+        return result
+
+
+class Account:
+    """
+    Account.
+
+    Attributes:
+        wallets (dict): Currency code -> `[balance, frozen]`.
+        orders (dict): Order ID -> order, oldest first.
+        trades (deque): `(trade, order)` pairs of the account, oldest first.
+    """
+
+    __slots__ = ("wallets", "orders", "trades")
+
+    def __init__(self) -> None:
+        """Constructor."""
+
+        self.wallets: t.t.Dict[str, t.t.List[Decimal]] = {}
+        self.orders: t.t.Dict[int, Order] = {}
+        self.trades: t.t.Deque[t.t.Tuple[Trade, Order]] = deque(maxlen=10_000)
+
+    def wallet(self, currency: str) -> t.t.List[Decimal]:
+        """
+        Get (creating it if needed) a wallet.
+
+        Args:
+            currency (str): Currency code.
+
+        Returns:
+            list: `[balance, frozen]`, mutated in place.
+        """
+
+        wallet = self.wallets.get(currency)
+        if wallet is None:
+            wallet = self.wallets[currency] = [ZERO, ZERO]
+        return wallet
+
+
+class MatchingEngine:
+    """
+    Matching Engine.
+
+    Price-time-priority matching of limit and market orders with per-account wallets.
+
+    Methods:
+        add_market: Register a market.
+        deposit: Credit an account wallet.
+        place: Place an order and match it.
+        cancel: Cancel a resting order.
+        orderbook: Aggregated order book side.
+        recent_trades: Recent trades of a market.
+    """
+
+    def __init__(self, check_balance: bool = True, trade_history: int = 100):
+        """
+        Constructor.
+
+        Args:
+            check_balance (bool): Reject orders the account cannot afford.
+            trade_history (int): Number of recent trades kept per market.
+        """
+
+        self.check_balance = check_balance
+        self.markets: t.t.Dict[int, Market] = {}
+        self.orders: t.t.Dict[int, Order] = {}
+        self.accounts: t.t.Dict[str, Account] = {}
+        self._trade_history = trade_history
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+
+    def add_market(self, market: Market) -> None:
+        """
+        Register a market.
+
+        Args:
+            market (Market): Market.
+        """
+
+        market.trades = deque(market.trades, maxlen=self._trade_history)
+        self.markets[market.id] = market
+
+    def deposit(self, account: str, currency: str, amount: t.t.Union[str, Decimal]) -> None:
+        """
+        Credit an account wallet.
+
+        Args:
+            account (str): Account.
+            currency (str): Currency code.
+            amount (str | Decimal): Amount.
+        """
+
+        self._wallet(account, currency)[0] += Decimal(amount)
+
+    def _account(self, account: str) -> Account:
+        state = self.accounts.get(account)
+        if state is None:
+            state = self.accounts[account] = Account()
+        return state
+
+    def _wallet(self, account: str, currency: str) -> t.t.List[Decimal]:
+        return self._account(account).wallet(currency)
+
+    def _reserve(self, order: Order, currency: str, amount: Decimal) -> None:
+        wallet = self._wallet(order.account, currency)
+        if self.check_balance and wallet[0] < amount:
+            raise SimulatorException(f"Insufficient {currency} balance")
+        wallet[0] -= amount
+        wallet[1] += amount
+        order.reserved = amount
+
+    def _release(self, order: Order) -> None:
+        if order.reserved:
+            market = order.market
+            wallet = self._wallet(order.account, market.quote if order.type == "buy" else market.base)
+            wallet[0] += order.reserved
+            wallet[1] -= order.reserved
+            order.reserved = ZERO
+
+    def place(
+        self,
+        account: str,
+        market_id: int,
+        type: str,  # pylint: disable=redefined-builtin
+        mode: str,
+        amount: Decimal,
+        price: Decimal = ZERO,
+        identifier: t.OptionalStr = None,
+    ) -> Order:
+        """
+        Place an order and match it against the opposite side.
+
+        Args:
+            account (str): Account.
+            market_id (int): Market ID.
+            type (str): `buy` or `sell`.
+            mode (str): `limit` or `market`.
+            amount (Decimal): Base amount.
+            price (Decimal): Limit price (ignored for market orders).
+            identifier (str): Client identifier.
+
+        Returns:
+            Order: Order (closed if it was fully filled or is a market order).
+
+        Raises:
+            SimulatorException: Invalid order or insufficient balance.
+        """
+
+        market = self.markets.get(market_id)
+        if market is None:
+            raise SimulatorException(f"Market {market_id} not found", 404)
+        if type not in ("buy", "sell"):
+            raise SimulatorException(f"Invalid type {type}")
+        if mode not in ("limit", "market"):
+            raise SimulatorException(f"Unsupported mode {mode}")
+        if amount <= 0 or (mode == "limit" and price <= 0):
+            raise SimulatorException("Amount and price must be positive")
+
+        price = price if mode == "limit" else ZERO
+        order = Order(next(self._order_ids), account, market, type, mode, price, amount, identifier)
+
+        if mode == "limit":
+            if type == "buy":
+                self._reserve(order, market.quote, amount * price)
+            else:
+                self._reserve(order, market.base, amount)
+        elif type == "sell":
+            self._reserve(order, market.base, amount)
+
+        self.orders[order.id] = order
+        self._account(account).orders[order.id] = order
+
+        self._match(order, market.asks if type == "buy" else market.bids)
+
+        if order.remain and mode == "limit":
+            (market.bids if type == "buy" else market.asks).add(order)
+        else:
+            self._close(order)
+
+        return order
+
+    def _match(self, taker: Order, opposite: BookSide) -> None:
+        is_buy = taker.type == "buy"
+        limit = taker.price
+        market = taker.market
+        trades = market.trades
+
+        while taker.remain and opposite.prices:
+            best = opposite.prices[0] if is_buy else opposite.prices[-1]
+            if taker.mode == "limit" and (best > limit if is_buy else best < limit):
+                break
+
+            level = opposite.levels[best]
+            while level and taker.remain:
+                maker = level[0]
+                amount = min(maker.remain, taker.remain)
+                if is_buy and taker.mode == "market":
+                    amount = self._affordable(taker, best, amount)
+                    if not amount:
+                        return
+
+                self._fill(maker, taker, best, amount)
+                trade = Trade(next(self._trade_ids), market, best, amount, taker.type, maker, taker)
+                trades.append(trade)
+                self._record(trade)
+
+                if not maker.remain:
+                    level.popleft()
+                    self._close(maker)
+
+            if not level:
+                opposite.drop_level(best)
+
+    def _affordable(self, taker: Order, price: Decimal, amount: Decimal) -> Decimal:
+        if not self.check_balance:
+            return amount
+        balance = self._wallet(taker.account, taker.market.quote)[0]
+        if balance >= amount * price:
+            return amount
+        return balance / price if balance > 0 else ZERO
+
+    def _fill(self, maker: Order, taker: Order, price: Decimal, amount: Decimal) -> None:
+        value = amount * price
+        market = maker.market
+        for order in (maker, taker):
+            order.remain -= amount
+            order.exchanged2 += value
+            base = self._wallet(order.account, market.base)
+            quote = self._wallet(order.account, market.quote)
+            if order.type == "buy":
+                base[0] += amount
+                if order.mode == "limit":
+                    reserved = amount * order.price
+                    quote[1] -= reserved
+                    quote[0] += reserved - value
+                    order.reserved -= reserved
+                else:
+                    quote[0] -= value
+            else:
+                quote[0] += value
+                base[1] -= amount
+                order.reserved -= amount
+
+    def _record(self, trade: Trade) -> None:
+        for order in (trade.maker, trade.taker):
+            self._account(order.account).trades.append((trade, order))
+
+    def _close(self, order: Order) -> None:
+        self._release(order)
+        order.state = enums.OrderState.CLOSED.value
+        order.closed_at = time.time()
+
+    def cancel(self, account: str, order_id: int) -> Order:
+        """
+        Cancel a resting order.
+
+        Args:
+            account (str): Account.
+            order_id (int): Order ID.
+
+        Returns:
+            Order: Cancelled order.
+
+        Raises:
+            SimulatorException: Order not found or already closed.
+        """
+
+        order = self.orders.get(order_id)
+        if order is None or order.account != account:
+            raise SimulatorException(f"Order {order_id} not found", 404)
+        if order.state != enums.OrderState.ACTIVE.value:
+            raise SimulatorException(f"Order {order_id} is not active")
+
+        market = order.market
+        (market.bids if order.type == "buy" else market.asks).remove(order)
+        self._close(order)
+        return order
+
+    def orderbook(
+        self,
+        market_id: int,
+        type: str,  # pylint: disable=redefined-builtin
+        limit: int = 50,
+    ) -> t.DictStrAny:
+        """
+        Aggregated order book side.
+
+        `type=buy` returns the bids (highest first), `type=sell` the asks (lowest first).
+
+        Args:
+            market_id (int): Market ID.
+            type (str): `buy` or `sell`.
+            limit (int): Maximum number of levels.
+
+        Returns:
+            dict: Response shaped like `OrderbookResponse`.
+        """
+
+        market = self.markets.get(market_id)
+        if market is None:
+            raise SimulatorException(f"Market {market_id} not found", 404)
+
+        side = market.bids if type == "buy" else market.asks
+        orders = side.depth(limit)
+        volume = sum((Decimal(level["remain"]) for level in orders), ZERO)
+        return {"orders": orders, "volume": str(volume)}
+
+    def recent_trades(self, market_id: int, limit: int = 100) -> t.t.List[t.DictStrAny]:
+        """
+        Recent trades of a market, newest first.
+
+        Args:
+            market_id (int): Market ID.
+            limit (int): Maximum number of trades.
+
+        Returns:
+            list: Trades shaped like `InnerTradeResponse`.
+        """
+
+        market = self.markets.get(market_id)
+        if market is None:
+            raise SimulatorException(f"Market {market_id} not found", 404)
+
+        return [
+            {
+                "time": trade.time,
+                "price": str(trade.price),
+                "value": str(trade.price * trade.amount),
+                "match_amount": str(trade.amount),
+                "type": trade.type,
+                "match_id": str(trade.id),
+            }
+            for trade in itertools.islice(reversed(market.trades), limit)
+        ]
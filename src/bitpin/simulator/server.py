@@ -0,0 +1,437 @@
+"""
+# Simulator Server.
+
+HTTP front-end of the exchange simulator speaking the same API as `CoreClient.API_URL`.
+
+# Description.
+Point `Client`/`AsyncClient` at the simulator by setting `api_url` to `Simulator.url`:
+login with any `api_key`/`api_secret`, each `api_key` gets its own account credited with
+`initial_balances`.
+"""
+
+import asyncio
+import datetime
+import json
+import threading
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from aiohttp import web
+
+from .. import types as t
+from .engine import (
+    Market,
+    MatchingEngine,
+    Order,
+    SimulatorException,
+)
+
+
+class Simulator:  # pylint: disable=too-many-instance-attributes
+    """
+    Exchange Simulator.
+
+    Methods:
+        create_app: Create the `aiohttp.web.Application`.
+        start: Start serving on the running event loop.
+        stop: Stop serving.
+        start_in_thread: Start serving on a background thread (for synchronous code).
+        stop_thread: Stop the background thread.
+
+    Attributes:
+        engine (MatchingEngine): Matching engine.
+        url (str): Base URL once started, to be used as `api_url`.
+    """
+
+    def __init__(
+        self,
+        markets: t.t.Optional[t.t.Iterable[t.t.Tuple[int, str, str]]] = None,
+        initial_balances: t.t.Optional[t.t.Dict[str, str]] = None,
+        check_balance: bool = True,
+        page_size: int = 100,
+        currency_decimals: t.t.Optional[t.t.Dict[str, t.t.Tuple[int, int, int]]] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            markets (list): `(id, base, quote)` tuples, defaults to BTC/ETH/USDT markets against IRT and USDT.
+            initial_balances (dict): Currency code -> amount credited to every new account.
+            check_balance (bool): Reject orders the account cannot afford.
+            page_size (int): Page size of paginated endpoints.
+            currency_decimals (dict): Currency code -> `(decimal, decimal_amount, decimal_irt)`.
+        """
+
+        self.engine = MatchingEngine(check_balance=check_balance)
+        for market_id, base, quote in markets or [
+            (1, "BTC", "IRT"),
+            (2, "BTC", "USDT"),
+            (3, "ETH", "IRT"),
+            (4, "ETH", "USDT"),
+            (5, "USDT", "IRT"),
+        ]:
+            self.engine.add_market(Market(market_id, base, quote))
+
+        self.initial_balances = initial_balances or {}
+        self.page_size = page_size
+        self.url: t.OptionalStr = None
+
+        codes = sorted({code for market in self.engine.markets.values() for code in (market.base, market.quote)})
+        decimals = currency_decimals or {}
+        self._currencies = {
+            code: _currency_info(index, code, *decimals.get(code, (2, 8, 0))) for index, code in enumerate(codes, 1)
+        }
+        self._markets = {market.id: self._market_info(market) for market in self.engine.markets.values()}
+
+        self._access_tokens: t.t.Dict[str, str] = {}
+        self._refresh_tokens: t.t.Dict[str, str] = {}
+        self._runner: t.t.Optional[web.AppRunner] = None
+        self._thread: t.t.Optional[threading.Thread] = None
+        self._loop: t.OptionalEventLoop = None
+
+    def _market_info(self, market: Market) -> t.DictStrAny:
+        return {
+            "id": market.id,
+            "currency1": self._currencies[market.base],
+            "currency2": self._currencies[market.quote],
+            "code": market.code,
+            "title": f"{market.base}/{market.quote}",
+            "title_fa": f"{market.base}/{market.quote}",
+            "tradable": True,
+            "for_test": False,
+            "commissions": {"sell": 0.0, "buy": 0.0, "taker": 0.0, "maker": 0.0},
+        }
+
+    def _order_info(self, order: Order) -> t.DictStrAny:
+        market = order.market
+        exchanged1 = order.exchanged1
+        average = order.exchanged2 / exchanged1 if exchanged1 else Decimal(0)
+        gain, resource = (market.base, market.quote) if order.type == "buy" else (market.quote, market.base)
+        return {
+            "id": order.id,
+            "market": self._markets[market.id],
+            "amount1": str(order.amount),
+            "amount2": str(order.amount * order.price),
+            "price": str(order.price),
+            "price_limit": "0",
+            "price_stop": None,
+            "price_limit_oco": None,
+            "type": order.type,
+            "active_limit": "0",
+            "identifier": order.identifier,
+            "mode": order.mode,
+            "expected_gain": str(order.amount if order.type == "buy" else order.amount * order.price),
+            "expected_resource": str(order.amount * order.price if order.type == "buy" else order.amount),
+            "commission_percent": 0.0,
+            "user_share_percent": 0.0,
+            "expected_commission": "0",
+            "expected_user_gain": "0",
+            "expected_user_price": str(order.price),
+            "gain_currency": self._currencies[gain],
+            "resource_currency": self._currencies[resource],
+            "fulfilled": float(exchanged1 / order.amount),
+            "exchanged1": str(exchanged1),
+            "exchanged2": str(order.exchanged2),
+            "gain": str(exchanged1 if order.type == "buy" else order.exchanged2),
+            "resource": str(order.exchanged2 if order.type == "buy" else exchanged1),
+            "remain_amount": str(order.remain),
+            "average_price": str(average),
+            "average_user_price": str(average),
+            "commission": "0",
+            "user_commission": "0",
+            "user_gain": str(exchanged1 if order.type == "buy" else order.exchanged2),
+            "created_at": _isoformat(order.created_at),
+            "activated_at": _isoformat(order.created_at),
+            "state": order.state,
+            "req_to_cancel": False,
+            "info": {},
+            "closed_at": _isoformat(order.closed_at) if order.closed_at else None,
+            "external_address": "",
+        }
+
+    def _page(self, request: web.Request, items: t.t.Sequence[t.t.Any]) -> t.DictStrAny:
+        page = max(int(request.query.get("page", 1)), 1)
+        start = (page - 1) * self.page_size
+        end = start + self.page_size
+        base = f"{request.scheme}://{request.host}{request.path}"
+        query = {k: v for k, v in request.query.items() if k != "page"}
+        suffix = "".join(f"&{k}={v}" for k, v in query.items())
+        return {
+            "count": len(items),
+            "next": f"{base}?page={page + 1}{suffix}" if end < len(items) else None,
+            "previous": f"{base}?page={page - 1}{suffix}" if page > 1 else None,
+            "results": list(items[start:end]),
+        }
+
+    def _account(self, request: web.Request) -> str:
+        _, _, token = request.headers.get("Authorization", "").partition("Bearer ")
+        account = self._access_tokens.get(token)
+        if account is None:
+            raise SimulatorException("Authentication credentials were not provided.", 401)
+        return account
+
+    def _issue_tokens(self, account: str) -> t.DictStrAny:
+        access, refresh = uuid.uuid4().hex, uuid.uuid4().hex
+        self._access_tokens[access] = account
+        self._refresh_tokens[refresh] = account
+        return {"refresh": refresh, "access": access}
+
+    def create_app(self) -> web.Application:
+        """
+        Create the application.
+
+        Returns:
+            web.Application: Application.
+        """
+
+        app = web.Application(middlewares=[_error_middleware])
+        routes = [
+            web.post("/v1/usr/api/login/", self._login),
+            web.post("/v1/usr/refresh_token/", self._refresh),
+            web.get("/v1/usr/info/", self._user_info),
+            web.get("/v1/mkt/currencies/", self._currencies_list),
+            web.get("/v1/mkt/markets/", self._markets_list),
+            web.get("/v1/wlt/wallets/", self._wallets),
+            web.get("/{version:v[12]}/mth/actives/{market_id}/", self._orderbook),
+            web.get("/v1/mth/matches/{market_id}/", self._recent_trades),
+            web.get("/v1/odr/orders/", self._user_orders),
+            web.post("/v1/odr/orders/", self._create_order),
+            web.delete("/v1/odr/orders/{order_id}/", self._cancel_order),
+            web.get("/v1/odr/matches/", self._user_trades),
+        ]
+        app.add_routes(routes)
+        return app
+
+    async def _login(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        account = str(body.get("api_key") or "")
+        if not account:
+            raise SimulatorException("api_key is required", 401)
+        if account not in self.engine.accounts:
+            for currency, amount in self.initial_balances.items():
+                self.engine.deposit(account, currency, amount)
+        return _json(self._issue_tokens(account))
+
+    async def _refresh(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        account = self._refresh_tokens.get(str(body.get("refresh")))
+        if account is None:
+            raise SimulatorException("Token is invalid or expired", 401)
+        access = uuid.uuid4().hex
+        self._access_tokens[access] = account
+        return _json({"access": access})
+
+    async def _user_info(self, request: web.Request) -> web.Response:
+        return _json({"user_identifier": self._account(request), "state": "accepted"})
+
+    async def _currencies_list(self, request: web.Request) -> web.Response:
+        return _json(self._page(request, list(self._currencies.values())))
+
+    async def _markets_list(self, request: web.Request) -> web.Response:
+        return _json(self._page(request, list(self._markets.values())))
+
+    async def _wallets(self, request: web.Request) -> web.Response:
+        state = self.engine.accounts.get(self._account(request))
+        results = []
+        for index, (code, (balance, frozen)) in enumerate(sorted(state.wallets.items() if state else ()), 1):
+            results.append(
+                {
+                    "id": index,
+                    "currency": self._currencies.get(code) or _currency_info(0, code, 2, 8, 0),
+                    "balance": str(balance),
+                    "frozen": str(frozen),
+                    "total": str(balance + frozen),
+                }
+            )
+        return _json({"count": len(results), "next": None, "previous": None, "results": results})
+
+    async def _orderbook(self, request: web.Request) -> web.Response:
+        market_id = int(request.match_info["market_id"])
+        return _json(self.engine.orderbook(market_id, request.query.get("type", "buy")))
+
+    async def _recent_trades(self, request: web.Request) -> web.Response:
+        return _json(self.engine.recent_trades(int(request.match_info["market_id"])))
+
+    async def _user_orders(self, request: web.Request) -> web.Response:
+        state = self.engine.accounts.get(self._account(request))
+        query = request.query
+        orders = [
+            order
+            for order in reversed(list(state.orders.values()) if state else [])
+            if ("market_id" not in query or str(order.market.id) == query["market_id"])
+            and (query.get("type") not in ("buy", "sell") or order.type == query["type"])
+            and ("state" not in query or order.state == query["state"])
+            and ("mode" not in query or order.mode == query["mode"])
+            and ("identifier" not in query or order.identifier == query["identifier"])
+        ]
+        page = self._page(request, orders)
+        page["results"] = [self._order_info(order) for order in page["results"]]
+        return _json(page)
+
+    async def _create_order(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        body = await request.json()
+        try:
+            order = self.engine.place(
+                account,
+                int(body["market"]),
+                str(body["type"]),
+                str(body["mode"]),
+                Decimal(str(body["amount1"])),
+                Decimal(str(body.get("price") or 0)),
+                body.get("identifier"),
+            )
+        except (KeyError, ValueError, InvalidOperation) as exc:
+            raise SimulatorException(f"Invalid order: {exc}") from exc
+        return _json(self._order_info(order))
+
+    async def _cancel_order(self, request: web.Request) -> web.Response:
+        account = self._account(request)
+        order = self.engine.cancel(account, int(request.match_info["order_id"]))
+        return _json({"status": "success", "id": str(order.id)})
+
+    async def _user_trades(self, request: web.Request) -> web.Response:
+        state = self.engine.accounts.get(self._account(request))
+        query = request.query
+        trades = [
+            (trade, order)
+            for trade, order in (reversed(state.trades) if state else ())
+            if ("market_id" not in query or str(trade.market.id) == query["market_id"])
+            and (query.get("type") not in ("buy", "sell") or order.type == query["type"])
+        ]
+        page = self._page(request, trades)
+        page["results"] = [
+            {
+                "id": trade.id,
+                "exchanged1": str(trade.amount),
+                "exchanged2": str(trade.amount * trade.price),
+                "price": str(trade.price),
+                "market": self._markets[trade.market.id],
+                "created_at": _isoformat(trade.time),
+                "type": trade.type,
+                "commission": "0",
+                "user_type": order.type,
+                "user_gain": str(trade.amount if order.type == "buy" else trade.amount * trade.price),
+            }
+            for trade, order in page["results"]
+        ]
+        return _json(page)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start serving on the running event loop.
+
+        Args:
+            host (str): Host.
+            port (int): Port (0 picks a free port).
+
+        Returns:
+            str: Base URL to use as `api_url`.
+        """
+
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.url = f"http://{host}:{self._runner.addresses[0][1]}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start serving on a background thread with its own event loop.
+
+        Args:
+            host (str): Host.
+            port (int): Port (0 picks a free port).
+
+        Returns:
+            str: Base URL to use as `api_url`.
+        """
+
+        loop = self._loop = asyncio.new_event_loop()
+        url = loop.run_until_complete(self.start(host, port))
+        self._thread = threading.Thread(target=loop.run_forever, daemon=True)
+        self._thread.start()
+        return url
+
+    def stop_thread(self) -> None:
+        """Stop the background thread started by `start_in_thread`."""
+
+        loop, thread = self._loop, self._thread
+        if loop is None or thread is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        self._loop = self._thread = None
+
+    def __enter__(self) -> "Simulator":
+        """Start serving on a background thread."""
+
+        self.start_in_thread()
+        return self
+
+    def __exit__(self, *_: t.t.Any) -> None:
+        """Stop the background thread."""
+
+        self.stop_thread()
+
+    async def __aenter__(self) -> "Simulator":
+        """Start serving on the running event loop."""
+
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: t.t.Any) -> None:
+        """Stop serving."""
+
+        await self.stop()
+
+
+def _currency_info(index: int, code: str, decimal: int, decimal_amount: int, decimal_irt: int) -> t.DictStrAny:
+    return {
+        "id": index,
+        "title": code,
+        "title_fa": code,
+        "code": code,
+        "tradable": True,
+        "for_test": False,
+        "image": "",
+        "decimal": decimal,
+        "decimal_amount": decimal_amount,
+        "decimal_irt": decimal_irt,
+        "color": "",
+        "high_risk": False,
+        "show_high_risk": False,
+        "withdraw_commission": "0",
+        "tags": [],
+    }
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).isoformat()
+
+
+def _json(data: t.t.Any) -> web.Response:
+    return web.Response(body=json.dumps(data).encode(), content_type="application/json")
+
+
+@web.middleware
+async def _error_middleware(
+    request: web.Request, handler: t.t.Callable[[web.Request], t.t.Awaitable[web.StreamResponse]]
+) -> web.StreamResponse:
+    try:
+        return await handler(request)
+    except SimulatorException as exc:
+        return web.Response(
+            body=json.dumps({"detail": exc.message}).encode(), status=exc.status_code, content_type="application/json"
+        )
@@ -0,0 +1,238 @@
+"""
+# Streaming.
+
+Incremental JSON parsing of list responses.
+
+# Description.
+`ResultsParser` is fed the raw body chunk by chunk as it is read from the socket and returns the items
+of the `results` array as soon as each of them is complete, so only the item being received is buffered.
+The other top-level keys (`count`, `next`, `previous`, ...) are collected in `envelope`.
+Bodies that are a top-level array (e.g. recent trades) are streamed the same way.
+
+Used by the `stream_*` methods of `Client` and `AsyncClient`, `drain` feeds it an async body.
+"""
+
+import codecs
+import contextlib
+import json
+
+from . import types as t
+from .exceptions import RequestException
+
+_WHITESPACE = " \t\n\r"
+
+_START, _KEY, _ITEMS, _DONE = range(4)
+
+
+class ResultsParser:
+    """
+    Results Parser.
+
+    Incremental parser of the `results` array of a JSON object (or of a top-level JSON array).
+
+    Attributes:
+        key (str): Key of the array to stream.
+        envelope (dict): Other top-level keys, complete once the parser is closed.
+
+    Example:
+        ```python
+        parser = ResultsParser()
+        for chunk in response.iter_content(65536):
+            for item in parser.feed(chunk):
+                ...
+        parser.close()
+        print(parser.envelope["next"])
+        ```
+    """
+
+    def __init__(self, key: str = "results") -> None:
+        """
+        Constructor.
+
+        Args:
+            key (str): Key of the array to stream.
+        """
+
+        self.key = key
+        self.envelope: t.DictStrAny = {}
+        self._decode = json.JSONDecoder().raw_decode
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._state = _START
+        self._top_level = False
+
+    def feed(self, data: bytes) -> t.t.List[t.t.Any]:
+        """
+        Feed a chunk of the body.
+
+        Args:
+            data (bytes): Chunk.
+
+        Returns:
+            list: Items completed by this chunk.
+
+        Raises:
+            RequestException: The body is not a JSON object or array.
+        """
+
+        self._buffer += self._text.decode(data)
+        items: t.t.List[t.t.Any] = []
+        self._buffer = self._buffer[self._parse(items) :]  # noqa: E203
+        return items
+
+    def close(self) -> t.t.List[t.t.Any]:
+        """
+        Signal the end of the body.
+
+        Returns:
+            list: Remaining items.
+
+        Raises:
+            RequestException: The body is incomplete or invalid.
+        """
+
+        self._buffer += self._text.decode(b"", final=True) + " "
+        items: t.t.List[t.t.Any] = []
+        self._buffer = self._buffer[self._parse(items) :]  # noqa: E203
+        if self._state != _DONE:
+            raise RequestException(f"Invalid Response: incomplete JSON near {self._buffer[:200]!r}")
+        return items
+
+    def _skip(self, pos: int) -> int:
+        buffer = self._buffer
+        size = len(buffer)
+        while pos < size and buffer[pos] in _WHITESPACE:
+            pos += 1
+        return pos
+
+    def _parse(self, items: t.t.List[t.t.Any]) -> int:
+        """
+        Parse as much of the buffer as possible.
+
+        A value is only accepted if at least one character follows it, so numbers and literals
+        split across chunks are never cut short. Each state handler returns the position it reached,
+        the same position when it needs more data.
+
+        Returns:
+            int: Position of the first unconsumed character.
+        """
+
+        size = len(self._buffer)
+        pos = 0
+
+        while True:
+            pos = self._skip(pos)
+            if pos >= size:
+                return pos
+
+            if self._state == _ITEMS:
+                end = self._parse_items(pos, items)
+            elif self._state == _KEY:
+                end = self._parse_key(pos)
+            elif self._state == _START:
+                end = self._parse_start(pos)
+            else:
+                raise RequestException(f"Invalid Response: trailing data {self._buffer[pos:pos + 200]!r}")
+
+            if end == pos:
+                return pos
+            pos = end
+
+    def _value(self, pos: int) -> t.t.Optional[t.t.Tuple[t.t.Any, int]]:
+        """Decode the value at `pos`, `None` if it is incomplete."""
+
+        try:
+            value, end = self._decode(self._buffer, pos)
+        except ValueError:
+            return None
+        return (value, end) if end < len(self._buffer) else None
+
+    def _parse_start(self, pos: int) -> int:
+        char = self._buffer[pos]
+        if char not in "{[":
+            raise RequestException(f"Invalid Response: {self._buffer[:200]!r}")
+        self._top_level = char == "["
+        self._state = _ITEMS if self._top_level else _KEY
+        return pos + 1
+
+    def _parse_items(self, pos: int, items: t.t.List[t.t.Any]) -> int:
+        buffer = self._buffer
+        size = len(buffer)
+        decode = self._decode
+
+        while pos < size:
+            char = buffer[pos]
+            if char in _WHITESPACE or char == ",":
+                pos += 1
+            elif char == "]":
+                self._state = _DONE if self._top_level else _KEY
+                return pos + 1
+            else:
+                try:
+                    item, end = decode(buffer, pos)
+                except ValueError:
+                    return pos
+                if end >= size:
+                    return pos
+                items.append(item)
+                pos = end
+
+        return pos
+
+    def _parse_key(self, pos: int) -> int:
+        buffer = self._buffer
+        char = buffer[pos]
+        if char == "}":
+            self._state = _DONE
+        if char in ",}":
+            return pos + 1
+
+        decoded = self._value(pos)
+        if decoded is None:
+            return pos
+        key, end = decoded
+        end = self._skip(end)
+        if end < len(buffer) and (buffer[end] != ":" or not isinstance(key, str)):
+            raise RequestException(f"Invalid Response: unexpected {buffer[pos:end + 1]!r}")
+        start = self._skip(end + 1)
+        if start >= len(buffer):
+            return pos
+
+        if key == self.key and buffer[start] == "[":
+            self._state = _ITEMS
+            return start + 1
+
+        decoded = self._value(start)
+        if decoded is None:
+            return pos
+        self.envelope[key] = decoded[0]
+        return decoded[1]
+
+
+async def drain(
+    parser: ResultsParser,
+    chunks: t.t.AsyncIterable[bytes],
+    release: t.t.Callable[[t.t.List[t.t.Any]], t.t.Generator[t.t.Any, None, None]],
+) -> t.t.AsyncIterator[t.t.Any]:
+    """
+    Feed an async body to a parser chunk by chunk and yield its items, then close the parser.
+
+    Args:
+        parser (ResultsParser): Parser.
+        chunks (AsyncIterable): Body chunks.
+        release (callable): Wraps the items of every chunk, closed if the consumer stops (e.g. `AsyncClient._release`).
+
+    Yields:
+        t.Any: Items.
+
+    Raises:
+        RequestException: The body is not a JSON object or array, or is incomplete.
+    """
+
+    async for chunk in chunks:
+        with contextlib.closing(release(parser.feed(chunk))) as items:
+            for item in items:
+                yield item
+    with contextlib.closing(release(parser.close())) as items:
+        for item in items:
+            yield item
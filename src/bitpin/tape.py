@@ -0,0 +1,342 @@
+"""
+# Tape.
+
+Deduplicated stream of the public trades of a market.
+
+# Description.
+`get_recent_trades` returns the last trades of a market on every call, so consecutive polls mostly
+overlap. `TradeTape` keeps the ids of the last `capacity` trades it emitted in a fixed-size ring
+(a deque plus a set, evicted together) and the time of the newest evicted trade (with the evicted ids of that
+time), so it emits every trade exactly once, in time order, with memory that does not grow with runtime.
+
+When a poll shares no trade with the previous ones the tape can not prove that nothing was missed between
+them (the poll interval was too long for the market activity): a `Gap` is reported.
+
+`TapePoller` (and `AsyncTapePoller`) poll a set of markets every `interval` seconds and pass the new
+trades to a handler.
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+
+from . import types as t
+
+DEFAULT_CAPACITY = 1024
+
+TradeHandler = t.t.Callable[[int, t.t.List[t.DictStrAny]], t.t.Any]
+GapHandler = t.t.Callable[["Gap"], t.t.Any]
+
+
+class Gap:
+    """
+    Gap.
+
+    Trades may have been missed between two polls of a market.
+
+    Attributes:
+        market_id (int): Market ID.
+        after (float): Time of the newest trade emitted before the gap.
+        before (float): Time of the oldest trade received after the gap.
+    """
+
+    __slots__ = ("market_id", "after", "before")
+
+    def __init__(self, market_id: int, after: float, before: float) -> None:
+        """
+        Constructor.
+
+        Args:
+            market_id (int): Market ID.
+            after (float): Time of the newest trade emitted before the gap.
+            before (float): Time of the oldest trade received after the gap.
+        """
+
+        self.market_id = market_id
+        self.after = after
+        self.before = before
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"Gap(market_id={self.market_id}, after={self.after}, before={self.before})"
+
+
+class _History:
+    """Ids of the last `capacity` emitted trades, plus the time of the newest evicted one."""
+
+    __slots__ = ("capacity", "_ids", "_seen", "_floor", "_boundary")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._ids: t.t.Deque[t.t.Tuple[str, float]] = deque()
+        self._seen: t.t.Set[str] = set()
+        self._floor = float("-inf")
+        # ids evicted at the `_floor` time: older trades are duplicates, trades at that time only if listed here
+        self._boundary: t.t.Set[str] = set()
+
+    def __contains__(self, trade: t.DictStrAny) -> bool:
+        """Whether the trade was already emitted."""
+
+        match_id = trade["match_id"]
+        return match_id in self._seen or match_id in self._boundary or trade["time"] < self._floor
+
+    def add(self, trade: t.DictStrAny) -> None:
+        """Remember an emitted trade, evicting the oldest ones past `capacity`."""
+
+        ids, seen = self._ids, self._seen
+        ids.append((trade["match_id"], trade["time"]))
+        seen.add(trade["match_id"])
+        while len(ids) > self.capacity:
+            match_id, evicted = ids.popleft()
+            seen.discard(match_id)
+            if evicted > self._floor:
+                self._floor = evicted
+                self._boundary.clear()
+            if evicted == self._floor:
+                self._boundary.add(match_id)
+
+
+class TradeTape:
+    """
+    Trade Tape.
+
+    Deduplicates the trades of one market across polls.
+
+    Attributes:
+        market_id (int): Market ID.
+        capacity (int): Number of remembered trade ids.
+        last_time (float): Time of the newest emitted trade.
+        emitted (int): Number of emitted trades.
+        gaps (int): Number of detected gaps.
+    """
+
+    __slots__ = ("market_id", "capacity", "last_time", "emitted", "gaps", "_history", "_window")
+
+    def __init__(self, market_id: int, capacity: int = DEFAULT_CAPACITY) -> None:
+        """
+        Constructor.
+
+        Args:
+            market_id (int): Market ID.
+            capacity (int): Number of remembered trade ids, must exceed the number of trades returned per poll.
+        """
+
+        self.market_id = market_id
+        self.capacity = max(int(capacity), 1)
+        self.last_time: t.t.Optional[float] = None
+        self.emitted = 0
+        self.gaps = 0
+
+        self._history = _History(self.capacity)
+        self._window = 0
+
+    def update(self, trades: t.t.Iterable[t.DictStrAny]) -> t.t.Tuple[t.t.List[t.DictStrAny], t.t.Optional[Gap]]:
+        """
+        Process the response of a poll.
+
+        Args:
+            trades (list): Trades as returned by `get_recent_trades` (newest first).
+
+        Returns:
+            tuple: New trades (oldest first) and the detected `Gap` (`None` if there is no gap).
+        """
+
+        history = self._history
+        fresh = []
+        overlap = False
+        count = 0
+        for trade in trades:
+            count += 1
+            if trade in history:
+                overlap = True
+            else:
+                fresh.append(trade)
+
+        if not fresh:
+            return fresh, None
+
+        # match ids are opaque strings: trades of the same time keep the (reversed) order of the response
+        fresh.reverse()
+        fresh.sort(key=lambda trade: trade["time"])
+
+        gap = None
+        if not overlap and self.last_time is not None and count >= self._window:
+            gap = Gap(self.market_id, self.last_time, fresh[0]["time"])
+            self.gaps += 1
+        self._window = max(self._window, count)
+
+        for trade in fresh:
+            history.add(trade)
+
+        newest = fresh[-1]["time"]
+        self.last_time = newest if self.last_time is None else max(self.last_time, newest)
+        self.emitted += len(fresh)
+        return fresh, gap
+
+
+class _Poller:
+    """Tapes and bookkeeping shared by `TapePoller` and `AsyncTapePoller`."""
+
+    def __init__(
+        self,
+        client: t.t.Any,
+        market_ids: t.t.Iterable[int],
+        interval: float = 1.0,
+        capacity: int = DEFAULT_CAPACITY,
+        on_gap: t.t.Optional[GapHandler] = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            client (Client): Client.
+            market_ids (list): Market IDs to poll.
+            interval (float): Seconds between the starts of two polls.
+            capacity (int): Number of remembered trade ids per market.
+            on_gap (callable): Called with every detected `Gap`.
+        """
+
+        self.client = client
+        self.interval = interval
+        self.on_gap = on_gap
+        self.tapes = {market_id: TradeTape(market_id, capacity) for market_id in market_ids}
+
+    def _process(self, market_id: int, trades: t.t.List[t.DictStrAny]) -> t.t.List[t.DictStrAny]:
+        fresh, gap = self.tapes[market_id].update(trades)
+        if gap is not None and self.on_gap is not None:
+            self.on_gap(gap)
+        return fresh
+
+
+class TapePoller(_Poller):
+    """
+    Tape Poller.
+
+    Polls the recent trades of markets with `Client` and emits the new ones.
+
+    Example:
+        ```python
+        poller = TapePoller(client, [1, 2], interval=0.5, on_gap=print)
+        poller.run(lambda market_id, trades: print(market_id, len(trades)))
+        ```
+    """
+
+    def __init__(self, *args: t.t.Any, **kwargs: t.t.Any) -> None:
+        """
+        Constructor.
+
+        Args:
+            *args: Args of `_Poller`.
+            **kwargs: Kwargs of `_Poller`.
+        """
+
+        super().__init__(*args, **kwargs)
+        self._stop = threading.Event()
+
+    def poll(self) -> t.t.Dict[int, t.t.List[t.DictStrAny]]:
+        """
+        Poll every market once.
+
+        Returns:
+            dict: New trades (oldest first) by market ID.
+        """
+
+        return {
+            market_id: self._process(market_id, self.client.get_recent_trades(market_id)) for market_id in self.tapes
+        }
+
+    def run(self, handler: TradeHandler, iterations: t.OptionalInt = None) -> None:
+        """
+        Poll until `stop` is called (or `iterations` polls are done).
+
+        Args:
+            handler (callable): Called with the market ID and its new trades, only if there are new trades.
+            iterations (int): Number of polls, unlimited if omitted.
+        """
+
+        self._stop.clear()
+        done = 0
+        while not self._stop.is_set() and (iterations is None or done < iterations):
+            started = time.monotonic()
+            for market_id, trades in self.poll().items():
+                if trades:
+                    handler(market_id, trades)
+            done += 1
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
+
+    def stop(self) -> None:
+        """Stop `run` (safe to call from another thread)."""
+
+        self._stop.set()
+
+
+class AsyncTapePoller(_Poller):
+    """
+    Async Tape Poller.
+
+    Polls the recent trades of markets concurrently with `AsyncClient` and emits the new ones.
+
+    Example:
+        ```python
+        poller = AsyncTapePoller(client, [1, 2], interval=0.5)
+        await poller.run(handle_trades)
+        ```
+    """
+
+    def __init__(self, *args: t.t.Any, **kwargs: t.t.Any) -> None:
+        """
+        Constructor.
+
+        Args:
+            *args: Args of `_Poller`.
+            **kwargs: Kwargs of `_Poller`.
+        """
+
+        super().__init__(*args, **kwargs)
+        self._running = False
+
+    async def poll(self) -> t.t.Dict[int, t.t.List[t.DictStrAny]]:
+        """
+        Poll every market once, concurrently.
+
+        Returns:
+            dict: New trades (oldest first) by market ID.
+        """
+
+        responses = await asyncio.gather(*(self.client.get_recent_trades(market_id) for market_id in self.tapes))
+        return {market_id: self._process(market_id, trades) for market_id, trades in zip(self.tapes, responses)}
+
+    async def run(self, handler: TradeHandler, iterations: t.OptionalInt = None) -> None:
+        """
+        Poll until `stop` is called (or `iterations` polls are done).
+
+        Args:
+            handler (callable): Function or coroutine function called with the market ID and its new trades.
+            iterations (int): Number of polls, unlimited if omitted.
+        """
+
+        self._running = True
+        done = 0
+        while self._running and (iterations is None or done < iterations):
+            started = time.monotonic()
+            for market_id, trades in (await self.poll()).items():
+                if trades:
+                    result = handler(market_id, trades)
+                    if inspect.isawaitable(result):
+                        await result
+            done += 1
+            if self._running:
+                await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    def stop(self) -> None:
+        """Stop `run` after the current poll."""
+
+        self._running = False
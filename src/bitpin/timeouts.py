@@ -0,0 +1,146 @@
+"""
+# Timeouts.
+
+Per-endpoint timeout profiles and deadlines shared by a sequence of calls.
+
+# Description.
+Every request gets the `TimeoutProfile` of its endpoint: order endpoints (`create_order`, `cancel_order`) fail in
+a few seconds, paginated listings get more time to transfer a page, and the other endpoints keep
+`REQUEST_TIMEOUT` of the client. Profiles can be overridden per endpoint name with the `timeouts` argument of
+the clients.
+
+`deadline` sets a latency budget for everything called inside it, in the current thread or task (and the tasks
+it creates): the timeouts of each request are capped by the time left, and calls made once it has run out raise
+`DeadlineExceeded` without being sent. Deadlines nest, the earliest one wins.
+
+```python
+with deadline(1.5):
+    client.cancel_order(order_id)
+    client.create_order(...)  # gets what is left of the 1.5 seconds
+```
+
+Notes:
+    `requests` has no total timeout: `Client` caps the connect and read timeouts (each socket read) with `total`
+    and the time left, `AsyncClient` enforces all three.
+"""
+
+import contextlib
+import contextvars
+import time
+
+from . import types as t
+from .exceptions import DeadlineExceeded
+
+_deadline: "contextvars.ContextVar[t.t.Optional[float]]" = contextvars.ContextVar("bitpin_deadline", default=None)
+
+
+class TimeoutProfile:
+    """
+    Timeout Profile.
+
+    Attributes:
+        connect (float): Seconds to get a connection (including the pool queue for `AsyncClient`).
+        read (float): Seconds to wait for data from the socket.
+        total (float): Seconds for the whole request.
+    """
+
+    __slots__ = ("connect", "read", "total")
+
+    def __init__(
+        self,
+        connect: t.OptionalFloat = None,
+        read: t.OptionalFloat = None,
+        total: t.OptionalFloat = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            connect (float): Connect timeout, `None` for no limit other than `total`.
+            read (float): Read timeout, `None` for no limit other than `total`.
+            total (float): Total timeout, `None` for no limit.
+        """
+
+        self.connect = connect
+        self.read = read
+        self.total = total
+
+    def clamp(self, seconds: float) -> "TimeoutProfile":
+        """
+        Cap the timeouts.
+
+        Args:
+            seconds (float): Maximum of every timeout.
+
+        Returns:
+            TimeoutProfile: Capped profile.
+        """
+
+        return TimeoutProfile(
+            *(seconds if value is None else min(value, seconds) for value in (self.connect, self.read, self.total))
+        )
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"TimeoutProfile(connect={self.connect}, read={self.read}, total={self.total})"
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> t.t.Iterator[float]:
+    """
+    Share a latency budget between the calls made in the block.
+
+    Args:
+        seconds (float): Budget.
+
+    Yields:
+        float: Deadline (monotonic time).
+    """
+
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current < expires:
+        expires = current
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> t.OptionalFloat:
+    """
+    Get the time left before the current deadline.
+
+    Returns:
+        float: Seconds (negative once exceeded), `None` without deadline.
+    """
+
+    expires = _deadline.get()
+    return expires - time.monotonic() if expires is not None else None
+
+
+def check(operation: str = "request") -> t.OptionalFloat:
+    """
+    Fail if the current deadline is exceeded.
+
+    Args:
+        operation (str): Name of what is about to be done, for the exception message.
+
+    Returns:
+        float: Seconds left, `None` without deadline.
+
+    Raises:
+        DeadlineExceeded: The deadline is exceeded.
+    """
+
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline exceeded before {operation}")
+    return left
@@ -8,12 +8,15 @@ This file contains all the types used in the project.
 """
 
 import typing as t
-import asyncio
-import requests
-import aiohttp
 
 from . import enums
 
+if t.TYPE_CHECKING:  # pragma: no cover
+    # HTTP stacks are only imported for type checking, so each client only loads its own.
+    import asyncio
+    import requests
+    import aiohttp
+
 # General Types:
 OptionalStr = t.Optional[str]
 OptionalInt = t.Optional[int]
@@ -22,7 +25,7 @@ OptionalFloat = t.Optional[float]
 DictStrAny = t.Dict[str, t.Any]
 OptionalDictStrAny = t.Optional[DictStrAny]
 
-EventLoop = asyncio.AbstractEventLoop
+EventLoop = t.Union["asyncio.AbstractEventLoop"]
 OptionalEventLoop = t.Optional[EventLoop]
 
 # Client Types:
@@ -39,8 +42,8 @@ OrderModes = t.Union[OrderModeLimit, OrderModeMarket, OrderModeOCO, OrderModeSto
 OptionalOrderModes = t.Optional[OrderModes]
 
 # HTTP Types:
-HttpSession = t.Union[requests.Session, aiohttp.ClientSession]
-HttpResponses = t.Union[requests.Response, aiohttp.ClientResponse]
+HttpSession = t.Union["requests.Session", "aiohttp.ClientSession"]
+HttpResponses = t.Union["requests.Response", "aiohttp.ClientResponse"]
 
 # Request Types:
 RequestMethodGet = t.Literal["get"]
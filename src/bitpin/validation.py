@@ -0,0 +1,391 @@
+"""
+# Validation.
+
+Pre-trade validation and precision rounding of orders.
+
+# Description.
+`OrderValidator` checks `create_order` arguments against the market metadata returned by `get_markets_info`
+(`decimal_amount` of the base currency for amounts; `decimal_irt` of the base currency for prices in IRT
+markets and `decimal` otherwise) and rejects invalid orders locally with `OrderValidationException`
+instead of spending a round trip and a rate-limit token on an `APIException`.
+
+The metadata is compiled once per market into `MarketRules` (precomputed `Decimal` quanta), so validating
+an order costs a dict lookup and a few `Decimal` operations. Used as a middleware it validates (and, with
+`round=True`, rounds) every `create_order` payload before it is sent, and loads the rules passively from
+`get_markets_info` responses going through the client.
+
+Rounding never makes an order worse than requested: amounts are rounded down, buy prices down
+and sell prices up.
+"""
+
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, InvalidOperation
+
+from . import types as t
+from .clients import endpoints
+from .enums import OrderMode, OrderType
+from .exceptions import OrderValidationException
+from .middleware import Middleware, RequestContext
+
+IRT = "IRT"
+
+_TYPES = frozenset(str(member) for member in OrderType)
+_MODES = frozenset(str(member) for member in OrderMode)
+
+# Extra prices required by each mode
+_MODE_PRICES = {
+    str(OrderMode.STOP_LIMIT): ("price_stop", "price_limit"),
+    str(OrderMode.OCO): ("price_stop", "price_limit", "price_limit_oco"),
+}
+
+
+def _decimal(value: t.t.Any, field: str) -> Decimal:
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError) as e:
+        raise OrderValidationException(f"{field} is not a number: {value!r}", field) from e
+    if not number.is_finite():
+        raise OrderValidationException(f"{field} is not a number: {value!r}", field)
+    return number
+
+
+class MarketRules:
+    """
+    Market Rules.
+
+    Precision and limits of a market.
+
+    Attributes:
+        market_id (int): Market ID.
+        code (str): Market code (e.g. `BTC_IRT`).
+        quote (str): Quote currency code.
+        price_quantum (Decimal): Price tick (e.g. `0.01`).
+        amount_quantum (Decimal): Amount step.
+        min_value (Decimal): Minimum order value (`amount1 * price`) in the quote currency, `None` if unknown.
+        tradable (bool): Whether the market is tradable.
+    """
+
+    __slots__ = (
+        "market_id",
+        "code",
+        "quote",
+        "price_quantum",
+        "amount_quantum",
+        "min_value",
+        "tradable",
+    )
+
+    def __init__(
+        self,
+        market_id: int,
+        code: str,
+        quote: str,
+        price_decimals: int,
+        amount_decimals: int,
+        min_value: t.t.Optional[Decimal] = None,
+        tradable: bool = True,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            market_id (int): Market ID.
+            code (str): Market code.
+            quote (str): Quote currency code.
+            price_decimals (int): Decimal places of prices.
+            amount_decimals (int): Decimal places of amounts.
+            min_value (Decimal): Minimum order value in the quote currency.
+            tradable (bool): Whether the market is tradable.
+        """
+
+        self.market_id = market_id
+        self.code = code
+        self.quote = quote
+        self.price_quantum = Decimal(1).scaleb(-int(price_decimals))
+        self.amount_quantum = Decimal(1).scaleb(-int(amount_decimals))
+        self.min_value = min_value
+        self.tradable = tradable
+
+    @classmethod
+    def from_market(
+        cls, market: t.DictStrAny, min_values: t.t.Optional[t.t.Dict[str, Decimal]] = None
+    ) -> "MarketRules":
+        """
+        Compile the rules of a market.
+
+        Args:
+            market (dict): `MarketInfo`, as returned by `get_markets_info`.
+            min_values (dict): Minimum order value by quote currency code.
+
+        Returns:
+            MarketRules: Rules.
+        """
+
+        base, quote = market["currency1"], market["currency2"]
+        quote_code = str(quote["code"]).upper()
+        price_decimals = base.get("decimal_irt") if quote_code == IRT else base.get("decimal")
+        return cls(
+            int(market["id"]),
+            market.get("code") or f"{base['code']}_{quote['code']}",
+            quote_code,
+            int(price_decimals if price_decimals is not None else quote.get("decimal", 0)),
+            int(base.get("decimal_amount", 0)),
+            (min_values or {}).get(quote_code),
+            bool(market.get("tradable", True)),
+        )
+
+    def quantize_price(self, price: Decimal, type: str) -> Decimal:  # pylint: disable=redefined-builtin
+        """
+        Round a price to the tick, down for buys and up for sells.
+
+        Args:
+            price (Decimal): Price.
+            type (str): `buy` or `sell`.
+
+        Returns:
+            Decimal: Rounded price.
+        """
+
+        return price.quantize(self.price_quantum, ROUND_FLOOR if type == "buy" else ROUND_CEILING)
+
+    def quantize_amount(self, amount: Decimal) -> Decimal:
+        """
+        Round an amount down to the step.
+
+        Args:
+            amount (Decimal): Amount.
+
+        Returns:
+            Decimal: Rounded amount.
+        """
+
+        return amount.quantize(self.amount_quantum, ROUND_FLOOR)
+
+    def __repr__(self) -> str:
+        """
+        Representation.
+
+        Returns:
+            str: Representation.
+        """
+
+        return f"MarketRules({self.code}: price={self.price_quantum}, amount={self.amount_quantum})"
+
+
+class OrderValidator(Middleware):
+    """
+    Order Validator.
+
+    Validates `create_order` arguments locally, usable as a middleware of `Client` and `AsyncClient`.
+
+    Attributes:
+        rules (dict): `MarketRules` by market ID.
+        round (bool): Round prices and amounts to the market precision instead of rejecting them.
+        strict (bool): Reject orders on markets without rules instead of sending them unchecked.
+        rejected (int): Number of rejected orders.
+
+    Example:
+        ```python
+        validator = OrderValidator(round=True, min_values={"IRT": 500_000})
+        client = Client(api_key, api_secret, middlewares=[validator])
+        validator.refresh(client)
+        client.create_order(1, 0.0123456789, 1_234_567_890.5, "limit", "buy")  # rounded locally
+        ```
+    """
+
+    def __init__(
+        self,
+        markets: t.t.Optional[t.t.Iterable[t.DictStrAny]] = None,
+        round: bool = False,  # pylint: disable=redefined-builtin
+        strict: bool = False,
+        min_values: t.t.Optional[t.t.Dict[str, t.t.Any]] = None,
+    ) -> None:
+        """
+        Constructor.
+
+        Args:
+            markets (list): `MarketInfo` list to load.
+            round (bool): Round prices and amounts instead of rejecting them.
+            strict (bool): Reject orders on markets without rules.
+            min_values (dict): Minimum order value by quote currency code (e.g. `{"IRT": 500000}`).
+        """
+
+        self.round = round
+        self.strict = strict
+        self.rejected = 0
+        self.rules: t.t.Dict[int, MarketRules] = {}
+        self._min_values = {str(code).upper(): Decimal(str(value)) for code, value in (min_values or {}).items()}
+        if markets is not None:
+            self.load(markets)
+
+    def load(self, markets: t.t.Iterable[t.DictStrAny]) -> None:
+        """
+        Compile and store the rules of markets.
+
+        Args:
+            markets (list): `MarketInfo` list.
+        """
+
+        for market in markets:
+            try:
+                rules = MarketRules.from_market(market, self._min_values)
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.rules[rules.market_id] = rules
+
+    def refresh(self, client: t.t.Any) -> None:
+        """
+        Load the rules of all markets with `Client`.
+
+        Args:
+            client (Client): Client.
+        """
+
+        page = 1
+        while True:
+            response = client.get_markets_info(page)
+            self.load(response.get("results") or [])
+            if not response.get("next"):
+                return
+            page += 1
+
+    async def refresh_async(self, client: t.t.Any) -> None:
+        """
+        Load the rules of all markets with `AsyncClient`.
+
+        Args:
+            client (AsyncClient): Client.
+        """
+
+        page = 1
+        while True:
+            response = await client.get_markets_info(page)
+            self.load(response.get("results") or [])
+            if not response.get("next"):
+                return
+            page += 1
+
+    def validate(self, payload: t.DictStrAny) -> t.DictStrAny:
+        """
+        Validate (and round) `create_order` arguments.
+
+        Args:
+            payload (dict): Arguments of `create_order` (`market`, `amount1`, `price`, `mode`, `type`, ...).
+
+        Returns:
+            dict: Payload with prices and amounts as strings, rounded if `round` is set.
+
+        Raises:
+            OrderValidationException: The order would be rejected.
+        """
+
+        try:
+            return self._validate(payload)
+        except OrderValidationException:
+            self.rejected += 1
+            raise
+
+    def _validate(self, payload: t.DictStrAny) -> t.DictStrAny:
+        type_ = str(payload.get("type", "")).lower()
+        if type_ not in _TYPES:
+            raise OrderValidationException(f"type must be one of {', '.join(sorted(_TYPES))}", "type")
+        mode = str(payload.get("mode", "")).lower()
+        if mode not in _MODES:
+            raise OrderValidationException(f"mode must be one of {', '.join(sorted(_MODES))}", "mode")
+        for field in _MODE_PRICES.get(mode, ()):
+            if payload.get(field) is None:
+                raise OrderValidationException(f"{field} is required for {mode} orders", field)
+
+        rules = self._rules(payload)
+        if rules is None:
+            return payload
+
+        result = dict(payload)
+        amount = self._quantize(payload, "amount1", rules.amount_quantum, rules.quantize_amount)
+        result["amount1"] = format(amount, "f")
+
+        price = None
+        for field in ("price", "price_stop", "price_limit", "price_limit_oco"):
+            if payload.get(field) is not None:
+                quantized = self._quantize(
+                    payload, field, rules.price_quantum, lambda value: rules.quantize_price(value, type_)
+                )
+                result[field] = format(quantized, "f")
+                price = quantized if field == "price" else price
+
+        if price is None and mode != str(OrderMode.MARKET):
+            raise OrderValidationException(f"price is required for {mode} orders", "price")
+        if rules.min_value is not None and price is not None and amount * price < rules.min_value:
+            raise OrderValidationException(
+                f"order value {amount * price} {rules.quote} is below the minimum {rules.min_value}", "amount1"
+            )
+        return result
+
+    def _rules(self, payload: t.DictStrAny) -> t.t.Optional[MarketRules]:
+        """Rules of the market of the order, `None` to send it unchecked."""
+
+        try:
+            market_id = int(payload["market"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise OrderValidationException(f"invalid market: {payload.get('market')!r}", "market") from e
+        rules = self.rules.get(market_id)
+        if rules is None:
+            if self.strict:
+                raise OrderValidationException(f"unknown market {market_id}", "market")
+            return None
+        if not rules.tradable:
+            raise OrderValidationException(f"market {rules.code} is not tradable", "market")
+        return rules
+
+    def _quantize(
+        self,
+        payload: t.DictStrAny,
+        field: str,
+        quantum: Decimal,
+        quantize: t.t.Callable[[Decimal], Decimal],
+    ) -> Decimal:
+        """Check (or round, with `round`) a positive amount or price to its quantum."""
+
+        value = _decimal(payload.get(field), field)
+        try:
+            quantized = quantize(value)
+        except InvalidOperation as e:
+            raise OrderValidationException(f"{field} {value} is out of range", field) from e
+        if quantized != value and not self.round:
+            raise OrderValidationException(f"{field} {value} is not a multiple of {quantum}", field)
+        if quantized <= 0:
+            raise OrderValidationException(f"{field} must be at least {quantum}", field)
+        return quantized
+
+    def before_send(self, request: RequestContext) -> None:
+        """
+        Validate `create_order` payloads before they are sent.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            None: The request is sent (possibly with a rounded payload).
+
+        Raises:
+            OrderValidationException: The order would be rejected.
+        """
+
+        if request.spec is endpoints.CREATE_ORDER:
+            location = request.spec.location
+            request.kwargs[location] = self.validate(request.kwargs.get(location) or {})
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:
+        """
+        Load rules from `get_markets_info` responses.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result, unchanged.
+        """
+
+        if request.spec is endpoints.MARKETS and isinstance(result, dict):
+            self.load(result.get("results") or [])
+        return result
@@ -0,0 +1,290 @@
+"""
+# Wallets.
+
+In-memory wallet balances kept up to date between `get_wallets` calls.
+
+# Description.
+`WalletCache` is a middleware that stores the `WalletInfo` of every currency from the last `get_wallets`
+response and serves the following `get_wallets` calls from memory while the snapshot is fresh, so pre-trade
+checks (`available`, `frozen`, `wallet`) cost a dict lookup instead of a rate-limited round trip.
+
+Between two snapshots balances are adjusted optimistically:
+
+- `create_order` moves the order's `expected_resource` from `balance` to `frozen` of its resource currency.
+- `cancel_order` moves what is left of that reservation back to `balance`.
+
+The snapshot is refreshed from the API on the next `get_wallets` call when it is older than `max_age` or when
+drift is likely: an order was filled on creation (fills change balances in ways that can not be predicted
+from the response), an order request failed, or `invalidate` was called. A refresh that finds balances different
+from the optimistic ones while no such event happened (e.g. a deposit, or an order filled or placed
+elsewhere) is reported to `on_drift`.
+"""
+
+import threading
+import time
+from decimal import Decimal
+
+from . import types as t
+from .clients import endpoints
+from .exceptions import OrderValidationException
+from .middleware import Middleware, RequestContext
+
+ZERO = Decimal(0)
+
+DriftHandler = t.t.Callable[[str, Decimal, Decimal], t.t.Any]
+
+
+def _decimal(value: t.t.Any) -> Decimal:
+    return Decimal(str(value)) if value not in (None, "") else ZERO
+
+
+def _code(currency: t.t.Any) -> t.OptionalStr:
+    return currency.get("code") if isinstance(currency, dict) else currency
+
+
+class WalletCache(Middleware):  # pylint: disable=too-many-instance-attributes
+    """
+    Wallet Cache.
+
+    Middleware serving wallet balances from memory, usable with `Client` and `AsyncClient`.
+
+    Attributes:
+        max_age (float): Seconds a snapshot is served before `get_wallets` hits the API again.
+        refreshed_at (float): Time (monotonic) of the last snapshot, `None` before the first one.
+        hits (int): Number of `get_wallets` calls served from memory.
+        drifts (int): Number of refreshes that found balances different from the optimistic ones.
+
+    Example:
+        ```python
+        wallets = WalletCache(max_age=30)
+        client = Client(api_key, api_secret, middlewares=[wallets])
+        client.get_wallets()  # API
+        if wallets.available("IRT") >= cost:  # memory
+            client.create_order(...)
+        ```
+    """
+
+    def __init__(self, max_age: float = 60.0, on_drift: t.t.Optional[DriftHandler] = None) -> None:
+        """
+        Constructor.
+
+        Args:
+            max_age (float): Seconds a snapshot is served before `get_wallets` hits the API again.
+            on_drift (callable): Called with the currency code, the optimistic and the actual balance
+                when a refresh finds a difference.
+        """
+
+        self.max_age = max_age
+        self.on_drift = on_drift
+        self.refreshed_at: t.t.Optional[float] = None
+        self.hits = 0
+        self.drifts = 0
+
+        self._lock = threading.RLock()
+        self._wallets: t.t.Dict[str, t.DictStrAny] = {}
+        self._balance: t.t.Dict[str, Decimal] = {}
+        self._frozen: t.t.Dict[str, Decimal] = {}
+        self._reserved: t.t.Dict[int, t.t.Tuple[str, Decimal]] = {}
+        self._stale = True
+
+    @property
+    def stale(self) -> bool:
+        """
+        Whether the next `get_wallets` call goes to the API.
+
+        Returns:
+            bool: Whether the snapshot is missing, expired or likely drifted.
+        """
+
+        return self._stale or self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.max_age
+
+    def invalidate(self) -> None:
+        """Make the next `get_wallets` call go to the API."""
+
+        self._stale = True
+
+    def available(self, code: str) -> Decimal:
+        """
+        Get the available balance of a currency.
+
+        Args:
+            code (str): Currency code (e.g. `IRT`).
+
+        Returns:
+            Decimal: Balance, 0 for unknown currencies.
+        """
+
+        return self._balance.get(code.upper(), ZERO)
+
+    def frozen(self, code: str) -> Decimal:
+        """
+        Get the frozen balance of a currency.
+
+        Args:
+            code (str): Currency code.
+
+        Returns:
+            Decimal: Frozen balance, 0 for unknown currencies.
+        """
+
+        return self._frozen.get(code.upper(), ZERO)
+
+    def wallet(self, code: str) -> t.OptionalDictStrAny:
+        """
+        Get the wallet of a currency, with the optimistic balances.
+
+        Args:
+            code (str): Currency code.
+
+        Returns:
+            dict: `WalletInfo`, `None` for unknown currencies.
+        """
+
+        with self._lock:
+            return self._render(code.upper())
+
+    def wallets(self) -> t.t.List[t.DictStrAny]:
+        """
+        Get all wallets, with the optimistic balances.
+
+        Returns:
+            list: `WalletInfo` list.
+        """
+
+        with self._lock:
+            return [wallet for wallet in (self._render(code) for code in self._wallets) if wallet is not None]
+
+    def _render(self, code: str) -> t.OptionalDictStrAny:
+        wallet = self._wallets.get(code)
+        if wallet is None:
+            return None
+        balance, frozen = self._balance[code], self._frozen[code]
+        return {**wallet, "balance": str(balance), "frozen": str(frozen), "total": str(balance + frozen)}
+
+    def before_send(self, request: RequestContext) -> t.OptionalDictStrAny:
+        """
+        Serve `get_wallets` from memory while the snapshot is fresh.
+
+        Args:
+            request (RequestContext): Request.
+
+        Returns:
+            dict: Cached response, or `None` to send the request.
+        """
+
+        if request.spec is not endpoints.WALLETS or self.stale:
+            return None
+
+        results = self.wallets()
+        self.hits += 1
+        return {"count": len(results), "next": None, "previous": None, "results": results}
+
+    def after_receive(self, request: RequestContext, result: t.t.Any) -> t.t.Any:
+        """
+        Update the balances from the result.
+
+        Args:
+            request (RequestContext): Request.
+            result (t.Any): Decoded result.
+
+        Returns:
+            t.Any: Result, unchanged.
+        """
+
+        spec = request.spec
+        if spec is endpoints.WALLETS and request.response is not None:
+            self.load(result)
+        elif spec is endpoints.CREATE_ORDER and isinstance(result, dict):
+            self._reserve(result)
+        elif spec is endpoints.CANCEL_ORDER and isinstance(result, dict):
+            # funds are only known to be released if the exchange accepted the cancel
+            if request.succeeded and result.get("status") == "success":
+                self._release(int(result.get("id") or request.uri.rstrip("/").rsplit("/", 1)[-1]))
+            else:
+                self._stale = True
+        return result
+
+    def on_error(self, request: RequestContext, exc: Exception) -> t.t.Any:
+        """
+        Invalidate the snapshot when an order request failed (its outcome is unknown).
+
+        Args:
+            request (RequestContext): Request.
+            exc (Exception): Exception.
+
+        Returns:
+            None: The exception is propagated.
+        """
+
+        if isinstance(exc, OrderValidationException):
+            return None
+        if request.spec is endpoints.CREATE_ORDER or request.spec is endpoints.CANCEL_ORDER:
+            self._stale = True
+        return None
+
+    def load(self, response: t.t.Any) -> None:
+        """
+        Replace the snapshot with a `get_wallets` response.
+
+        Args:
+            response (dict): `get_wallets` response (or its `results` list).
+        """
+
+        results = (response.get("results") or []) if isinstance(response, dict) else response
+        with self._lock:
+            # balances are only expected to match when nothing unpredictable happened since the last snapshot
+            optimistic = dict(self._balance) if self.refreshed_at is not None and not self._stale else {}
+            self._wallets.clear()
+            self._balance.clear()
+            self._frozen.clear()
+            for wallet in results:
+                code = _code(wallet.get("currency"))
+                if not code:
+                    continue
+                code = code.upper()
+                self._wallets[code] = wallet
+                self._balance[code] = _decimal(wallet.get("balance"))
+                self._frozen[code] = _decimal(wallet.get("frozen"))
+
+            drifted = [
+                (code, expected, self._balance.get(code, ZERO))
+                for code, expected in optimistic.items()
+                if expected != self._balance.get(code, ZERO)
+            ]
+            self._reserved.clear()
+            self.refreshed_at = time.monotonic()
+            self._stale = False
+
+        if drifted:
+            self.drifts += 1
+            if self.on_drift is not None:
+                for code, expected, actual in drifted:
+                    self.on_drift(code, expected, actual)
+
+    def _reserve(self, order: t.DictStrAny) -> None:
+        if _decimal(order.get("exchanged1")) > 0:
+            self._stale = True
+
+        code = _code(order.get("resource_currency"))
+        order_id = order.get("id")
+        if not code or order_id is None or order.get("state") not in ("active", "initial"):
+            return
+
+        code = code.upper()
+        resource = _decimal(order.get("expected_resource")) - _decimal(order.get("resource"))
+        with self._lock:
+            if code not in self._balance:
+                return
+            self._balance[code] -= resource
+            self._frozen[code] += resource
+            self._reserved[int(order_id)] = (code, resource)
+
+    def _release(self, order_id: int) -> None:
+        with self._lock:
+            reserved = self._reserved.pop(order_id, None)
+            if reserved is None:
+                self._stale = True
+                return
+            code, resource = reserved
+            self._balance[code] += resource
+            self._frozen[code] -= resource
@@ -0,0 +1,58 @@
+"""Tests of `bitpin.export`."""
+
+import csv
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+from bitpin.export import RECENT_TRADE_COLUMNS, ColumnarWriter, export
+
+TRADES = [
+    {
+        "match_id": "73802_97273807087",
+        "time": 1700000000.5,
+        "type": "buy",
+        "price": "1000",
+        "match_amount": "0.5",
+        "value": "500",
+    },
+    {"match_id": "a1b2c3", "time": 1700000001, "type": "sell", "price": "999", "match_amount": "1", "value": "999"},
+]
+
+
+class RecentTradeColumnsTest(unittest.TestCase):
+    """Match ids are opaque strings, they must be exported as is."""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_csv_keeps_match_ids(self) -> None:
+        path = Path(self.directory.name) / "trades.csv"
+
+        self.assertEqual(export(TRADES, path, RECENT_TRADE_COLUMNS), 2)
+
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row["match_id"] for row in rows], ["73802_97273807087", "a1b2c3"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_arrow_keeps_match_ids(self) -> None:
+        import pyarrow
+
+        path = Path(self.directory.name) / "trades.arrow"
+
+        export(TRADES, path, RECENT_TRADE_COLUMNS)
+
+        table = pyarrow.ipc.open_file(str(path)).read_all()
+        self.assertEqual(table.schema.field("match_id").type, pyarrow.string())
+        self.assertEqual(table.column("match_id").to_pylist(), ["73802_97273807087", "a1b2c3"])
+
+    def test_columns_are_required(self) -> None:
+        with self.assertRaises(ValueError):
+            ColumnarWriter(Path(self.directory.name) / "empty.csv", ())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests of `bitpin.hedging`."""
+
+import asyncio
+import unittest
+
+from bitpin.hedging import HedgePolicy
+from bitpin.middleware import RequestContext
+
+TEMPLATE = "v2/mth/actives/{}/?type={}"
+
+
+def _request() -> RequestContext:
+    return RequestContext("get", "http://localhost/v2/mth/actives/1/?type=buy", False, {}, TEMPLATE)
+
+
+def _answer(name: str, delay: float):  # type: ignore[no-untyped-def]
+    async def attempt(own: RequestContext) -> str:
+        own.response = name  # the raw response is set before the body is read
+        await asyncio.sleep(delay)
+        return name
+
+    return attempt
+
+
+async def _hedged(policy: HedgePolicy, request: RequestContext) -> str:
+    await policy.send(TEMPLATE, _request(), _answer("warm-up", 0.0))
+    attempts = iter([_answer("primary", 0.5), _answer("hedge", 0.05)])
+    return await policy.send(TEMPLATE, request, lambda own: next(attempts)(own))  # type: ignore[no-any-return]
+
+
+class HedgePolicyTest(unittest.TestCase):
+    """Only the winning attempt sets the raw response of the request."""
+
+    def test_loser_does_not_overwrite_response(self) -> None:
+        policy = HedgePolicy(min_samples=1, min_delay=0.01)
+        request = _request()
+
+        result = asyncio.run(_hedged(policy, request))
+
+        self.assertEqual(result, "hedge")
+        self.assertEqual(request.response, "hedge")
+        self.assertEqual((policy.hedged, policy.won), (1, 1))
+
+    def test_failed_attempt_keeps_its_response(self) -> None:
+        policy = HedgePolicy(min_samples=1)
+        request = _request()
+
+        async def attempt(own: RequestContext) -> str:
+            own.response = "failed"
+            raise ValueError("failed")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(policy.send(TEMPLATE, request, attempt))
+        self.assertEqual(request.response, "failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
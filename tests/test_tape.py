@@ -0,0 +1,42 @@
+"""Tests of `bitpin.tape`."""
+
+import unittest
+
+from bitpin.tape import TradeTape
+
+
+def _trade(match_id: str, time: float) -> dict:
+    return {"match_id": match_id, "time": time, "price": "1", "match_amount": "1", "type": "buy"}
+
+
+class TradeTapeTest(unittest.TestCase):
+    """Match ids are opaque strings, only the time orders trades."""
+
+    def test_non_numeric_ids(self) -> None:
+        tape = TradeTape(1)
+
+        fresh, gap = tape.update([_trade("c_3", 2.0), _trade("b-2", 1.0), _trade("a", 1.0)])
+
+        self.assertIsNone(gap)
+        self.assertEqual([trade["match_id"] for trade in fresh], ["a", "b-2", "c_3"])
+
+    def test_same_time_keeps_response_order(self) -> None:
+        tape = TradeTape(1)
+
+        fresh, _ = tape.update([_trade("73802_97273807087", 5.0), _trade("73802_1", 5.0), _trade("x", 4.0)])
+
+        self.assertEqual([trade["match_id"] for trade in fresh], ["x", "73802_1", "73802_97273807087"])
+
+    def test_overlapping_polls(self) -> None:
+        tape = TradeTape(1, capacity=2)
+        tape.update([_trade("b", 2.0), _trade("a", 1.0)])
+
+        fresh, gap = tape.update([_trade("c", 3.0), _trade("b", 2.0), _trade("a", 1.0)])
+
+        self.assertIsNone(gap)
+        self.assertEqual([trade["match_id"] for trade in fresh], ["c"])
+        self.assertEqual(tape.emitted, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
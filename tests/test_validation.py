@@ -0,0 +1,60 @@
+"""Tests of `bitpin.validation`."""
+
+import unittest
+
+from bitpin.exceptions import OrderValidationException
+from bitpin.validation import OrderValidator
+
+
+def _market(market_id: int, price_decimals: int, amount_decimals: int) -> dict:
+    return {
+        "id": market_id,
+        "code": "SHIB_USDT",
+        "currency1": {"code": "SHIB", "decimal": price_decimals, "decimal_irt": 0, "decimal_amount": amount_decimals},
+        "currency2": {"code": "USDT", "decimal": 2},
+        "tradable": True,
+    }
+
+
+class OrderValidatorTest(unittest.TestCase):
+    """Validated payloads carry plain decimal strings."""
+
+    def setUp(self) -> None:
+        self.validator = OrderValidator([_market(1, 10, 8)], round=True)
+
+    def test_small_values_are_not_in_scientific_notation(self) -> None:
+        payload = self.validator.validate(
+            {"market": 1, "amount1": 0.0000001, "price": "0.00000012345", "mode": "limit", "type": "buy"}
+        )
+
+        self.assertEqual(payload["amount1"], "0.00000010")
+        self.assertEqual(payload["price"], "0.0000001234")
+
+    def test_stop_prices_below_one_millionth(self) -> None:
+        payload = self.validator.validate(
+            {
+                "market": 1,
+                "amount1": "1",
+                "price": "0.0000005",
+                "price_stop": "0.0000004",
+                "price_limit": "0.0000003",
+                "mode": "stop_limit",
+                "type": "sell",
+            }
+        )
+
+        self.assertEqual(payload["amount1"], "1.00000000")
+        self.assertEqual(
+            [payload[field] for field in ("price", "price_stop", "price_limit")],
+            ["0.0000005000", "0.0000004000", "0.0000003000"],
+        )
+
+    def test_amount_below_step_is_rejected(self) -> None:
+        with self.assertRaises(OrderValidationException):
+            self.validator.validate(
+                {"market": 1, "amount1": "0.000000001", "price": "1", "mode": "limit", "type": "buy"}
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()